@@ -0,0 +1,133 @@
+# benchmarks/chunker_bench.py
+"""
+Throughput and peak memory of the chunkers on a large text file.
+
+    legacy      utils.helpers.chunk_text_by_sentences on the whole text read
+                at once (how process_file chunks a file)
+    stream      utils.chunker.iter_chunks over 64 KB blocks, chars / 4
+    tokenizer   utils.chunker.iter_chunks over 64 KB blocks, real tokenizer
+
+Each mode runs in a fresh child process, so peak RSS is its own. The
+tokenizer is --tokenizer (a tokenizer.json or cached HF repo); without it a
+BPE tokenizer trained on the first megabytes of the corpus stands in, which
+costs about the same per token as the embedding model's.
+
+    python -m benchmarks.chunker_bench --mb 50
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+WORDS = (
+    "the of and to in is for on with as by at from that this be are was it an or "
+    "revenue quarter growth margin forecast customer pipeline budget compliance audit "
+    "vendor contract renewal roadmap release latency throughput incident capacity "
+    "storage network retrieval embedding chunk tokenizer session upload document"
+).split()
+
+
+def make_corpus(path: str, megabytes: float, seed: int = 11):
+    rng = random.Random(seed)
+    target = int(megabytes * 2**20)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            sentences = []
+            for _ in range(rng.randint(3, 12)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(5, 30))]
+                sentences.append(" ".join(words).capitalize() + rng.choice(".!?."))
+            paragraph = " ".join(sentences) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def train_tokenizer(corpus: str, out: str, sample_mb: int = 4):
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+
+    tokenizer = Tokenizer(models.BPE(unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    with open(corpus, encoding="utf-8") as f:
+        sample = f.read(sample_mb * 2**20).splitlines()
+    tokenizer.train_from_iterator(sample, trainers.BpeTrainer(vocab_size=8000, special_tokens=["[UNK]"]))
+    tokenizer.save(out)
+
+
+def iter_blocks(path: str, size: int = 65536):
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(size)
+            if not block:
+                return
+            yield block
+
+
+def child(mode: str, corpus: str, tokenizer: str) -> dict:
+    start = time.perf_counter()
+    if mode == "legacy":
+        from utils.helpers import chunk_text_by_sentences
+        with open(corpus, encoding="utf-8") as f:
+            chunks = chunk_text_by_sentences(f.read(), max_tokens=1800, overlap_tokens=200)
+        count, tokens = len(chunks), sum(len(c) // 4 for c in chunks)
+    else:
+        from utils.chunker import iter_chunks, get_token_counter, TokenCounter
+        counter = get_token_counter(tokenizer) if mode == "tokenizer" else TokenCounter()
+        if mode == "tokenizer" and counter.tokenizer is None:
+            raise RuntimeError(f"tokenizer {tokenizer} could not be loaded")
+        count = tokens = 0
+        for chunk in iter_chunks(iter_blocks(corpus), counter=counter):
+            count += 1
+            tokens += chunk.tokens
+    seconds = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": seconds, "chunks": count, "tokens": tokens, "peak_mb": peak_kb / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker throughput / memory benchmark.")
+    parser.add_argument("--mb", type=float, default=50)
+    parser.add_argument("--modes", default="legacy,stream,tokenizer")
+    parser.add_argument("--tokenizer", help="tokenizer.json path or cached HF repo")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "CORPUS", "TOKENIZER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    work = tempfile.mkdtemp(prefix="gemserve_chunkbench_")
+    try:
+        corpus = os.path.join(work, "corpus.txt")
+        make_corpus(corpus, args.mb)
+        tokenizer = args.tokenizer
+        if not tokenizer and "tokenizer" in args.modes:
+            tokenizer = os.path.join(work, "tokenizer.json")
+            train_tokenizer(corpus, tokenizer)
+            print("Using a BPE tokenizer trained on the corpus (pass --tokenizer for the real one)")
+        print(f"{os.path.getsize(corpus) / 2**20:.1f} MB corpus\n")
+        print(f"{'mode':<10} {'seconds':>8} {'MB/s':>7} {'chunks':>8} {'tokens':>11} {'peak RSS MB':>12}")
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.chunker_bench", "--child", mode, corpus, tokenizer or ""],
+                capture_output=True, text=True,
+            )
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+                print(f"{mode:<10} skipped: {tail}")
+                continue
+            r = json.loads(lines[-1])
+            print(f"{mode:<10} {r['seconds']:>8.2f} {args.mb / r['seconds']:>7.1f} {r['chunks']:>8} "
+                  f"{r['tokens']:>11} {r['peak_mb']:>12.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/collection_layout_bench.py
+"""
+Open and query cost of the collection layouts as the session count grows.
+
+    per_session  one collection per session (session_3, ...)
+    single       one shared collection, searches filtered on session_id
+
+For each backend, layout and session count a child process builds the
+store, and a fresh child measures it the way the app sees it after a
+restart:
+
+    startup ms   backend start + the first session's first query
+    reopen ms    get_collection + query on every turn (the old code path)
+    cached ms    query on a cached handle (db/vector_store now)
+
+plus the files and megabytes on disk.
+
+    python -m benchmarks.collection_layout_bench
+    python -m benchmarks.collection_layout_bench --sessions 10,100,500 --backends numpy,chroma
+
+Backends whose dependency is missing (e.g. chromadb) are reported as skipped.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.run_benchmarks import percentile
+from benchmarks.vector_backend_bench import dir_mb
+
+SINGLE = "gemserve_chunks"
+
+
+def store_dir(work: str, backend: str, layout: str, sessions: int) -> str:
+    return os.path.join(work, f"{backend}_{layout}_{sessions}")
+
+
+def open_backend(backend: str, path: str):
+    from db.vector_backends import get_vector_backend
+    return get_vector_backend(backend, path)
+
+
+def child_build(backend: str, layout: str, sessions: int, work: str, chunks: int, dim: int) -> dict:
+    rng = np.random.default_rng(5)
+    store = open_backend(backend, store_dir(work, backend, layout, sessions))
+    start = time.perf_counter()
+    shared = store.create_collection(SINGLE) if layout == "single" else None
+    for session_id in range(1, sessions + 1):
+        vectors = rng.standard_normal((chunks, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        collection = shared or store.create_collection(f"session_{session_id}", metadata={"session_id": session_id})
+        collection.upsert(
+            ids=[f"s{session_id}_c{i}" for i in range(chunks)],
+            embeddings=vectors.tolist() if backend == "chroma" else vectors,
+            documents=[f"chunk {i} of session {session_id}" for i in range(chunks)],
+            metadatas=[{"session_id": session_id, "chunk_index": i} for i in range(chunks)],
+        )
+    return {"build_s": time.perf_counter() - start}
+
+
+def child_serve(backend: str, layout: str, sessions: int, work: str, queries: int, dim: int) -> dict:
+    path = store_dir(work, backend, layout, sessions)
+    rng = random.Random(9)
+    vectors = np.random.default_rng(13).standard_normal((queries, dim)).astype(np.float32)
+    picks = [rng.randint(1, sessions) for _ in range(queries)]
+
+    def name(session_id):
+        return SINGLE if layout == "single" else f"session_{session_id}"
+
+    def search(collection, session_id, vector):
+        where = {"session_id": session_id} if layout == "single" else None
+        result = collection.query(query_embeddings=[vector.tolist()], n_results=8, where=where)
+        assert all(m["session_id"] == session_id for m in result["metadatas"][0])
+
+    start = time.perf_counter()
+    store = open_backend(backend, path)
+    search(store.get_collection(name(picks[0])), picks[0], vectors[0])
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    reopen = []
+    for session_id, vector in zip(picks, vectors):
+        t = time.perf_counter()
+        search(store.get_collection(name(session_id)), session_id, vector)
+        reopen.append(time.perf_counter() - t)
+
+    handles = {}
+    cached = []
+    for session_id, vector in zip(picks, vectors):
+        if name(session_id) not in handles:
+            handles[name(session_id)] = store.get_collection(name(session_id))
+        t = time.perf_counter()
+        search(handles[name(session_id)], session_id, vector)
+        cached.append(time.perf_counter() - t)
+
+    files = sum(len(f) for _, _, f in os.walk(path))
+    return {
+        "startup_ms": startup_ms,
+        "reopen_ms": percentile(reopen, 0.50) * 1000,
+        "cached_ms": percentile(cached, 0.50) * 1000,
+        "files": files,
+        "disk_mb": dir_mb(path),
+    }
+
+
+def run_child(*args) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.collection_layout_bench", "--child", *map(str, args)],
+        capture_output=True, text=True, env={**os.environ, "GEMSERVE_DATA_DIR": args[4]},
+    )
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"error": tail}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collection layout open/query benchmark.")
+    parser.add_argument("--backends", default="numpy,chroma")
+    parser.add_argument("--sessions", default="10,100,300")
+    parser.add_argument("--chunks", type=int, default=200, help="chunks per session")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--child", nargs=5, metavar=("PHASE", "BACKEND", "LAYOUT", "SESSIONS", "WORKDIR"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        phase, backend, layout, sessions, work = args.child
+        if phase == "build":
+            result = child_build(backend, layout, int(sessions), work, args.chunks, args.dim)
+        else:
+            result = child_serve(backend, layout, int(sessions), work, args.queries, args.dim)
+        print(json.dumps(result))
+        return
+
+    work = tempfile.mkdtemp(prefix="gemserve_layoutbench_")
+    try:
+        print(f"{args.chunks} chunks x {args.dim} dims per session, {args.queries} queries on random sessions\n")
+        print(f"{'backend':<8} {'layout':<12} {'sessions':>8} {'build s':>8} {'startup ms':>11} "
+              f"{'reopen ms':>10} {'cached ms':>10} {'files':>6} {'disk MB':>8}")
+        options = ["--chunks", args.chunks, "--dim", args.dim, "--queries", args.queries]
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            for sessions in [int(s) for s in args.sessions.split(",") if s.strip()]:
+                for layout in ("per_session", "single"):
+                    built = run_child("build", backend, layout, sessions, work, *options)
+                    served = run_child("serve", backend, layout, sessions, work, *options) if "error" not in built else built
+                    shutil.rmtree(store_dir(work, backend, layout, sessions), ignore_errors=True)
+                    if "error" in served:
+                        print(f"{backend:<8} {layout:<12} {sessions:>8} skipped: {served['error']}")
+                        continue
+                    print(f"{backend:<8} {layout:<12} {sessions:>8} {built['build_s']:>8.1f} "
+                          f"{served['startup_ms']:>11.1f} {served['reopen_ms']:>10.2f} {served['cached_ms']:>10.2f} "
+                          f"{served['files']:>6} {served['disk_mb']:>8.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/compression_bench.py
+"""
+Compression ratio and latency of query-aware extractive compression
+(RAG_COMPRESSION_TOKENS) against the local Ollama stand-in.
+
+A synthetic report with planted facts is ingested into a throwaway data
+directory; every question asks for one fact. For each budget the RAG
+context is built with and without compression and one chat turn is run,
+with prefill simulated at CPU speed:
+
+    context tok   tokens of retrieved context sent to the model
+    ratio         compressed / uncompressed context
+    compress ms   p50 time of the compression step (cold: sentence
+                  embeddings not cached yet; warm: cached)
+    turn ms       p50 time of the whole turn (retrieval + prompt + model)
+    fact kept     questions whose planted fact is still in the context
+
+    python -m benchmarks.compression_bench [--budgets 800,1500,3000] [--prefill-rate 400]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.mock_ollama import MockOllama
+
+_FILLER = ("the committee reviewed quarterly operations and noted steady progress across "
+           "regional teams while budgets remained within agreed limits for the period").split()
+_THINGS = ["warehouse", "laboratory", "archive", "harbour", "foundry", "observatory",
+           "greenhouse", "depot", "studio", "clinic", "hangar", "library"]
+
+
+def make_document(rng, paragraphs=120):
+    """Filler paragraphs with one planted fact per thing; returns (text, {thing: value})"""
+    facts = {thing: f"{rng.randint(1000, 9999)}-{rng.choice('ABCDEFGH')}" for thing in _THINGS}
+    planted = dict(zip(rng.sample(range(paragraphs), len(_THINGS)), _THINGS))
+    blocks = []
+    for p in range(paragraphs):
+        sentences = [" ".join(rng.choice(_FILLER) for _ in range(rng.randint(10, 22))).capitalize() + "."
+                     for _ in range(8)]
+        if p in planted:
+            thing = planted[p]
+            sentences.insert(rng.randint(0, 8), f"The access code of the {thing} is {facts[thing]}.")
+        blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks), facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budgets", default="800,1500,3000")
+    parser.add_argument("--prefill-rate", type=float, default=400.0,
+                        help="simulated prefill tokens/sec (CPU-class)")
+    args = parser.parse_args()
+
+    mock = MockOllama(prefill_tokens_per_sec=args.prefill_rate).start()
+    os.environ["OLLAMA_BASE_URL"] = mock.url
+    data_dir = tempfile.mkdtemp(prefix="gemserve_compressbench_")
+    os.environ["GEMSERVE_DATA_DIR"] = data_dir
+
+    # Import after the environment points at the mock and the temp data dir
+    from db import database
+    from db import vector_store
+    from db.query_cache import sentence_embeddings
+    from services import chat_service
+    from services import document_summary_service
+    from services.ingestion_pipeline import add_to_library, ingest_file, LIBRARY
+    from utils.helpers import estimate_tokens
+
+    database.init_database()
+    document_summary_service.DOC_SUMMARY_ENABLED = False  # No background model calls during timing
+    text, facts = make_document(random.Random(7))
+    path = os.path.join(data_dir, "report.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    session_id = database.create_session("compression bench")
+    file_id, stored_path, _, _ = add_to_library(session_id, "report.txt", path, "txt")
+    ingest_file(LIBRARY, file_id, "report.txt", stored_path, "txt")
+    questions = [(f"What is the access code of the {thing}?", value) for thing, value in facts.items()]
+
+    def run(budget):
+        chat_service.RAG_COMPRESSION_ENABLED = budget is not None
+        timings = {"compress": [], "turn": []}
+
+        def timed_compress(query, results, sid, **_):
+            start = time.perf_counter()
+            compressed = vector_store.compress_results(query, results, sid, budget=budget)
+            timings["compress"].append(time.perf_counter() - start)
+            return compressed
+
+        chat_service.compress_results = timed_compress
+        tokens, kept = [], 0
+        for query, value in questions:
+            context = chat_service._rag_context_message(session_id, query)
+            content = context["content"] if context else ""
+            tokens.append(estimate_tokens(content))
+            kept += value in content
+            start = time.perf_counter()
+            chat_service.get_chat_response(session_id, query, "thinking")
+            timings["turn"].append(time.perf_counter() - start)
+        # Each question is compressed twice: cold for the context above, warm inside the turn
+        return {
+            "tokens": statistics.mean(tokens),
+            "cold_ms": statistics.median(timings["compress"][::2] or [0]) * 1000,
+            "warm_ms": statistics.median(timings["compress"][1::2] or [0]) * 1000,
+            "turn_ms": statistics.median(timings["turn"]) * 1000,
+            "kept": kept,
+        }
+
+    print(f"{len(questions)} questions, prefill {args.prefill_rate:.0f} tok/s\n")
+    print(f"{'budget':>8} {'context tok':>12} {'ratio':>7} {'cold ms':>8} {'warm ms':>8} "
+          f"{'turn ms':>8} {'fact kept':>10}")
+    try:
+        baseline = run(None)
+        print(f"{'off':>8} {baseline['tokens']:>12.0f} {1:>7.0%} {'-':>8} {'-':>8} "
+              f"{baseline['turn_ms']:>8.0f} {baseline['kept']:>6}/{len(questions)}")
+        for budget in [int(b) for b in args.budgets.split(",") if b.strip()]:
+            sentence_embeddings.clear()
+            r = run(budget)
+            print(f"{budget:>8} {r['tokens']:>12.0f} {r['tokens'] / baseline['tokens']:>7.0%} "
+                  f"{r['cold_ms']:>8.1f} {r['warm_ms']:>8.1f} {r['turn_ms']:>8.0f} "
+                  f"{r['kept']:>6}/{len(questions)}")
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/lexical_bench.py
+"""
+Query latency of the per-session BM25 index.
+
+    python -m benchmarks.lexical_bench --chunks 10000
+
+Builds an index over synthetic chunks with a Zipf-like vocabulary (plus
+invoice numbers and names, the exact-match cases BM25 is there for) and
+times search() over a batch of queries. Target: under 5 ms per query at
+10k chunks.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.run_benchmarks import percentile
+
+
+def synthetic_chunks(n_chunks: int, words_per_chunk: int, vocab_size: int, seed: int = 7):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    chunks = []
+    for i in range(n_chunks):
+        words = rng.choices(vocab, weights=weights, k=words_per_chunk)
+        words += [f"INV-{2020 + i % 5}-{i:05d}", f"Person{i % 997}"]
+        chunks.append(" ".join(words))
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 index query latency.")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=350, help="words per chunk")
+    parser.add_argument("--vocab", type=int, default=30000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMSERVE_DATA_DIR", tempfile.mkdtemp(prefix="gemserve_bench_"))
+    from db.lexical_index import BM25Index
+
+    chunks = synthetic_chunks(args.chunks, args.words, args.vocab)
+    index = BM25Index(os.path.join(os.environ["GEMSERVE_DATA_DIR"], "bench.npz"))
+
+    start = time.perf_counter()
+    index.add([f"chunk_{i}" for i in range(len(chunks))], chunks)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index.search("warmup w1")  # first search builds the postings
+    postings_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index.save()
+    save_s = time.perf_counter() - start
+
+    rng = random.Random(11)
+    queries = []
+    for _ in range(args.queries):
+        i = rng.randrange(args.chunks)
+        common = " ".join(f"w{rng.randrange(50)}" for _ in range(4))
+        query = f"what does INV-{2020 + i % 5}-{i:05d} say about {common} for Person{i % 997}"
+        queries.append((query, f"chunk_{i}"))
+
+    latencies, hits = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        results = index.search(query, n_results=24)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(results) and results[0][0] == expected
+
+    print(f"chunks {args.chunks}, build {build_s:.2f}s, postings {postings_s * 1000:.0f} ms, "
+          f"save {save_s * 1000:.0f} ms, file {os.path.getsize(index.path) / 1e6:.1f} MB")
+    print(f"query p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"exact-id top-1 {hits}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
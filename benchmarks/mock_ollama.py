@@ -0,0 +1,291 @@
+# benchmarks/mock_ollama.py
+"""
+Local stand-in for the Ollama HTTP API, used by the benchmarks.
+
+Covers /api/chat, /api/generate (both with optional NDJSON streaming),
+/api/embeddings, /api/embed, /api/ps and /api/tags. It never loads a model:
+each request sleeps for a simulated prefill and generation time and answers
+with the same JSON shape Ollama uses, including prompt_eval_count.
+
+Like Ollama, it keeps the last rendered prompt per model as a KV prefix
+cache: only the part of the prompt after the longest common prefix with the
+previous request is counted as prefill.
+
+Embeddings are deterministic hashed bag-of-words vectors, so texts that
+share words are close and retrieval quality can be measured offline.
+
+    python -m benchmarks.mock_ollama --port 11434 --gen-rate 30
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _render_chat(messages: list) -> str:
+    """Flatten messages the way a chat template would before tokenizing."""
+    return "".join(f"<{m.get('role')}>\n{m.get('content', '')}\n" for m in messages)
+
+
+def hash_embedding(text: str, dim: int = 256) -> list:
+    """Deterministic unit-length bag-of-words embedding (hashing trick)."""
+    vec = [0.0] * dim
+    for word in _WORD_RE.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class MockOllama:
+    """Configurable fake Ollama server running on a background thread."""
+
+    def __init__(
+        self,
+        prefill_tokens_per_sec: float = 2000.0,
+        gen_tokens_per_sec: float = 200.0,
+        response_tokens: int = 40,
+        base_latency: float = 0.0,
+        embed_latency: float = 0.002,
+        embedding_dim: int = 256,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.gen_tokens_per_sec = gen_tokens_per_sec
+        self.response_tokens = response_tokens
+        self.base_latency = base_latency
+        self.embed_latency = embed_latency
+        self.embedding_dim = embedding_dim
+        self.requests = []
+        self._prefix_cache = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self._prefix_cache.clear()
+
+    # -- simulation ------------------------------------------------------------
+
+    def _prefill(self, model: str, prompt: str) -> tuple[int, int]:
+        """Return (total prompt tokens, tokens that had to be prefilled)."""
+        with self._lock:
+            cached = self._prefix_cache.get(model, "")
+            reused = _common_prefix_len(cached, prompt)
+            self._prefix_cache[model] = prompt
+        total = _estimate_tokens(prompt)
+        return total, max(0, total - _estimate_tokens(prompt[:reused]))
+
+    def _record(self, record: dict):
+        with self._lock:
+            self.requests.append(record)
+
+    def _generation(self, endpoint: str, model: str, prompt: str, stream: bool) -> dict:
+        """Simulate prefill; generation time is spent by the caller."""
+        total, prefilled = self._prefill(model, prompt)
+        prefill_s = prefilled / self.prefill_tokens_per_sec
+        gen_s = self.response_tokens / self.gen_tokens_per_sec
+        time.sleep(self.base_latency + prefill_s)
+        if not stream:
+            time.sleep(gen_s)
+        record = {
+            "endpoint": endpoint,
+            "model": model,
+            "prompt_tokens": total,
+            "prompt_eval_count": prefilled,
+            "prompt_eval_duration": int(prefill_s * 1e9),
+            "eval_count": self.response_tokens,
+            "eval_duration": int(gen_s * 1e9),
+            "model_seconds": self.base_latency + prefill_s + gen_s,
+        }
+        self._record(record)
+        return record
+
+    @staticmethod
+    def _ollama_stats(record: dict) -> dict:
+        keys = ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration")
+        return {k: record[k] for k in keys}
+
+    def _reply_tokens(self) -> list:
+        return ["ok"] * self.response_tokens
+
+    def _stream(self, record: dict, make_chunk):
+        """Yield NDJSON chunks at the configured token rate."""
+        for token in self._reply_tokens():
+            time.sleep(1.0 / self.gen_tokens_per_sec)
+            yield {**make_chunk(token + " "), "done": False}
+        yield {**make_chunk(""), "done": True, **self._ollama_stats(record)}
+
+    def handle_chat(self, body: dict):
+        model = body.get("model", "")
+        stream = body.get("stream", True)
+        record = self._generation("chat", model, _render_chat(body.get("messages", [])), stream)
+        chunk = lambda text: {"model": model, "message": {"role": "assistant", "content": text}}
+        if stream:
+            return self._stream(record, chunk)
+        return {**chunk(" ".join(self._reply_tokens())), "done": True, **self._ollama_stats(record)}
+
+    def handle_generate(self, body: dict):
+        model = body.get("model", "")
+        stream = body.get("stream", True)
+        prompt = body.get("prompt", "")
+        if not prompt:
+            # Empty prompt = load request (used for warm-up); nothing generated
+            time.sleep(self.base_latency)
+            self._record({"endpoint": "load", "model": model, "model_seconds": self.base_latency})
+            return {"model": model, "response": "", "done": True, "done_reason": "load"}
+        record = self._generation("generate", model, prompt, stream)
+        chunk = lambda text: {"model": model, "response": text}
+        if stream:
+            return self._stream(record, chunk)
+        return {**chunk(" ".join(self._reply_tokens())), "done": True, **self._ollama_stats(record)}
+
+    def _embed_many(self, model: str, texts: list) -> list:
+        seconds = self.base_latency + self.embed_latency * len(texts)
+        time.sleep(seconds)
+        self._record({"endpoint": "embed", "model": model, "inputs": len(texts),
+                      "model_seconds": seconds})
+        return [hash_embedding(text, self.embedding_dim) for text in texts]
+
+    def handle_embeddings(self, body: dict) -> dict:
+        """Legacy single-text endpoint used by ollama.embeddings()."""
+        return {"embedding": self._embed_many(body.get("model", ""), [body.get("prompt", "")])[0]}
+
+    def handle_embed(self, body: dict) -> dict:
+        """Batch endpoint used by ollama.embed()."""
+        texts = body.get("input", "")
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        model = body.get("model", "")
+        return {"model": model, "embeddings": self._embed_many(model, texts)}
+
+    def handle_ps(self, body: dict) -> dict:
+        with self._lock:
+            models = sorted({r["model"] for r in self.requests if r.get("model")})
+        return {"models": [{"name": m, "model": m, "size_vram": 0, "expires_at": None} for m in models]}
+
+    def handle_tags(self, body: dict) -> dict:
+        return self.handle_ps(body)
+
+    def model_seconds(self) -> float:
+        """Total simulated model time across recorded requests."""
+        with self._lock:
+            return sum(r.get("model_seconds", 0.0) for r in self.requests)
+
+    # -- HTTP plumbing ---------------------------------------------------------
+
+    def _routes(self) -> dict:
+        return {
+            ("POST", "/api/chat"): self.handle_chat,
+            ("POST", "/api/generate"): self.handle_generate,
+            ("POST", "/api/embeddings"): self.handle_embeddings,
+            ("POST", "/api/embed"): self.handle_embed,
+            ("GET", "/api/ps"): self.handle_ps,
+            ("GET", "/api/tags"): self.handle_tags,
+        }
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method: str):
+                route = mock._routes().get((method, self.path))
+                if route is None:
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                result = route(body)
+                if isinstance(result, dict):
+                    payload = json.dumps(result).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                # Streaming: NDJSON lines until the connection closes
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for chunk in result:
+                    self.wfile.write(json.dumps(chunk).encode() + b"\n")
+                    self.wfile.flush()
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Ollama stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="fixed seconds per request")
+    parser.add_argument("--prefill-rate", type=float, default=2000.0, help="prefill tokens/sec")
+    parser.add_argument("--gen-rate", type=float, default=200.0, help="generated tokens/sec")
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="seconds per embedded text")
+    args = parser.parse_args()
+
+    mock = MockOllama(
+        prefill_tokens_per_sec=args.prefill_rate,
+        gen_tokens_per_sec=args.gen_rate,
+        response_tokens=args.response_tokens,
+        base_latency=args.latency,
+        embed_latency=args.embed_latency,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Mock Ollama listening on {mock.url}")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/pdf_extract_bench.py
+"""
+Pages/sec of the PDF extractors in utils/pdf_extractor on a generated PDF.
+
+The PDF has --pages pages of dense, varied text (about 3,000 characters
+each, like a report). Each mode reads it end to end through
+iter_pdf_pages, pool startup included, and reports throughput and the time
+until the first page was available.
+
+    python -m benchmarks.pdf_extract_bench
+    python -m benchmarks.pdf_extract_bench --pages 1000 --modes pymupdf:1,pymupdf:4,pypdf
+
+A mode is extractor[:workers]; pymupdf uses the process pool when workers
+> 1 and the file has at least PDF_PARALLEL_MIN_PAGES pages.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from utils.config import PDF_EXTRACT_WORKERS
+
+WORDS = (
+    "revenue quarter growth margin forecast customer churn pipeline budget risk "
+    "compliance audit vendor contract renewal headcount hiring roadmap release "
+    "latency throughput incident outage postmortem capacity storage network"
+).split()
+
+
+def make_pdf(path: str, pages: int, seed: int = 3):
+    import pymupdf
+
+    rng = random.Random(seed)
+    document = pymupdf.open()
+    for number in range(pages):
+        sentences = []
+        while sum(len(s) for s in sentences) < 3000:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 20))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        page = document.new_page()
+        page.insert_textbox(pymupdf.Rect(36, 36, 576, 806), f"Page {number + 1}. " + " ".join(sentences), fontsize=8)
+    document.save(path)
+    document.close()
+
+
+def run_mode(mode: str, path: str) -> dict:
+    from utils.pdf_extractor import iter_pdf_pages
+
+    extractor, _, workers = mode.partition(":")
+    start = time.perf_counter()
+    first = None
+    pages = chars = 0
+    for page_number, text, _ in iter_pdf_pages(path, extractor=extractor, workers=int(workers or 1)):
+        if first is None:
+            first = time.perf_counter() - start
+        pages += 1
+        chars += len(text)
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "chars": chars, "seconds": elapsed, "first_ms": (first or 0) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF extraction pages/sec benchmark.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--modes", default=f"pymupdf:1,pymupdf:{max(2, PDF_EXTRACT_WORKERS)},pypdf")
+    parser.add_argument("--pdf", help="benchmark this PDF instead of a generated one")
+    args = parser.parse_args()
+
+    path = args.pdf
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="gemserve_pdfbench_"), "bench.pdf")
+        start = time.perf_counter()
+        make_pdf(path, args.pages)
+        print(f"Generated {args.pages}-page PDF in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 2**20:.1f} MB), {os.cpu_count()} CPUs\n")
+
+    print(f"{'mode':<14} {'pages':>6} {'seconds':>8} {'pages/s':>9} {'first ms':>9} {'chars':>10}")
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        try:
+            r = run_mode(mode, path)
+        except Exception as e:
+            print(f"{mode:<14} skipped: {e}")
+            continue
+        print(f"{mode:<14} {r['pages']:>6} {r['seconds']:>8.2f} {r['pages'] / r['seconds']:>9.0f} "
+              f"{r['first_ms']:>9.1f} {r['chars']:>10}")
+
+    if not args.pdf:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
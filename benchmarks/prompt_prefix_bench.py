@@ -0,0 +1,106 @@
+# benchmarks/prompt_prefix_bench.py
+"""
+Prefill cost of the "legacy" and "stable" prompt layouts over a scripted
+30-turn conversation, measured against the local Ollama stand-in.
+
+    python -m benchmarks.prompt_prefix_bench [--turns 30] [--mode thinking]
+
+Runs against a throwaway data directory; nothing touches data/ or a real
+Ollama server.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.mock_ollama import MockOllama
+
+_QUESTIONS = [
+    "What does the quarterly report say about revenue?",
+    "How did operating costs change compared to last year?",
+    "Summarize the main risks mentioned.",
+    "Which region grew the fastest?",
+    "What is the headcount at the end of the period?",
+    "Explain the change in gross margin.",
+]
+
+
+def _fake_retrieval(turn: int):
+    """Different chunks every turn, like real retrieval over a document."""
+    docs = [f"Section {turn}.{i}: " + ("figures and commentary " * 60) for i in range(3)]
+    return {
+        "documents": [docs],
+        "metadatas": [[{"filename": "report.pdf"} for _ in docs]],
+    }
+
+
+def run_conversation(chat_service, database, layout: str, mode: str, turns: int, with_files: bool, mock):
+    chat_service.PROMPT_LAYOUT = layout
+    turn_box = {"n": 0}
+    chat_service.check_session_has_files = lambda session_id: with_files
+    chat_service.query_relevant_chunks = lambda *a, **k: _fake_retrieval(turn_box["n"])
+
+    session_id = None
+    mock.reset()
+    latencies = []
+    for turn in range(turns):
+        turn_box["n"] = turn
+        query = f"{_QUESTIONS[turn % len(_QUESTIONS)]} (turn {turn})"
+        # Same order as the GUI: the user message is stored before the reply
+        if session_id is None:
+            session_id = database.create_session(query)
+        else:
+            database.save_message(session_id, "user", query)
+        start = time.perf_counter()
+        reply = chat_service.get_chat_response(session_id, query, mode)
+        latencies.append(time.perf_counter() - start)
+        database.save_message(session_id, "assistant", reply)
+
+    chats = [r for r in mock.requests if r["endpoint"] == "chat"]
+    prefill = [r["prompt_eval_count"] for r in chats]
+    prompt = [r["prompt_tokens"] for r in chats]
+    return {
+        "layout": layout,
+        "files": with_files,
+        "prompt_tokens": sum(prompt),
+        "prefill_tokens": sum(prefill),
+        "cache_reuse": 1 - sum(prefill) / max(1, sum(prompt)),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "total_s": sum(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--mode", choices=("fast", "thinking"), default="thinking")
+    parser.add_argument("--prefill-rate", type=float, default=400.0,
+                        help="simulated prefill tokens/sec (CPU-class)")
+    args = parser.parse_args()
+
+    mock = MockOllama(prefill_tokens_per_sec=args.prefill_rate).start()
+    os.environ["OLLAMA_BASE_URL"] = mock.url
+    os.environ["GEMSERVE_DATA_DIR"] = tempfile.mkdtemp(prefix="gemserve_bench_")
+
+    # Import after the environment points at the mock and the temp data dir
+    from db import database
+    from services import chat_service
+
+    database.init_database()
+    print(f"{'layout':<8} {'files':<6} {'prompt tok':>11} {'prefill tok':>12} "
+          f"{'reuse':>7} {'p50 ms':>8} {'total s':>8}")
+    try:
+        for with_files in (False, True):
+            for layout in ("legacy", "stable"):
+                r = run_conversation(chat_service, database, layout, args.mode,
+                                     args.turns, with_files, mock)
+                print(f"{r['layout']:<8} {str(r['files']):<6} {r['prompt_tokens']:>11} "
+                      f"{r['prefill_tokens']:>12} {r['cache_reuse']:>6.0%} "
+                      f"{r['p50_ms']:>8.0f} {r['total_s']:>8.2f}")
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
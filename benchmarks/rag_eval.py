@@ -0,0 +1,345 @@
+# benchmarks/rag_eval.py
+"""
+Offline RAG evaluation: retrieval quality and latency per configuration.
+
+A fixture corpus (documents, questions and the gold passage that answers
+each question) is ingested and queried through GemServe's own code, with
+the local Ollama stand-in as a deterministic embedding model. Every
+configuration runs in a fresh process and data directory, with its
+utils.config overrides applied before anything else is imported, and gets
+one row of the report:
+
+    chunks        chunks indexed
+    ingest MB/s   corpus bytes / ingestion wall time
+    R@k           questions whose gold passage is in the top k passages of
+                  query_relevant_chunks (k = 1, 3 and MAX_RAG_CHUNKS),
+                  ranked with adaptive depth off
+    MRR           mean reciprocal rank of the first passage with the gold
+    in prompt     questions whose gold passage survives into the thinking
+                  prompt (adaptive depth and compression as configured)
+    off-topic     off-topic questions (no gold passage) that still got
+                  retrieved context; adaptive depth should keep this at 0
+    prompt tok    mean tokens of that prompt
+    p50/p95 ms    query_relevant_chunks latency, caches cleared per query
+
+    python -m benchmarks.rag_eval
+    python -m benchmarks.rag_eval --configs "baseline; CHUNK_SIZE=900,CHUNK_OVERLAP=100; MAX_RAG_CHUNKS=4"
+    python -m benchmarks.rag_eval --pipeline legacy --json results.json
+    python -m benchmarks.rag_eval --corpus my_corpus.json
+
+The stand-in embeds bag-of-words hashes, whose cosine similarities run
+lower than a real model's, so thresholds found with it do not carry over
+to embeddinggemma. To calibrate adaptive depth (RAG_ADAPTIVE_DEPTH, off
+by default), sweep RAG_MIN_SIMILARITY over a corpus of your own with
+the real model (--real-embeddings: the Ollama server of utils.config)
+and pick the highest threshold that keeps "in prompt" near R@k while
+"off-topic" stays at 0:
+
+    python -m benchmarks.rag_eval --real-embeddings --corpus my_corpus.json --configs \
+        "RAG_ADAPTIVE_DEPTH=True,RAG_MIN_SIMILARITY=0.2; RAG_ADAPTIVE_DEPTH=True,RAG_MIN_SIMILARITY=0.3"
+
+--pipeline stream (default) ingests like the app: library upload and the
+streaming ingestion_pipeline. --pipeline legacy chunks whole files with
+services/file_processor.process_file and indexes them with
+db/vector_store.add_document_chunks.
+
+The built-in corpus is generated from a fixed seed: documents of
+topic-specific prose with planted facts, near-miss distractors (the same
+entity in another year) and questions that paraphrase the fact. A corpus
+file is JSON:
+
+    {"documents": [{"name": "a.txt", "text": "..."}],
+     "questions": [{"question": "...", "gold": ["passage that answers it"]}]}
+
+A question with an empty gold list is off-topic.
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_TOPICS = {
+    "operations": "warehouse shipments carriers inventory pallets loading schedules routes depots forklifts",
+    "finance": "invoices ledgers forecasts margins accruals auditors receivables payroll quarters budgets",
+    "engineering": "services deployments latency clusters releases incidents pipelines databases caches builds",
+    "people": "onboarding reviews mentoring hiring interviews training offsites teams managers benefits",
+    "security": "badges audits firewalls credentials incidents patches access vendors policies alarms",
+    "facilities": "buildings leases heating lighting parking cafeteria maintenance floors meeting rooms",
+}
+_PLACES = ["northern", "southern", "eastern", "western", "central", "coastal", "harbour", "airport"]
+_NAMES = ["Amina Yusuf", "Bilal Khan", "Chen Wei", "Dara Okafor", "Elena Rossi", "Farid Haddad",
+          "Grace Liu", "Hiro Tanaka", "Ines Costa", "Jonas Berg", "Kavya Rao", "Liam Walsh"]
+
+# (fact sentence, question) templates; {e} is the entity, the rest random
+_FACTS = [
+    ("The {e} budget for {year} was set at {amount} euros.",
+     "How much money was allocated to the {e} in {year}?"),
+    ("{person} has led the {e} team since {year}.",
+     "Who is in charge of the {e} team?"),
+    ("The {e} migration finished on {day} March after {weeks} weeks of work.",
+     "When was the {e} migration completed?"),
+    ("Entering the {e} area requires badge level {level}.",
+     "What badge level do I need for the {e}?"),
+    ("The {e} contract with supplier {supplier} renews every {months} months.",
+     "How often is the {e} supplier contract renewed?"),
+    ("Purchase order {po} covers {months} months of {e} maintenance.",
+     "What does purchase order {po} cover?"),
+]
+# A near miss per budget fact: same entity, different year and amount
+_DISTRACTOR = "The {e} budget for {other_year} was set at {other_amount} euros."
+# Chit-chat that no document answers
+_OFF_TOPIC = ["Hi, how are you today?", "Thanks, that was really helpful!",
+              "Can you write me a short poem about autumn?", "What is your favourite colour?"]
+
+
+def _filler(rng, vocabulary, sentences):
+    words = vocabulary.split() + "the team reported that this quarter and with for across".split()
+    return " ".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(9, 20))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def generate_corpus(seed=7, paragraphs=60, facts_per_doc=8):
+    """Deterministic fixture corpus: {"documents": [...], "questions": [...]}"""
+    rng = random.Random(seed)
+    documents, questions = [], []
+    for topic, vocabulary in _TOPICS.items():
+        planted = {}
+        for n in range(facts_per_doc):
+            entity = f"{_PLACES[n % len(_PLACES)]} {vocabulary.split()[n % 10].rstrip('s')}"
+            fact, question = _FACTS[(n + len(documents)) % len(_FACTS)]
+            values = {
+                "e": entity, "year": rng.randint(2015, 2024), "amount": f"{rng.randint(10, 990)},000",
+                "person": rng.choice(_NAMES), "day": rng.randint(1, 28), "weeks": rng.randint(2, 30),
+                "level": rng.randint(1, 5), "supplier": rng.choice("ABCDEFGH") + str(rng.randint(10, 99)),
+                "months": rng.choice([6, 12, 18, 24, 36]),
+                "po": f"PO-{rng.randint(1000, 9999)}",
+            }
+            values["other_year"], values["other_amount"] = values["year"] - 3, f"{rng.randint(10, 990)},000"
+            sentence = fact.format(**values)
+            planted.setdefault(rng.randrange(paragraphs), []).append(sentence)
+            if "budget" in fact:
+                planted.setdefault(rng.randrange(paragraphs), []).append(_DISTRACTOR.format(**values))
+            questions.append({"question": question.format(**values), "gold": [sentence]})
+
+        blocks = []
+        for p in range(paragraphs):
+            sentences = _filler(rng, vocabulary, rng.randint(5, 9)).split(". ")
+            for sentence in planted.get(p, []):
+                sentences.insert(rng.randint(0, len(sentences)), sentence.rstrip("."))
+            blocks.append(". ".join(s.rstrip(".") for s in sentences) + ".")
+        documents.append({"name": f"{topic}_handbook.txt", "text": "\n\n".join(blocks)})
+    questions.extend({"question": question, "gold": []} for question in _OFF_TOPIC)
+    return {"documents": documents, "questions": questions}
+
+
+def parse_configs(spec):
+    """"baseline; A=1,B=None" -> [("baseline", {}), ("A=1,B=None", {"A": 1, "B": None})]"""
+    configs = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        overrides = {}
+        if part != "baseline":
+            for item in part.split(","):
+                key, _, value = item.partition("=")
+                try:
+                    overrides[key.strip()] = ast.literal_eval(value.strip())
+                except (ValueError, SyntaxError):
+                    overrides[key.strip()] = value.strip()
+        configs.append((part, overrides))
+    return configs
+
+
+def _normalize(text):
+    return " ".join(text.split()).lower()
+
+
+def _first_gold_rank(passages, gold):
+    gold = [_normalize(g) for g in gold]
+    for rank, passage in enumerate(passages, 1):
+        passage = _normalize(passage)
+        if any(g in passage for g in gold):
+            return rank
+    return None
+
+
+# ── Worker: one configuration in its own process ─────────────────────────────
+
+
+def run_config(overrides, corpus, pipeline, embed_latency, real_embeddings=False):
+    """Ingest and query the corpus with overrides applied; the process must be fresh"""
+    from benchmarks.mock_ollama import MockOllama
+
+    mock = None
+    if not real_embeddings:
+        mock = MockOllama(embed_latency=embed_latency).start()
+        os.environ["OLLAMA_BASE_URL"] = mock.url
+    data_dir = tempfile.mkdtemp(prefix="gemserve_rageval_")
+    os.environ["GEMSERVE_DATA_DIR"] = data_dir
+
+    import utils.config as config
+
+    unknown = [key for key in overrides if not hasattr(config, key)]
+    if unknown:
+        raise SystemExit(f"Unknown utils.config settings: {', '.join(unknown)}")
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    config.DOC_SUMMARY_ENABLED = False  # No background model calls while timing
+
+    # Import after the overrides so every module sees them
+    from db import database
+    from db.query_cache import query_embeddings, retrieval_results
+    from db import vector_store
+    from db.vector_store import query_relevant_chunks, add_document_chunks
+    from services import chat_service
+    from services.file_processor import process_file
+    from services.ingestion_pipeline import add_to_library, ingest_file, LIBRARY
+    from utils.helpers import estimate_tokens
+
+    try:
+        database.init_database()
+        session_id = database.create_session("rag eval")
+        corpus_bytes, chunks = 0, 0
+        start = time.perf_counter()
+        for document in corpus["documents"]:
+            path = os.path.join(data_dir, document["name"])
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(document["text"])
+            corpus_bytes += os.path.getsize(path)
+            file_type = document["name"].rsplit(".", 1)[-1]
+            if pipeline == "legacy":
+                file_id = database.save_file_metadata(session_id, document["name"], path, file_type)
+                pieces = process_file(path, file_type)
+                if add_document_chunks(session_id, file_id, document["name"], pieces):
+                    chunks += len(pieces)
+                    database.mark_file_processed(file_id)
+            else:
+                file_id, stored_path, _, _ = add_to_library(session_id, document["name"], path, file_type)
+                chunks += ingest_file(LIBRARY, file_id, document["name"], stored_path, file_type)
+        ingest_seconds = time.perf_counter() - start
+
+        k = config.MAX_RAG_CHUNKS
+        ranks, latencies, prompt_tokens, in_prompt = [], [], [], 0
+        off_topic = [item["question"] for item in corpus["questions"] if not item["gold"]]
+        off_topic_hits = 0
+        for question in off_topic:
+            retrieval_results.clear()
+            results = query_relevant_chunks(
+                session_id, question, n_results=k, mode=config.RAG_RETRIEVAL_MODE
+            )
+            off_topic_hits += bool(results and results["documents"][0])
+        for item in (item for item in corpus["questions"] if item["gold"]):
+            # Ranking quality: the full top k, without adaptive depth cutting it
+            adaptive, vector_store.RAG_ADAPTIVE_DEPTH = vector_store.RAG_ADAPTIVE_DEPTH, False
+            query_embeddings.clear()
+            retrieval_results.clear()
+            start = time.perf_counter()
+            results = query_relevant_chunks(
+                session_id, item["question"], n_results=k, mode=config.RAG_RETRIEVAL_MODE
+            )
+            latencies.append(time.perf_counter() - start)
+            vector_store.RAG_ADAPTIVE_DEPTH = adaptive
+            ranks.append(_first_gold_rank(results["documents"][0] if results else [], item["gold"]))
+
+            messages = chat_service.build_messages_thinking(session_id, item["question"])
+            prompt = "\n".join(message["content"] for message in messages)
+            prompt_tokens.append(estimate_tokens(prompt))
+            in_prompt += _first_gold_rank([prompt], item["gold"]) is not None
+
+        n = len(ranks)
+        ordered = sorted(latencies)
+        return {
+            "chunks": chunks,
+            "corpus_mb": corpus_bytes / 2**20,
+            "ingest_s": ingest_seconds,
+            "ingest_mb_s": corpus_bytes / 2**20 / ingest_seconds,
+            "k": k,
+            "recall_at_1": sum(1 for r in ranks if r and r <= 1) / n,
+            "recall_at_3": sum(1 for r in ranks if r and r <= 3) / n,
+            "recall_at_k": sum(1 for r in ranks if r and r <= k) / n,
+            "mrr": sum(1 / r for r in ranks if r) / n,
+            "in_prompt": in_prompt / n,
+            "off_topic": off_topic_hits / len(off_topic) if off_topic else 0.0,
+            "prompt_tokens": statistics.mean(prompt_tokens),
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": ordered[min(n - 1, int(0.95 * n))] * 1000,
+            "questions": n,
+        }
+    finally:
+        if mock:
+            mock.stop()
+
+
+# ── Driver ────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--configs", default="baseline; CHUNK_SIZE=900,CHUNK_OVERLAP=100; "
+                                             "CHILD_CHUNK_SIZE=None; MAX_RAG_CHUNKS=4",
+                        help='";"-separated configurations of utils.config overrides, "baseline" for none')
+    parser.add_argument("--pipeline", choices=("stream", "legacy"), default="stream")
+    parser.add_argument("--corpus", help="corpus JSON file (default: the generated fixture corpus)")
+    parser.add_argument("--seed", type=int, default=7, help="seed of the generated corpus")
+    parser.add_argument("--paragraphs", type=int, default=60, help="paragraphs per generated document")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="mock seconds per embed request")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="use the Ollama server of utils.config instead of the stand-in")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = json.load(f)
+    else:
+        corpus = generate_corpus(args.seed, args.paragraphs)
+
+    if args.worker:
+        result = run_config(
+            json.loads(args.worker), corpus, args.pipeline, args.embed_latency, args.real_embeddings
+        )
+        print("RESULT " + json.dumps(result))
+        return
+
+    print(f"{len(corpus['documents'])} documents, {len(corpus['questions'])} questions, "
+          f"{args.pipeline} pipeline\n")
+    print(f"{'config':<36} {'chunks':>6} {'MB/s':>6} {'R@1':>5} {'R@3':>5} {'R@k':>8} {'MRR':>5} "
+          f"{'in prompt':>9} {'off-topic':>9} {'prompt tok':>10} {'p50 ms':>7} {'p95 ms':>7}")
+    report = []
+    worker = [sys.executable, "-m", "benchmarks.rag_eval", "--pipeline", args.pipeline, "--seed", str(args.seed),
+              "--paragraphs", str(args.paragraphs), "--embed-latency", str(args.embed_latency)]
+    if args.corpus:
+        worker += ["--corpus", args.corpus]
+    if args.real_embeddings:
+        worker.append("--real-embeddings")
+    for name, overrides in parse_configs(args.configs):
+        command = worker + ["--worker", json.dumps(overrides)]
+        proc = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+        if proc.returncode or not lines:
+            print(f"{name:<36} ❌ failed: {(proc.stderr or proc.stdout).strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(lines[-1][len("RESULT "):])
+        report.append({"config": name, "overrides": overrides, "pipeline": args.pipeline, **r})
+        print(f"{name[:36]:<36} {r['chunks']:>6} {r['ingest_mb_s']:>6.2f} {r['recall_at_1']:>5.0%} "
+              f"{r['recall_at_3']:>5.0%} {r['recall_at_k']:>5.0%}@{r['k']:<2} {r['mrr']:>5.2f} "
+              f"{r['in_prompt']:>9.0%} {r['off_topic']:>9.0%} {r['prompt_tokens']:>10.0f} {r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end latency benchmarks for GemServe's own code paths.
+
+Drives chat_service.get_chat_response, add_document_chunks and
+query_relevant_chunks through scripted workloads against the local Ollama
+stand-in, and reports p50/p95/p99 latency, throughput and allocations.
+The "stream" workload feeds a generated text file through the ingestion
+pipeline and reports time until the first chunks are searchable and peak
+traced memory.
+Because the stand-in reports how much simulated model time each request
+took, the "overhead" column is the time spent in GemServe itself.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --workloads chat,query --gen-rate 50
+
+No network, GPU or real models are needed; all data goes to a temp dir.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.mock_ollama import MockOllama
+
+_TOPICS = ["budget", "hiring", "security", "roadmap", "customers", "infrastructure"]
+
+
+def synthetic_document(doc_no: int, n_chunks: int) -> list:
+    """Chunks with distinct vocabulary so retrieval has something to find."""
+    chunks = []
+    for i in range(n_chunks):
+        topic = _TOPICS[(doc_no + i) % len(_TOPICS)]
+        chunks.append(
+            f"Document {doc_no} section {i} covers {topic}. "
+            + f"The {topic} plan for quarter {i % 4 + 1} lists item {doc_no * 1000 + i}. " * 12
+        )
+    return chunks
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(name: str, mock: MockOllama, ops) -> dict:
+    """Time each (fn, items) op; tracing is off so timings stay clean."""
+    latencies, items = [], 0
+    model_before = mock.model_seconds()
+    for fn, n in ops:
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+        items += n
+    model_seconds = mock.model_seconds() - model_before
+    total = sum(latencies)
+    return {
+        "workload": name,
+        "ops": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throughput": items / total if total else 0.0,
+        "overhead_ms": max(0.0, total - model_seconds) / max(1, len(latencies)) * 1000,
+    }
+
+
+def measure_allocations(ops, limit: int) -> dict:
+    """Peak and retained Python heap per op over the first `limit` ops."""
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for i, (fn, _) in enumerate(ops):
+            if i >= limit:
+                break
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kb": max(peaks, default=0) / 1024,
+        "retained_kb": statistics.mean(retained) / 1024 if retained else 0.0,
+    }
+
+
+# ── Workloads ─────────────────────────────────────────────────────────────────
+# Each workload yields (fn, items) pairs; the same ops feed both passes.
+
+
+def chat_ops(mode: str, turns: int):
+    from db import database
+    from services import chat_service
+
+    session = {"id": None}
+    for turn in range(turns):
+        query = f"Tell me about the {_TOPICS[turn % len(_TOPICS)]} plan (turn {turn})"
+
+        def op(query=query):
+            # Same order as the GUI: store the user message, reply, store reply
+            if session["id"] is None:
+                session["id"] = database.create_session(query)
+            else:
+                database.save_message(session["id"], "user", query)
+            reply = chat_service.get_chat_response(session["id"], query, mode)
+            database.save_message(session["id"], "assistant", reply)
+
+        yield op, 1
+
+
+def ingest_ops(session_id, docs: int, n_chunks: int, first_file_id: int = 1):
+    from db.vector_store import add_document_chunks
+
+    for doc_no in range(docs):
+        chunks = synthetic_document(doc_no, n_chunks)
+
+        def op(doc_no=doc_no, chunks=chunks):
+            if not add_document_chunks(session_id, first_file_id + doc_no, f"doc_{doc_no}.txt", chunks):
+                raise RuntimeError(f"Ingestion failed for synthetic document {doc_no}")
+
+        yield op, len(chunks)
+
+
+def query_ops(session_id, queries: int):
+    from db.vector_store import query_relevant_chunks
+
+    for i in range(queries):
+        query = f"What is the {_TOPICS[i % len(_TOPICS)]} plan for quarter {i % 4 + 1}?"
+        yield (lambda query=query: query_relevant_chunks(session_id, query, n_results=8)), 1
+
+
+def stream_ingest(session_id, size_mb: float) -> dict:
+    """Pipeline a generated text file; report time-to-first-searchable and peak memory."""
+    from db import database
+    from services.ingestion_pipeline import ingest_file
+
+    path = os.path.join(tempfile.mkdtemp(prefix="gemserve_stream_"), "report.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        doc_no = 0
+        while f.tell() < size_mb * 2**20:
+            f.write(" ".join(synthetic_document(doc_no, 20)) + "\n")
+            doc_no += 1
+    file_id = database.save_file_metadata(session_id, "report.txt", path, "txt")
+
+    first = {}
+    start = time.perf_counter()
+
+    def progress(indexed, segment, total):
+        first.setdefault("s", time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        chunks = ingest_file(session_id, file_id, "report.txt", path, "txt", progress_callback=progress)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    total = time.perf_counter() - start
+    return {"size_mb": size_mb, "chunks": chunks, "first_searchable_s": first.get("s", total),
+            "total_s": total, "peak_mb": peak / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GemServe end-to-end latency benchmarks.")
+    parser.add_argument("--workloads", default="chat,ingest,query",
+                        help="comma-separated subset of chat,ingest,query,stream")
+    parser.add_argument("--turns", type=int, default=30, help="chat turns per mode")
+    parser.add_argument("--docs", type=int, default=3, help="documents to ingest")
+    parser.add_argument("--chunks", type=int, default=100, help="chunks per document")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--stream-mb", type=float, default=5.0, help="file size for the stream workload")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock seconds per request")
+    parser.add_argument("--prefill-rate", type=float, default=4000.0)
+    parser.add_argument("--gen-rate", type=float, default=400.0)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--embed-latency", type=float, default=0.001)
+    parser.add_argument("--alloc-ops", type=int, default=3,
+                        help="ops per workload re-run under tracemalloc (0 to skip)")
+    args = parser.parse_args()
+    workloads = {w.strip() for w in args.workloads.split(",") if w.strip()}
+
+    mock = MockOllama(
+        prefill_tokens_per_sec=args.prefill_rate,
+        gen_tokens_per_sec=args.gen_rate,
+        response_tokens=args.response_tokens,
+        base_latency=args.latency,
+        embed_latency=args.embed_latency,
+    ).start()
+    os.environ["OLLAMA_BASE_URL"] = mock.url
+    os.environ["GEMSERVE_DATA_DIR"] = tempfile.mkdtemp(prefix="gemserve_bench_")
+
+    # Import after the environment points at the mock and the temp data dir
+    from db import database
+
+    database.init_database()
+    results = []
+    streamed = None
+    try:
+        if "chat" in workloads:
+            for mode in ("fast", "thinking"):
+                r = measure(f"chat/{mode}", mock, chat_ops(mode, args.turns))
+                r.update(measure_allocations(chat_ops(mode, args.turns), args.alloc_ops))
+                results.append(r)
+        if workloads & {"ingest", "query"}:
+            session_id = database.create_session("retrieval benchmark")
+            alloc_session = database.create_session("allocation pass")
+            r = measure("ingest", mock, ingest_ops(session_id, args.docs, args.chunks))
+            r.update(measure_allocations(
+                ingest_ops(alloc_session, args.docs, args.chunks, first_file_id=args.docs + 1),
+                args.alloc_ops,
+            ))
+            results.append(r)
+            if "query" in workloads:
+                r = measure("query", mock, query_ops(session_id, args.queries))
+                r.update(measure_allocations(query_ops(alloc_session, args.queries), args.alloc_ops))
+                results.append(r)
+        if "stream" in workloads:
+            streamed = stream_ingest(database.create_session("stream benchmark"), args.stream_mb)
+    finally:
+        mock.stop()
+
+    print(f"\n{'workload':<14} {'ops':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'items/s':>9} {'overhead ms':>12} {'peak KB':>9} {'kept KB':>8}")
+    for r in results:
+        print(f"{r['workload']:<14} {r['ops']:>5} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['throughput']:>9.1f} {r['overhead_ms']:>12.2f} "
+              f"{r['peak_kb']:>9.0f} {r['retained_kb']:>8.1f}")
+    if streamed:
+        print(f"\nStreaming ingest of {streamed['size_mb']:.1f} MB: {streamed['chunks']} chunks, "
+              f"first searchable after {streamed['first_searchable_s']:.2f} s, "
+              f"done after {streamed['total_s']:.1f} s, peak traced memory {streamed['peak_mb']:.1f} MB")
+    print(f"\nScheduler: {scheduler_line()}")
+
+
+def scheduler_line() -> str:
+    from services.llm_service import get_scheduler_stats
+
+    stats = get_scheduler_stats()
+    return ", ".join(
+        f"{name} wait p95 {s['queue_wait']['p95_ms']} ms / service p95 {s['service_time']['p95_ms']} ms"
+        for name, s in stats.items() if s["completed"]
+    )
+
+
+if __name__ == "__main__":
+    main()
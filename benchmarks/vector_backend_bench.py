@@ -0,0 +1,187 @@
+# benchmarks/vector_backend_bench.py
+"""
+Compare the vector backends in db/vector_backends on the same corpus.
+
+For each backend a child process builds a collection from a synthetic
+clustered corpus, and a second, fresh child opens it and runs the queries,
+so startup time and resident memory are measured the way the app sees them
+after a restart. Recall@k is against exact float32 search.
+
+    python -m benchmarks.vector_backend_bench
+    python -m benchmarks.vector_backend_bench --chunks 50000 --dim 768 --backends numpy:int8
+
+A backend spec is name[:quantization][:norescore], e.g. numpy:float16 or
+numpy:int8:norescore (search on int8 only, no full-precision re-scoring).
+Backends whose dependency is missing (e.g. chromadb) are reported as skipped.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.run_benchmarks import percentile
+
+
+def clustered_corpus(n: int, dim: int, queries: int, seed: int = 7):
+    """Unit vectors around a few hundred centroids; queries are perturbed chunks."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((max(8, n // 100), dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, len(centroids), n)]
+    vectors += 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(0, n, queries)
+    q = vectors[picks] + 0.2 * rng.standard_normal((queries, dim)).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return vectors, q
+
+
+def exact_top_k(vectors, queries, k: int):
+    sq = np.einsum("ij,ij->i", vectors, vectors)
+    top = []
+    for q in queries:
+        d = sq - 2 * vectors @ q
+        idx = np.argpartition(d, k)[:k]
+        top.append(idx[np.argsort(d[idx])].tolist())
+    return top
+
+
+def rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def dir_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 2**20
+
+
+# ── Child phases ──────────────────────────────────────────────────────────────
+
+
+def open_backend(spec: str, work: str):
+    from db.vector_backends import get_vector_backend
+
+    name, *flags = spec.split(":")
+    options = {}
+    if name == "numpy":
+        options["rescore"] = "norescore" not in flags
+        options["quantization"] = next((f for f in flags if f != "norescore"), None)
+    return get_vector_backend(name, backend_dir(spec, work), **options)
+
+
+def backend_dir(spec: str, work: str) -> str:
+    return os.path.join(work, spec.replace(":", "_"))
+
+
+def child_build(spec: str, work: str, batch: int) -> dict:
+    vectors = np.load(os.path.join(work, "corpus.npy"), mmap_mode="r")
+    start = time.perf_counter()
+    collection = open_backend(spec, work).create_collection("bench")
+    for i in range(0, len(vectors), batch):
+        rows = np.asarray(vectors[i:i + batch])
+        ids = [str(j) for j in range(i, i + len(rows))]
+        collection.add(
+            ids=ids,
+            embeddings=rows.tolist() if spec == "chroma" else rows,
+            documents=[f"chunk {j}" for j in range(i, i + len(rows))],
+            metadatas=[{"chunk_index": j} for j in range(i, i + len(rows))],
+        )
+    return {"build_s": time.perf_counter() - start}
+
+
+def child_serve(spec: str, work: str, k: int) -> dict:
+    data = np.load(os.path.join(work, "queries.npz"))
+    queries, truth = data["queries"], data["truth"]
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    collection = open_backend(spec, work).get_collection("bench")
+    collection.query(query_embeddings=[queries[0].tolist()], n_results=k)
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    latencies, hits = [], 0
+    for q, gold in zip(queries, truth):
+        t = time.perf_counter()
+        result = collection.query(query_embeddings=[q.tolist()], n_results=k, include=["distances"])
+        latencies.append(time.perf_counter() - t)
+        hits += len(set(map(int, result["ids"][0])) & set(gold.tolist()))
+    return {
+        "startup_ms": startup_ms,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        f"recall@{k}": hits / (len(queries) * k),
+        "rss_mb": rss_mb() - base_rss,
+        "disk_mb": dir_mb(backend_dir(spec, work)),
+    }
+
+
+def run_child(*args) -> dict:
+    phase, spec, work = args[:3]
+    env = {**os.environ, "GEMSERVE_DATA_DIR": work, "GEMSERVE_VECTOR_BACKEND": spec.split(":")[0]}
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.vector_backend_bench", "--child", *args],
+        capture_output=True, text=True, env=env,
+    )
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"error": tail}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector backend recall/latency/RSS benchmark.")
+    parser.add_argument("--backends", default="numpy:float16,numpy:int8,numpy:int8:norescore,chroma")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--child", nargs=3, metavar=("PHASE", "BACKEND", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        phase, backend, work = args.child
+        result = child_build(backend, work, args.batch) if phase == "build" else child_serve(backend, work, args.k)
+        print(json.dumps(result))
+        return
+
+    work = tempfile.mkdtemp(prefix="gemserve_vecbench_")
+    try:
+        vectors, queries = clustered_corpus(args.chunks, args.dim, args.queries)
+        np.save(os.path.join(work, "corpus.npy"), vectors)
+        np.savez(os.path.join(work, "queries.npz"), queries=queries,
+                 truth=np.array(exact_top_k(vectors, queries, args.k)))
+        del vectors
+
+        print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries, k={args.k}\n")
+        print(f"{'backend':<22} {'build s':>8} {'startup ms':>11} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'recall':>7} {'RSS MB':>7} {'disk MB':>8}")
+        child_args = ["--k", str(args.k), "--batch", str(args.batch)]
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            built = run_child("build", backend, work, *child_args)
+            served = run_child("serve", backend, work, *child_args) if "error" not in built else built
+            if "error" in served:
+                print(f"{backend:<22} skipped: {served['error']}")
+                continue
+            print(f"{backend:<22} {built['build_s']:>8.1f} {served['startup_ms']:>11.1f} "
+                  f"{served['p50_ms']:>8.2f} {served['p95_ms']:>8.2f} "
+                  f"{served[f'recall@{args.k}']:>7.3f} {served['rss_mb']:>7.1f} {served['disk_mb']:>8.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from .database import (
     mark_file_processed,
     get_session_files,
     check_session_has_files,
+    attach_document,
+    detach_document,
     delete_session
 )
 
@@ -29,6 +31,8 @@ __all__ = [
     'mark_file_processed',
     'get_session_files',
     'check_session_has_files',
+    'attach_document',
+    'detach_document',
     'delete_session',
     'get_or_create_collection',
     'add_document_chunks',
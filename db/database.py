@@ -45,9 +45,94 @@ def init_database():
         )
     """)
     
+    # Rolling conversation summaries (older turns folded into one text)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS session_summaries (
+            session_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Where an unfinished ingestion stopped, so a restart can resume it
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_checkpoints (
+            file_id INTEGER PRIMARY KEY,
+            next_chunk_index INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            chunking TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES uploaded_files(file_id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Precomputed document summaries: whole document + outline, and the
+    # per-section summaries they were reduced from
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS document_summaries (
+            file_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            outline TEXT NOT NULL,
+            model TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES uploaded_files(file_id) ON DELETE CASCADE
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS document_sections (
+            file_id INTEGER NOT NULL,
+            section_index INTEGER NOT NULL,
+            heading TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            page INTEGER,
+            page_end INTEGER,
+            PRIMARY KEY (file_id, section_index),
+            FOREIGN KEY (file_id) REFERENCES uploaded_files(file_id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Documents each session searches: its own uploads and shared library
+    # documents, attached by reference. Older uploads are attached to their session.
+    tables = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS session_documents (
+            session_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            attached_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, file_id),
+            FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+            FOREIGN KEY (file_id) REFERENCES uploaded_files(file_id) ON DELETE CASCADE
+        )
+    """)
+    if "session_documents" not in tables:
+        c.execute("""
+            INSERT OR IGNORE INTO session_documents (session_id, file_id, attached_at)
+            SELECT session_id, file_id, upload_date FROM uploaded_files
+        """)
+    
+    # Chunks already searchable for a file still being ingested
+    file_columns = [row[1] for row in c.execute("PRAGMA table_info(uploaded_files)")]
+    if "indexed_chunks" not in file_columns:
+        c.execute("ALTER TABLE uploaded_files ADD COLUMN indexed_chunks INTEGER DEFAULT 0")
+    
+    # Size, mtime and hash of the indexed bytes, to spot a changed re-upload
+    for column, column_type in (("file_size", "INTEGER"), ("file_mtime", "REAL"), ("content_hash", "TEXT")):
+        if column not in file_columns:
+            c.execute(f"ALTER TABLE uploaded_files ADD COLUMN {column} {column_type}")
+    
+    # Library documents are stored and indexed once, shared by every session
+    if "shared" not in file_columns:
+        c.execute("ALTER TABLE uploaded_files ADD COLUMN shared BOOLEAN DEFAULT 0")
+    
     # Create indexes
     c.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_files_session ON uploaded_files(session_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_files_hash ON uploaded_files(content_hash)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_documents_file ON session_documents(file_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sections_hash ON document_sections(text_hash)")
     
     conn.commit()
     conn.close()
@@ -113,6 +198,8 @@ def delete_session(session_id):
     c = conn.cursor()
     
     c.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+    # Library documents stay in the library; only the references go
+    c.execute("DELETE FROM session_documents WHERE session_id = ?", (session_id,))
     
     conn.commit()
     conn.close()
@@ -137,8 +224,22 @@ def save_message(session_id, role, content):
     # Update session timestamp
     update_session_timestamp(session_id)
 
-def get_session_messages(session_id, limit=None):
-    """Get messages for a specific session"""
+def get_session_message_count(session_id, after_message_id=0):
+    """Count messages stored for a session (optionally only after a message)"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT COUNT(*) FROM messages 
+        WHERE session_id = ? AND message_id > ?
+    """, (session_id, after_message_id))
+    count = c.fetchone()[0]
+    
+    conn.close()
+    return count
+
+def get_session_messages(session_id, limit=None, after_message_id=0):
+    """Get messages for a specific session (optionally only after a message)"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
@@ -146,37 +247,183 @@ def get_session_messages(session_id, limit=None):
         c.execute("""
             SELECT role, content, timestamp 
             FROM messages 
-            WHERE session_id = ? 
+            WHERE session_id = ? AND message_id > ? 
             ORDER BY message_id DESC 
             LIMIT ?
-        """, (session_id, limit))
+        """, (session_id, after_message_id, limit))
         messages = c.fetchall()[::-1]  # Reverse to chronological
     else:
         c.execute("""
             SELECT role, content, timestamp 
             FROM messages 
-            WHERE session_id = ? 
+            WHERE session_id = ? AND message_id > ? 
             ORDER BY message_id ASC
-        """, (session_id,))
+        """, (session_id, after_message_id))
         messages = c.fetchall()
     
     conn.close()
     return messages
 
+def get_messages_with_ids(session_id, after_message_id=0):
+    """Get (message_id, role, content) rows after a message, oldest first"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT message_id, role, content 
+        FROM messages 
+        WHERE session_id = ? AND message_id > ? 
+        ORDER BY message_id ASC
+    """, (session_id, after_message_id))
+    
+    messages = c.fetchall()
+    conn.close()
+    return messages
+
+# ==================== SUMMARY OPERATIONS ====================
+
+def get_session_summary(session_id):
+    """Get (summary, last_message_id) for a session, or (None, 0)"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT summary, last_message_id 
+        FROM session_summaries 
+        WHERE session_id = ?
+    """, (session_id,))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return (row[0], row[1]) if row else (None, 0)
+
+def save_session_summary(session_id, summary, last_message_id):
+    """Store the rolling summary covering messages up to last_message_id"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        INSERT INTO session_summaries (session_id, summary, last_message_id) 
+        VALUES (?, ?, ?) 
+        ON CONFLICT(session_id) DO UPDATE SET 
+            summary = excluded.summary, 
+            last_message_id = excluded.last_message_id, 
+            updated_at = CURRENT_TIMESTAMP
+    """, (session_id, summary, last_message_id))
+    
+    conn.commit()
+    conn.close()
+
+def save_document_summary(file_id, summary, outline, sections, model):
+    """
+    Store a document's summary, outline and section summaries (replacing earlier ones)
+    Args:
+        sections: List of (heading, summary, text_hash, page, page_end)
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("DELETE FROM document_sections WHERE file_id = ?", (file_id,))
+    c.executemany("""
+        INSERT INTO document_sections 
+        (file_id, section_index, heading, summary, text_hash, page, page_end) 
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(file_id, i, *section) for i, section in enumerate(sections)])
+    c.execute("""
+        INSERT INTO document_summaries (file_id, summary, outline, model) 
+        VALUES (?, ?, ?, ?) 
+        ON CONFLICT(file_id) DO UPDATE SET 
+            summary = excluded.summary, 
+            outline = excluded.outline, 
+            model = excluded.model, 
+            created_at = CURRENT_TIMESTAMP
+    """, (file_id, summary, outline, model))
+    
+    conn.commit()
+    conn.close()
+
+def get_document_summaries(file_ids):
+    """{file_id: (summary, outline)} for the files that have been summarized"""
+    file_ids = list(file_ids)
+    if not file_ids:
+        return {}
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute(f"""
+        SELECT file_id, summary, outline 
+        FROM document_summaries 
+        WHERE file_id IN ({", ".join("?" * len(file_ids))})
+    """, file_ids)
+    
+    summaries = {row[0]: (row[1], row[2]) for row in c.fetchall()}
+    conn.close()
+    
+    return summaries
+
+def find_section_summary(text_hash, model):
+    """(heading, summary) of an already summarized section with this text, or None"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT s.heading, s.summary 
+        FROM document_sections s 
+        JOIN document_summaries d ON d.file_id = s.file_id 
+        WHERE s.text_hash = ? AND d.model = ? 
+        LIMIT 1
+    """, (text_hash, model))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return row
+
+def get_files_without_summary():
+    """
+    Indexed files of existing sessions and library documents not summarized yet
+    Returns (file_id, filename, file_path, file_type, indexed_chunks) rows
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT f.file_id, f.filename, f.file_path, f.file_type, f.indexed_chunks 
+        FROM uploaded_files f 
+        WHERE f.is_processed = 1 
+          AND f.file_id NOT IN (SELECT file_id FROM document_summaries) 
+          AND (f.shared = 1 OR f.session_id IN (SELECT session_id FROM chat_sessions)) 
+        ORDER BY f.file_id ASC
+    """)
+    
+    rows = c.fetchall()
+    conn.close()
+    
+    return rows
+
 # ==================== FILE OPERATIONS ====================
 
-def save_file_metadata(session_id, filename, file_path, file_type):
-    """Save uploaded file metadata"""
+def save_file_metadata(session_id, filename, file_path, file_type, shared=False, content_hash=None):
+    """
+    Save uploaded file metadata and attach the file to the session
+    Args:
+        shared: A library document (content-addressed, indexed once for all sessions)
+    """
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     c.execute("""
         INSERT INTO uploaded_files 
-        (session_id, filename, file_path, file_type) 
-        VALUES (?, ?, ?, ?)
-    """, (session_id, filename, file_path, file_type))
+        (session_id, filename, file_path, file_type, shared, content_hash) 
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (session_id, filename, file_path, file_type, int(shared), content_hash))
     
     file_id = c.lastrowid
+    c.execute("""
+        INSERT OR IGNORE INTO session_documents (session_id, file_id) 
+        VALUES (?, ?)
+    """, (session_id, file_id))
     conn.commit()
     conn.close()
     
@@ -196,16 +443,210 @@ def mark_file_processed(file_id):
     conn.commit()
     conn.close()
 
-def get_session_files(session_id):
-    """Get all files for a session"""
+def mark_file_unprocessed(file_id):
+    """Flag a file for (re-)indexing; its existing chunks stay searchable"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        UPDATE uploaded_files 
+        SET is_processed = 0 
+        WHERE file_id = ?
+    """, (file_id,))
+    
+    conn.commit()
+    conn.close()
+
+def find_library_document(content_hash):
+    """
+    Library document with these bytes, from any session
+    Returns (file_id, file_path, is_processed) or None
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT file_id, file_path, is_processed 
+        FROM uploaded_files 
+        WHERE shared = 1 AND content_hash = ? 
+        ORDER BY file_id ASC 
+        LIMIT 1
+    """, (content_hash,))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return row
+
+def find_session_document(session_id, filename):
+    """Library document of this name most recently attached to a session (file_id or None)"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT f.file_id 
+        FROM session_documents d 
+        JOIN uploaded_files f ON f.file_id = d.file_id 
+        WHERE d.session_id = ? AND f.filename = ? AND f.shared = 1 
+        ORDER BY d.attached_at DESC, f.file_id DESC 
+        LIMIT 1
+    """, (session_id, filename))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return row[0] if row else None
+
+def attach_document(session_id, file_id):
+    """Make a library document searchable in a session"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        INSERT OR IGNORE INTO session_documents (session_id, file_id) 
+        VALUES (?, ?)
+    """, (session_id, file_id))
+    
+    conn.commit()
+    conn.close()
+
+def detach_document(session_id, file_id):
+    """Stop searching a document in a session; the library keeps it"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        DELETE FROM session_documents 
+        WHERE session_id = ? AND file_id = ?
+    """, (session_id, file_id))
+    
+    conn.commit()
+    conn.close()
+
+def get_attached_library_files(session_id):
+    """file_ids of the searchable library documents attached to a session"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     c.execute("""
-        SELECT file_id, filename, upload_date, is_processed 
+        SELECT f.file_id 
+        FROM session_documents d 
+        JOIN uploaded_files f ON f.file_id = d.file_id 
+        WHERE d.session_id = ? AND f.shared = 1 
+          AND (f.is_processed = 1 OR f.indexed_chunks > 0) 
+        ORDER BY f.file_id ASC
+    """, (session_id,))
+    
+    file_ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    
+    return file_ids
+
+def get_file_fingerprint(file_id):
+    """
+    Size, mtime and hash of the upload a file record was made from
+    Returns (file_path, file_size, file_mtime, content_hash, is_processed) or None
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT file_path, file_size, file_mtime, content_hash, is_processed 
         FROM uploaded_files 
-        WHERE session_id = ? 
-        ORDER BY upload_date ASC
+        WHERE file_id = ?
+    """, (file_id,))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return row
+
+def delete_unattached_document(file_id):
+    """
+    Delete a library document's record if no session attaches it
+    Returns True if it was deleted (its chunks and file are then unreferenced).
+    Its summary and section summaries are left to the janitor, which deletes
+    them on its next pass; until then a new version's summary reuses them.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        DELETE FROM uploaded_files 
+        WHERE file_id = ? AND shared = 1 
+          AND file_id NOT IN (SELECT file_id FROM session_documents)
+    """, (file_id,))
+    deleted = c.rowcount > 0
+    if deleted:
+        c.execute("DELETE FROM ingestion_checkpoints WHERE file_id = ?", (file_id,))
+    
+    conn.commit()
+    conn.close()
+    
+    return deleted
+
+def update_file_fingerprint(file_id, file_size, file_mtime, content_hash):
+    """Record size, mtime and hash of the upload a file record was made from"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        UPDATE uploaded_files 
+        SET file_size = ?, file_mtime = ?, content_hash = ? 
+        WHERE file_id = ?
+    """, (file_size, file_mtime, content_hash, file_id))
+    
+    conn.commit()
+    conn.close()
+
+def update_file_progress(file_id, indexed_chunks):
+    """Record how many chunks of a file are already searchable"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        UPDATE uploaded_files 
+        SET indexed_chunks = ? 
+        WHERE file_id = ?
+    """, (indexed_chunks, file_id))
+    
+    conn.commit()
+    conn.close()
+
+def get_unprocessed_files():
+    """
+    Library documents and files of existing sessions whose ingestion never finished
+    Returns (file_id, session_id, filename, file_path, file_type, shared) rows
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT f.file_id, f.session_id, f.filename, f.file_path, f.file_type, f.shared 
+        FROM uploaded_files f
+        WHERE f.is_processed = 0 
+          AND (f.shared = 1 OR EXISTS (
+              SELECT 1 FROM chat_sessions s WHERE s.session_id = f.session_id
+          ))
+        ORDER BY f.upload_date ASC
+    """)
+    
+    files = c.fetchall()
+    conn.close()
+    
+    return files
+
+def get_session_files(session_id):
+    """Get all files for a session (its uploads and attached library documents)"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT f.file_id, f.filename, d.attached_at, f.is_processed 
+        FROM session_documents d 
+        JOIN uploaded_files f ON f.file_id = d.file_id 
+        WHERE d.session_id = ? 
+        ORDER BY d.attached_at ASC, f.file_id ASC
     """, (session_id,))
     
     files = c.fetchall()
@@ -214,17 +655,147 @@ def get_session_files(session_id):
     return files
 
 def check_session_has_files(session_id):
-    """Check if session has any processed files"""
+    """Check if session has any processed (or partially indexed) files"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     c.execute("""
         SELECT COUNT(*) 
-        FROM uploaded_files 
-        WHERE session_id = ? AND is_processed = 1
+        FROM session_documents d 
+        JOIN uploaded_files f ON f.file_id = d.file_id 
+        WHERE d.session_id = ? AND (f.is_processed = 1 OR f.indexed_chunks > 0)
     """, (session_id,))
     
     count = c.fetchone()[0]
     conn.close()
     
-    return count > 0
\ No newline at end of file
+    return count > 0
+
+# ==================== INGESTION CHECKPOINTS ====================
+
+def get_ingestion_checkpoint(file_id):
+    """Return (next_chunk_index, content_hash, chunking) or None"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        SELECT next_chunk_index, content_hash, chunking 
+        FROM ingestion_checkpoints 
+        WHERE file_id = ?
+    """, (file_id,))
+    
+    row = c.fetchone()
+    conn.close()
+    
+    return row
+
+def save_ingestion_checkpoint(file_id, next_chunk_index, content_hash, chunking):
+    """Record that chunks before next_chunk_index are durably indexed"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("""
+        INSERT INTO ingestion_checkpoints (file_id, next_chunk_index, content_hash, chunking, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(file_id) DO UPDATE SET
+            next_chunk_index = excluded.next_chunk_index,
+            content_hash = excluded.content_hash,
+            chunking = excluded.chunking,
+            updated_at = CURRENT_TIMESTAMP
+    """, (file_id, next_chunk_index, content_hash, chunking))
+    
+    conn.commit()
+    conn.close()
+
+def clear_ingestion_checkpoint(file_id):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("DELETE FROM ingestion_checkpoints WHERE file_id = ?", (file_id,))
+    
+    conn.commit()
+    conn.close()
+
+# ==================== MAINTENANCE OPERATIONS ====================
+
+def get_session_ids():
+    """Ids of all existing chat sessions"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("SELECT session_id FROM chat_sessions")
+    
+    session_ids = {row[0] for row in c.fetchall()}
+    conn.close()
+    
+    return session_ids
+
+def delete_orphaned_records(min_age_seconds=0):
+    """
+    Delete rows of deleted sessions, and library documents no session
+    attaches any more (uploaded more than min_age_seconds ago)
+    Returns (rows deleted, file_ids of the deleted uploads)
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    deleted = 0
+    for table in ("messages", "session_summaries", "session_documents"):
+        c.execute(f"""
+            DELETE FROM {table} 
+            WHERE session_id NOT IN (SELECT session_id FROM chat_sessions)
+        """)
+        deleted += c.rowcount
+    
+    c.execute("""
+        SELECT file_id 
+        FROM uploaded_files 
+        WHERE (shared = 0 AND session_id NOT IN (SELECT session_id FROM chat_sessions)) 
+           OR (shared = 1 AND upload_date <= datetime('now', ?) 
+               AND file_id NOT IN (SELECT file_id FROM session_documents))
+    """, (f"-{int(min_age_seconds)} seconds",))
+    file_ids = [row[0] for row in c.fetchall()]
+    
+    c.executemany("DELETE FROM uploaded_files WHERE file_id = ?", [(file_id,) for file_id in file_ids])
+    deleted += len(file_ids)
+    for table in ("ingestion_checkpoints", "document_summaries", "document_sections"):
+        c.execute(f"""
+            DELETE FROM {table} 
+            WHERE file_id NOT IN (SELECT file_id FROM uploaded_files)
+        """)
+        deleted += c.rowcount
+    
+    conn.commit()
+    conn.close()
+    
+    return deleted, file_ids
+
+def get_library_file_ids():
+    """file_ids of all library documents"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("SELECT file_id FROM uploaded_files WHERE shared = 1")
+    
+    file_ids = {row[0] for row in c.fetchall()}
+    conn.close()
+    
+    return file_ids
+
+def get_stored_file_paths():
+    """Paths of every upload still referenced by a file record"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute("SELECT DISTINCT file_path FROM uploaded_files")
+    
+    paths = {row[0] for row in c.fetchall()}
+    conn.close()
+    
+    return paths
+
+def vacuum_database():
+    """Return the pages of deleted rows to the file system"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("VACUUM")
+    conn.close()
\ No newline at end of file
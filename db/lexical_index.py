@@ -0,0 +1,298 @@
+# db/lexical_index.py
+"""
+Per-session BM25 index stored next to the Chroma collections.
+
+Dense search misses exact identifiers, names and numbers; BM25 catches them.
+Documents are kept as a sparse term-frequency matrix (CSR rows per chunk)
+and saved as one .npz file per session. For queries the matrix is
+transposed into per-term postings, so scoring a query touches only the
+postings of its terms and is a couple of NumPy calls. Writes do not redo the
+transpose; see BM25Index for how they are folded in.
+"""
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from utils.config import LEXICAL_INDEX_DIR, BM25_K1, BM25_B
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens; keeps numbers and identifier pieces"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, addressable by chunk id
+
+    Rows are append-only. Replacing or removing a chunk marks its row dead
+    through the id -> row map, so a write costs only the chunk's own terms.
+    Postings cover the rows present at the last rebuild; rows added since are
+    kept in small per-term lists and scored alongside them. Queries rebuild
+    the postings (dropping dead rows) once either kind of stale row outgrows
+    the built part, so the rebuild cost is amortized over the writes. Term
+    document frequencies and lengths are updated on every write, so scores
+    stay exact in between.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = []          # per row: chunk id, None once the row is dead
+        self.vocab = {}
+        self._rows = []        # per row: (term indices array, tf array), None once dead
+        self._row_of = {}      # chunk id -> row
+        self._df = np.zeros(0, dtype=np.int64)  # live chunks per term
+        self._doc_len = np.zeros(0, dtype=np.float32)  # per row, 0 for dead rows
+        self._total_len = 0.0
+        self._dead = 0
+        self._postings = None  # (term_ptr, doc_idx, tf) over rows [0, _built)
+        self._built = 0
+        self._recent = {}      # term -> [(row, tf)] for rows added since the build
+        self._masks = {}       # id prefixes -> row mask, for filtered searches
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._row_of
+
+    # -- building ----------------------------------------------------------------
+
+    def add(self, ids, texts):
+        """Add (or replace) chunks"""
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                self._drop(chunk_id)
+                counts = Counter(tokenize(text))
+                terms = np.fromiter(
+                    (self.vocab.setdefault(token, len(self.vocab)) for token in counts),
+                    dtype=np.int32, count=len(counts)
+                )
+                tfs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                row = len(self._rows)
+                self._reserve(row + 1)
+                self.ids.append(chunk_id)
+                self._rows.append((terms, tfs))
+                self._row_of[chunk_id] = row
+                self._df[terms] += 1
+                self._doc_len[row] = length = tfs.sum()
+                self._total_len += float(length)
+                if self._stale():
+                    continue  # the next query rebuilds anyway
+                for term, tf in zip(terms.tolist(), tfs.tolist()):
+                    self._recent.setdefault(term, []).append((row, tf))
+
+    def remove(self, ids):
+        """Drop chunks by id (missing ids are ignored)"""
+        with self._lock:
+            for chunk_id in ids:
+                self._drop(chunk_id)
+
+    def remove_where(self, predicate):
+        """Drop chunks whose id matches predicate(id)"""
+        with self._lock:
+            self.remove([chunk_id for chunk_id in self._row_of if predicate(chunk_id)])
+
+    def _drop(self, chunk_id):
+        row = self._row_of.pop(chunk_id, None)
+        if row is None:
+            return
+        terms, _ = self._rows[row]
+        self._df[terms] -= 1
+        self._total_len -= float(self._doc_len[row])
+        self._doc_len[row] = 0
+        self.ids[row] = None
+        self._rows[row] = None
+        self._dead += 1
+
+    def _reserve(self, n_rows):
+        # Grow the per-row and per-term arrays geometrically
+        if n_rows > len(self._doc_len):
+            doc_len = np.zeros(max(n_rows, 2 * len(self._doc_len), 1024), dtype=np.float32)
+            doc_len[:len(self._doc_len)] = self._doc_len
+            self._doc_len = doc_len
+        if len(self.vocab) > len(self._df):
+            df = np.zeros(max(len(self.vocab), 2 * len(self._df), 1024), dtype=np.int64)
+            df[:len(self._df)] = self._df
+            self._df = df
+
+    def _stale(self):
+        stale = max(len(self._rows) - self._built, self._dead)
+        return self._postings is None or stale > max(1024, self._built)
+
+    def _rebuild(self):
+        # Compact away dead rows, then transpose the rows into per-term postings
+        if self._dead:
+            live = [row for row in range(len(self._rows)) if self._rows[row] is not None]
+            self.ids = [self.ids[row] for row in live]
+            self._rows = [self._rows[row] for row in live]
+            self._row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self._doc_len = np.array([tfs.sum() for _, tfs in self._rows], dtype=np.float32)
+            self._dead = 0
+            self._masks = {}
+        n_terms = len(self.vocab)
+        lengths = np.array([len(terms) for terms, _ in self._rows], dtype=np.int64)
+        if len(self._rows):
+            terms = np.concatenate([terms for terms, _ in self._rows])
+            tfs = np.concatenate([tfs for _, tfs in self._rows])
+        else:
+            terms = np.zeros(0, dtype=np.int32)
+            tfs = np.zeros(0, dtype=np.float32)
+        docs = np.repeat(np.arange(len(self._rows), dtype=np.int32), lengths)
+
+        order = np.argsort(terms, kind="stable")
+        term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=term_ptr[1:])
+        self._postings = (term_ptr, docs[order], tfs[order])
+        self._built = len(self._rows)
+        self._recent = {}
+
+    # -- querying ----------------------------------------------------------------
+
+    def _prefix_mask(self, prefixes):
+        # Cached per prefix tuple and extended over rows added since
+        mask = self._masks.get(prefixes)
+        n_rows = len(self.ids)
+        if mask is None or len(mask) < n_rows:
+            done = 0 if mask is None else len(mask)
+            tail = np.fromiter(
+                (chunk_id is not None and chunk_id.startswith(prefixes)
+                 for chunk_id in self.ids[done:]),
+                dtype=bool, count=n_rows - done
+            )
+            mask = tail if mask is None else np.concatenate([mask, tail])
+            if len(self._masks) >= 32:
+                self._masks.clear()
+            self._masks[prefixes] = mask
+        return mask
+
+    def search(self, query_text, n_results=8, prefixes=None):
+        """
+        Return [(chunk_id, score)] best first
+        Args:
+            prefixes: Tuple of id prefixes (e.g. "file_3_chunk_"); only chunks
+                      whose id starts with one of them are returned
+        """
+        with self._lock:
+            if not self._row_of:
+                return []
+            if self._stale():
+                self._rebuild()
+            term_ptr, post_docs, post_tfs = self._postings
+            n_docs = len(self._row_of)
+            avg_len = self._total_len / n_docs or 1.0
+
+            scores = np.zeros(len(self._rows), dtype=np.float32)
+            for token in set(tokenize(query_text)):
+                term = self.vocab.get(token)
+                if term is None or not self._df[term]:
+                    continue
+                df = self._df[term]
+                idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                parts = []
+                if term < len(term_ptr) - 1:
+                    start, end = term_ptr[term], term_ptr[term + 1]
+                    parts.append((post_docs[start:end], post_tfs[start:end]))
+                recent = self._recent.get(term)
+                if recent:
+                    rows, tfs = zip(*recent)
+                    parts.append((np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32)))
+                for docs, tfs in parts:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[docs] / avg_len)
+                    scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+            if prefixes:
+                scores[~self._prefix_mask(prefixes)] = 0
+            if self._dead:
+                scores[self._doc_len[:len(scores)] == 0] = 0
+            hits = np.flatnonzero(scores)
+            if not len(hits):
+                return []
+            if len(hits) > n_results:
+                hits = hits[np.argpartition(-scores[hits], n_results - 1)[:n_results]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            return [(self.ids[i], float(scores[i])) for i in hits]
+
+    # -- persistence -------------------------------------------------------------
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            live = [row for row in self._rows if row is not None]
+            lengths = np.array([len(terms) for terms, _ in live], dtype=np.int64)
+            indptr = np.zeros(len(live) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            terms = np.concatenate([t for t, _ in live]) if live else np.zeros(0, np.int32)
+            tfs = np.concatenate([f for _, f in live]) if live else np.zeros(0, np.float32)
+            vocab = sorted(self.vocab, key=self.vocab.get)
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                ids=np.array([i for i in self.ids if i is not None], dtype=object),
+                vocab=np.array(vocab, dtype=object),
+                indptr=indptr,
+                terms=terms,
+                tfs=tfs,
+            )
+            os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        with np.load(path, allow_pickle=True) as data:
+            index.ids = data["ids"].tolist()
+            index.vocab = {term: i for i, term in enumerate(data["vocab"].tolist())}
+            indptr, terms, tfs = data["indptr"], data["terms"], data["tfs"]
+            index._rows = [
+                (terms[indptr[i]:indptr[i + 1]], tfs[indptr[i]:indptr[i + 1]])
+                for i in range(len(index.ids))
+            ]
+        index._row_of = {chunk_id: row for row, chunk_id in enumerate(index.ids)}
+        index._reserve(len(index.ids))
+        if len(terms):
+            index._df[:len(index.vocab)] = np.bincount(terms, minlength=len(index.vocab))
+        index._doc_len[:len(index.ids)] = [row_tfs.sum() for _, row_tfs in index._rows]
+        index._total_len = float(index._doc_len.sum())
+        return index
+
+
+# ==================== PER-SESSION REGISTRY ====================
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(name):
+    os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+    return os.path.join(LEXICAL_INDEX_DIR, f"{name}.npz")
+
+
+def get_lexical_index(name):
+    """Loaded BM25 index for a collection name (e.g. session_3), cached"""
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = BM25Index.load(_index_path(name))
+            _indexes[name] = index
+        return index
+
+
+def lexical_index_exists(name):
+    return name in _indexes or os.path.exists(_index_path(name))
+
+
+def delete_lexical_index(name):
+    with _indexes_lock:
+        _indexes.pop(name, None)
+    path = _index_path(name)
+    if os.path.exists(path):
+        os.remove(path)
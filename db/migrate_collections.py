@@ -0,0 +1,130 @@
+# db/migrate_collections.py
+"""
+Move stored chunks between the collection layouts (VECTOR_COLLECTION_LAYOUT).
+
+    python -m db.migrate_collections --to single
+    python -m db.migrate_collections --to per_session
+
+Run it with the app closed. Every chunk is copied with its embedding,
+document and metadata in batches (upserts, so an interrupted run can simply
+be repeated); the counts are checked, then the source collections are
+deleted unless --keep is given. The document library moves with the
+sessions under the session_id "library". BM25 indexes are per session in
+both layouts and are left as they are. Afterwards start the app with
+GEMSERVE_COLLECTION_LAYOUT set to the new layout.
+"""
+import argparse
+
+from db.vector_backends import get_vector_backend
+from utils.config import SINGLE_COLLECTION_NAME, LIBRARY_COLLECTION_NAME
+
+_PREFIX = "session_"
+
+
+def _pages(collection, batch):
+    """All entries of a collection, batch by batch"""
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["documents", "metadatas", "embeddings"], limit=batch, offset=offset
+        )
+        if not len(page["ids"]):
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def _open(backend, name, metadata):
+    try:
+        return backend.get_collection(name)
+    except Exception:
+        return backend.create_collection(name=name, metadata=metadata)
+
+
+def _upsert(collection, ids, embeddings, documents, metadatas):
+    collection.upsert(
+        ids=ids,
+        embeddings=[list(map(float, e)) for e in embeddings],
+        documents=documents,
+        metadatas=metadatas
+    )
+
+
+def to_single(backend, batch, keep):
+    sources = [
+        name for name in backend.list_collections()
+        if name.startswith(_PREFIX) or name == LIBRARY_COLLECTION_NAME
+    ]
+    target = _open(backend, SINGLE_COLLECTION_NAME, {"layout": "single"})
+    for name in sources:
+        source = backend.get_collection(name)
+        session_id = name[len(_PREFIX):] if name.startswith(_PREFIX) else name
+        session_id = int(session_id) if session_id.isdigit() else session_id
+        copied = 0
+        for page in _pages(source, batch):
+            # Searches in the shared collection filter on session_id
+            metadatas = [{**(m or {}), "session_id": (m or {}).get("session_id", session_id)} for m in page["metadatas"]]
+            _upsert(target, page["ids"], page["embeddings"], page["documents"], metadatas)
+            copied += len(page["ids"])
+        if copied != source.count():
+            print(f"❌ {name}: copied {copied} of {source.count()} chunks, keeping it")
+            continue
+        if not keep:
+            backend.delete_collection(name)
+        print(f"✅ {name}: {copied} chunks moved to {SINGLE_COLLECTION_NAME}")
+    print(f"✅ {SINGLE_COLLECTION_NAME} holds {target.count()} chunks")
+
+
+def to_per_session(backend, batch, keep):
+    try:
+        source = backend.get_collection(SINGLE_COLLECTION_NAME)
+    except Exception:
+        print(f"⚠️ {SINGLE_COLLECTION_NAME} does not exist, nothing to migrate")
+        return
+    targets, copied = {}, 0
+    for page in _pages(source, batch):
+        groups = {}
+        for i, metadata in enumerate(page["metadatas"]):
+            groups.setdefault((metadata or {}).get("session_id"), []).append(i)
+        for session_id, rows in groups.items():
+            if session_id is None:
+                print(f"⚠️ Skipping {len(rows)} chunks without a session_id")
+                continue
+            name = LIBRARY_COLLECTION_NAME if session_id == LIBRARY_COLLECTION_NAME else f"{_PREFIX}{session_id}"
+            if name not in targets:
+                targets[name] = _open(backend, name, {"session_id": session_id})
+            _upsert(
+                targets[name],
+                [page["ids"][i] for i in rows],
+                [page["embeddings"][i] for i in rows],
+                [page["documents"][i] for i in rows],
+                [page["metadatas"][i] for i in rows],
+            )
+            copied += len(rows)
+    total = source.count()
+    if copied != total:
+        print(f"❌ Copied {copied} of {total} chunks, keeping {SINGLE_COLLECTION_NAME}")
+        return
+    if not keep:
+        backend.delete_collection(SINGLE_COLLECTION_NAME)
+    print(f"✅ {copied} chunks moved into {len(targets)} session collections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move chunks between vector collection layouts.")
+    parser.add_argument("--to", required=True, choices=["single", "per_session"])
+    parser.add_argument("--backend", help="chroma or numpy (default: VECTOR_BACKEND)")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="leave the source collections in place")
+    args = parser.parse_args()
+
+    backend = get_vector_backend(args.backend)
+    if args.to == "single":
+        to_single(backend, args.batch, args.keep)
+    else:
+        to_per_session(backend, args.batch, args.keep)
+    print(f"Start GemServe with GEMSERVE_COLLECTION_LAYOUT={args.to}")
+
+
+if __name__ == "__main__":
+    main()
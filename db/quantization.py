@@ -0,0 +1,72 @@
+# db/quantization.py
+"""
+Embedding codecs for the NumPy vector backend.
+
+Search runs over the encoded rows; a float32 copy can be kept on disk so the
+best candidates are re-scored at full precision (see NumpyCollection).
+
+    float16  2 bytes per dimension, no scale
+    int8     1 byte per dimension plus one float32 scale per vector
+             (symmetric: x ~= code * scale, scale = max|x| / 127)
+"""
+import numpy as np
+
+
+class Float16Codec:
+    name = "float16"
+    dtype = np.float16
+    has_scales = False
+
+    @staticmethod
+    def encode(vectors):
+        """float32 (n, dim) -> (codes, scales or None)"""
+        return np.asarray(vectors, dtype=np.float32).astype(np.float16), None
+
+    @staticmethod
+    def decode_into(codes, scales, out):
+        """Decode a block of rows into a float32 buffer of the same shape"""
+        out[:] = codes
+        return out
+
+    @staticmethod
+    def dots(codes, scales, query, buffer, out):
+        """out[:] = decoded rows . query, through a reused float32 buffer"""
+        buffer[:] = codes
+        np.dot(buffer, query, out=out)
+
+
+class Int8Codec:
+    name = "int8"
+    dtype = np.int8
+    has_scales = True
+
+    @staticmethod
+    def encode(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def decode_into(codes, scales, out):
+        out[:] = codes
+        out *= scales[:, None]
+        return out
+
+    @staticmethod
+    def dots(codes, scales, query, buffer, out):
+        # Scale after the product: one multiply per row instead of per element
+        buffer[:] = codes
+        np.dot(buffer, query, out=out)
+        out *= scales
+
+
+CODECS = {codec.name: codec for codec in (Float16Codec, Int8Codec)}
+
+
+def get_codec(name):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown vector quantization '{name}' (expected one of {sorted(CODECS)})")
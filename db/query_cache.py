@@ -0,0 +1,89 @@
+# db/query_cache.py
+"""
+In-memory caches for the query path.
+
+Follow-up questions, retries and regenerated answers often repeat a query
+word for word. Query embeddings are kept in an LRU keyed by the embedding
+model and the whitespace-normalized text, and finished retrieval results
+in an LRU keyed by collection, generation and query, so a repeat skips the
+Ollama round trip and the search.
+
+Sentence embeddings used to compress retrieved context are cached the same
+way, keyed by model and text hash, so passages retrieved again are scored
+without re-embedding. Fast-model rewrites of queries (multi-query
+retrieval) are kept by model and question.
+
+Every write to a collection bumps its generation (bump_generation), which
+makes that collection's cached results unreachable; they age out of the
+LRU. Query embeddings do not depend on any collection and stay valid.
+"""
+import threading
+from collections import OrderedDict
+
+from utils.config import (
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RAG_RESULT_CACHE_SIZE,
+    SENTENCE_EMBEDDING_CACHE_SIZE,
+    QUERY_REWRITE_CACHE_SIZE,
+)
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map with hit / miss counts"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0 or value is None:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_embeddings = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+retrieval_results = LRUCache(RAG_RESULT_CACHE_SIZE)
+sentence_embeddings = LRUCache(SENTENCE_EMBEDDING_CACHE_SIZE)
+query_rewrites = LRUCache(QUERY_REWRITE_CACHE_SIZE)
+
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def normalize_query(text):
+    """Cache key form of a query: surrounding and repeated whitespace removed"""
+    return " ".join(text.split())
+
+
+def generation(collection_name):
+    return _generations.get(collection_name, 0)
+
+
+def bump_generation(collection_name):
+    """Mark a collection as changed: its cached retrieval results are stale"""
+    with _generations_lock:
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
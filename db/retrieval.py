@@ -0,0 +1,335 @@
+# db/retrieval.py
+"""Result fusion, re-ranking and compression helpers shared by the retrieval paths."""
+import re
+
+
+def reciprocal_rank_fusion(rankings, k=60, n_results=None):
+    """
+    Fuse several best-first id lists with reciprocal-rank fusion.
+
+    Each list contributes 1 / (k + rank) per id, so an id ranked well by
+    any retriever rises without needing comparable raw scores.
+    Returns [(id, fused_score)] best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return fused[:n_results] if n_results else fused
+
+
+def mmr_select(query_embedding, candidate_embeddings, k, lambda_mult=0.7, relevance=None):
+    """
+    Maximal-marginal-relevance selection over candidate embeddings.
+
+    Greedily picks the candidate maximising
+        lambda * rel(c) - (1 - lambda) * max sim(c, already picked)
+    using one matrix product up front and a running max, so each step is a
+    vectorized O(n) update. rel is cosine similarity to the query unless
+    relevance scores are given (e.g. fused hybrid scores, scaled to max 1).
+    Returns candidate indices in pick order.
+    """
+    import numpy as np
+
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    if n <= k:
+        return list(range(n))
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / (np.linalg.norm(candidates, axis=1, keepdims=True) + 1e-12)
+    query = query / (np.linalg.norm(query) + 1e-12)
+
+    if relevance is None:
+        relevance = candidates @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+        relevance = relevance / (relevance.max() or 1.0)
+    similarity = candidates @ candidates.T
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    picked = []
+
+    for _ in range(k):
+        redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+        score = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        score[~available] = -np.inf
+        best = int(np.argmax(score))
+        picked.append(best)
+        available[best] = False
+        np.maximum(max_sim, similarity[best], out=max_sim)
+    return picked
+
+
+# Words a keyword search matches where embeddings do not: anything with a
+# digit (INV-3321, 2024, v1.2), snake_case names and acronyms (GDPR)
+_EXACT_TERM_RE = re.compile(r"\b(?:\w*\d\w*|[^\W_]+(?:_[^\W_]+)+|[A-Z]{3,})\b")
+
+
+def has_exact_terms(text):
+    """Whether a query names something only an exact match finds (ids, numbers, codes)"""
+    return bool(_EXACT_TERM_RE.search(text or ""))
+
+
+def select_relevant(query_embedding, candidate_embeddings, min_similarity=0.3, min_gap=0.1, keep=()):
+    """
+    Adaptive retrieval depth: the candidates worth sending, in their given order.
+
+    query_embedding may also be several embeddings (a query and its
+    variants); a candidate then scores its best similarity to any of them.
+    Candidates below min_similarity (cosine to the query) are dropped, so
+    nothing is sent when nothing is relevant. Among the rest, sorted by
+    similarity, the largest drop between neighbours is the knee; if it is
+    at least min_gap, everything below it is dropped too. One strong hit
+    followed by noise then sends one chunk, eight close hits send eight.
+    Indices in keep are returned whatever their similarity (e.g. the top
+    keyword matches for an id embeddings do not capture).
+    Returns candidate indices.
+    """
+    import numpy as np
+
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if len(candidates) == 0:
+        return []
+    queries = np.atleast_2d(np.asarray(query_embedding, dtype=np.float32))
+    candidates = candidates / (np.linalg.norm(candidates, axis=1, keepdims=True) + 1e-12)
+    queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+    similarity = (candidates @ queries.T).max(axis=1)
+
+    keep = set(keep)
+    ranked = np.sort(similarity[similarity >= min_similarity])[::-1]
+    if len(ranked) == 0:
+        return sorted(keep)
+    cutoff = ranked[-1]
+    if len(ranked) > 1:
+        gaps = ranked[:-1] - ranked[1:]
+        knee = int(np.argmax(gaps))
+        if gaps[knee] >= min_gap:
+            cutoff = ranked[knee]
+    return [i for i in range(len(candidates)) if similarity[i] >= cutoff or i in keep]
+
+
+def cap_tokens(hits, budget, count_tokens):
+    """
+    Hits, best first, that fit in budget tokens together
+
+    A hit that does not fit is skipped and smaller ones after it are still
+    tried; the best hit is kept even on its own over budget, unless the
+    budget is spent.
+    """
+    if budget <= 0:
+        return []
+    kept, used = [], 0
+    for hit in hits:
+        tokens = count_tokens(hit["document"])
+        if used + tokens <= budget or not kept:
+            kept.append(hit)
+            used += tokens
+    return kept
+
+
+def _join_overlapping(first, second, probe=16):
+    """Concatenate two chunk texts, dropping the prefix of second that repeats first's tail"""
+    head = second[:probe]
+    pos = first.rfind(head) if head else -1
+    while pos != -1:
+        tail = first[pos:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        pos = first.rfind(head, 0, pos)
+    return f"{first}\n{second}"
+
+
+def merge_adjacent_hits(hits):
+    """
+    Merge hits that are consecutive chunks of the same file.
+
+    Chunks overlap by their last sentences, so neighbours are joined into
+    one passage with the repeated text removed. The merged passage takes
+    the position of its best-ranked member; its metadata gains
+    chunk_index_end. Hits without file_id/chunk_index pass through.
+    """
+    groups = {}
+    for rank, hit in enumerate(hits):
+        meta = hit.get("metadata") or {}
+        if "file_id" not in meta or "chunk_index" not in meta:
+            groups[("hit", rank)] = [(rank, None, hit)]
+        else:
+            groups.setdefault(("file", meta["file_id"]), []).append((rank, meta["chunk_index"], hit))
+
+    merged = []
+    for key, members in groups.items():
+        if key[0] == "hit":
+            merged.append(members[0][::2])
+            continue
+        members.sort(key=lambda member: member[1])
+        run = [members[0]]
+        for member in members[1:]:
+            if member[1] == run[-1][1] + 1:
+                run.append(member)
+            else:
+                merged.append(_merge_run(run))
+                run = [member]
+        merged.append(_merge_run(run))
+
+    merged.sort(key=lambda item: item[0])
+    return [hit for _, hit in merged]
+
+
+def _merge_run(run):
+    best_rank = min(rank for rank, _, _ in run)
+    if len(run) == 1:
+        return best_rank, run[0][2]
+    best = min(run, key=lambda member: member[0])[2]
+    return best_rank, _joined_hit(best, [(hit["document"], hit["metadata"]) for _, _, hit in run])
+
+
+def _joined_hit(best, parts):
+    """
+    One hit for consecutive chunks [(document, metadata)] of a file
+
+    Chunks with stream offsets (char_start/char_end) join exactly; older
+    chunks fall back to dropping the overlap found by text matching.
+    """
+    text, end = parts[0]
+    end = end.get("char_end")
+    for document, meta in parts[1:]:
+        start = meta.get("char_start")
+        if end is None or start is None:
+            text = _join_overlapping(text, document)
+        elif start <= end:
+            text += document[end - start:]
+        else:
+            # Only whitespace lies between sentence-aligned chunks
+            text += " " + document
+        end = meta.get("char_end")
+
+    first, last = parts[0][1], parts[-1][1]
+    metadata = {**best["metadata"], "chunk_index": first["chunk_index"], "chunk_index_end": last["chunk_index"]}
+    for key, source in (("char_start", first), ("char_end", last), ("page", first), ("page_end", last)):
+        if key in source:
+            metadata[key] = source[key]
+    return {**best, "document": text, "metadata": metadata}
+
+
+def expand_hits(hits, fetch, mode="window", window=1):
+    """
+    Replace child-chunk hits with the span of text around them.
+
+    Hits whose metadata has parent_index (children of the two-level index)
+    grow to window chunks on each side ("window") or to their parent's
+    chunk range ("parent"). Overlapping or touching spans of a file are
+    merged so every piece of text is sent once; a span takes the position
+    of its best-ranked hit. Other hits pass through.
+
+    Args:
+        fetch: fetch([(file_id, chunk_index)]) -> {(file_id, chunk_index): (document, metadata)}
+               for the chunks that exist
+    """
+    ranked, spans = [], {}
+    for rank, hit in enumerate(hits):
+        meta = hit.get("metadata") or {}
+        if "parent_index" not in meta:
+            ranked.append((rank, hit))
+            continue
+        if mode == "parent":
+            low, high = meta["parent_first"], meta["parent_last"]
+        else:
+            low, high = max(0, meta["chunk_index"] - window), meta["chunk_index"] + window
+        spans.setdefault(meta["file_id"], []).append([low, high, rank, hit])
+
+    merged = []
+    for file_id, ranges in spans.items():
+        ranges.sort(key=lambda span: span[0])
+        current = ranges[0]
+        for span in ranges[1:]:
+            if span[0] <= current[1] + 1:
+                current[1] = max(current[1], span[1])
+                if span[2] < current[2]:
+                    current[2:] = span[2:]
+            else:
+                merged.append((file_id, *current))
+                current = span
+        merged.append((file_id, *current))
+
+    keys = [(file_id, index) for file_id, low, high, _, _ in merged for index in range(low, high + 1)]
+    chunks = fetch(keys) if keys else {}
+    for file_id, low, high, rank, hit in merged:
+        parts = [chunks[(file_id, index)] for index in range(low, high + 1) if (file_id, index) in chunks]
+        ranked.append((rank, _joined_hit(hit, parts) if parts else hit))
+
+    ranked.sort(key=lambda item: item[0])
+    return [hit for _, hit in ranked]
+
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+
+def split_sentences(text):
+    """(start, end) spans of the sentences, and blank-line separated blocks, of a text"""
+    spans, start = [], 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def compress_passages(passages, query_embedding, embed, budget, count_tokens):
+    """
+    Query-aware extractive compression of retrieved passages.
+
+    Every sentence is scored by cosine similarity to the query (one matrix
+    product over the sentence embeddings) and the best sentences are kept,
+    best first, while they fit in budget tokens. Kept sentences stay in
+    document order; "…" marks where text was dropped. A passage with no
+    kept sentence comes back as "".
+
+    Args:
+        embed: embed(sentences) -> array of shape (len(sentences), dim)
+        count_tokens: count_tokens(text) -> int
+    Returns:
+        (compressed passages, tokens kept)
+    """
+    import numpy as np
+
+    spans = [split_sentences(passage) for passage in passages]
+    sentences = [passage[start:end] for passage, passage_spans in zip(passages, spans) for start, end in passage_spans]
+    if not sentences:
+        return list(passages), 0
+
+    vectors = np.asarray(embed(sentences), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    query = np.asarray(query_embedding, dtype=np.float32)
+    scores = vectors @ (query / (np.linalg.norm(query) + 1e-12))
+
+    tokens = [count_tokens(sentence) for sentence in sentences]
+    keep = np.zeros(len(sentences), dtype=bool)
+    used = 0
+    for i in np.argsort(-scores, kind="stable"):
+        if used + tokens[i] <= budget:
+            keep[i] = True
+            used += tokens[i]
+
+    compressed, offset = [], 0
+    for passage, passage_spans in zip(passages, spans):
+        kept = [j for j in range(len(passage_spans)) if keep[offset + j]]
+        offset += len(passage_spans)
+        if not kept:
+            compressed.append("")
+            continue
+        text = "… " if kept[0] > 0 else ""
+        for position, j in enumerate(kept):
+            if position:
+                text += " " if j == kept[position - 1] + 1 else " … "
+            start, end = passage_spans[j]
+            text += passage[start:end].strip()
+        if kept[-1] < len(passage_spans) - 1:
+            text += " …"
+        compressed.append(text)
+    return compressed, used
@@ -0,0 +1,535 @@
+# db/vector_backends.py
+"""
+Vector storage backends behind db/vector_store.
+
+A backend hands out collections by name (session_3, ...). Collections
+expose the subset of the Chroma collection API that GemServe uses - add,
+upsert, query, get, delete, count and name - and return results in Chroma's
+shapes, so vector_store does not care which one is configured.
+
+    chroma  chromadb.PersistentClient (default, existing data)
+    numpy   in-process store: embeddings in memory-mapped float16 or int8
+            matrices (see db/quantization), ids/documents/metadata in a
+            JSON sidecar, blocked BLAS search, optional full-precision
+            re-scoring (VECTOR_RESCORE)
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from utils.config import (
+    VECTOR_BACKEND,
+    VECTOR_INDEX_DIR,
+    VECTOR_SEARCH_BLOCK_ROWS,
+    VECTOR_QUANTIZATION,
+    VECTOR_RESCORE,
+    VECTOR_RESCORE_FACTOR,
+    CHROMA_PERSIST_DIR,
+)
+from db.quantization import get_codec
+
+
+class ChromaBackend:
+    """chromadb.PersistentClient; imported on first use"""
+
+    name = "chroma"
+
+    def __init__(self, path=CHROMA_PERSIST_DIR):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.client = chromadb.PersistentClient(
+            path=path,
+            settings=Settings(anonymized_telemetry=False)
+        )
+
+    def get_collection(self, name):
+        return self.client.get_collection(name)
+
+    def create_collection(self, name, metadata=None):
+        return self.client.create_collection(name=name, metadata=metadata)
+
+    def delete_collection(self, name):
+        self.client.delete_collection(name)
+
+    def list_collections(self):
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+
+
+# ==================== NUMPY BACKEND ====================
+
+def _matches(metadata, where):
+    """Chroma-style metadata filter: equality, $eq/$ne/$in/$nin, $and/$or"""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, c) for c in cond):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            for op, expected in cond.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+    return True
+
+
+def _split_equality(where, rows_with):
+    """
+    Resolve one top-level equality ($eq or $in) clause of a filter through rows_with(key, value)
+
+    Returns (rows or None, rest of the filter still to check per row).
+    """
+    clauses = where["$and"] if list(where) == ["$and"] else [{k: v} for k, v in where.items()]
+    for i, clause in enumerate(clauses):
+        if len(clause) != 1:
+            continue
+        key, cond = next(iter(clause.items()))
+        if key.startswith("$"):
+            continue
+        rest = clauses[:i] + clauses[i + 1:]
+        rest = {"$and": rest} if rest else None
+        if isinstance(cond, dict) and list(cond) == ["$in"]:
+            return sorted({row for value in cond["$in"] for row in rows_with(key, value)}), rest
+        value = cond.get("$eq") if isinstance(cond, dict) and list(cond) == ["$eq"] else cond
+        if isinstance(value, (str, int, float, bool)):
+            return rows_with(key, value), rest
+    return None, where
+
+
+class NumpyCollection:
+    """
+    One collection on disk:
+
+        vectors.f16 / vectors.i8   encoded rows searched at query time
+        scales.f32                 per-row scale (int8 only)
+        vectors.f32                optional full-precision rows, only read
+                                   to re-score the best candidates
+        meta.jsonl                 header line (format, dim), then one
+                                   {id, document, metadata} line per upsert
+
+    The format is fixed when the collection is created; changing
+    VECTOR_QUANTIZATION affects new collections only. The sidecar is
+    append-only, so streaming many small upserts costs O(batch) each;
+    replaying it rebuilds the row order. Deletes compact rows and rewrite
+    the sidecar. Rows are written before their sidecar lines and only rows
+    named in the sidecar are read, so an interrupted write leaves the
+    previous state intact.
+    """
+
+    def __init__(self, path, name, metadata=None, quantization=None, full_precision=None):
+        self.path = path
+        self.name = name
+        self.metadata = metadata or {}
+        self.codec = get_codec(quantization or VECTOR_QUANTIZATION)
+        self.full_precision = VECTOR_RESCORE if full_precision is None else full_precision
+        self.dim = None
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self._row_of = {}
+        self._maps = {}         # file suffix -> np.memmap, reopened after writes
+        self._sq_norms = None   # float32 per row, for L2 distances
+        self._value_rows = {}   # metadata key -> {value: rows}, built lazily for filters
+        self._lock = threading.RLock()
+        self._load()
+
+    # -- persistence -------------------------------------------------------------
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, _META)
+
+    def _files(self):
+        """(suffix, dtype, row width) for every per-row file of this format"""
+        files = [(_SUFFIXES[self.codec.name], self.codec.dtype, self.dim)]
+        if self.codec.has_scales:
+            files.append(("scales.f32", np.float32, 1))
+        if self.full_precision:
+            files.append(("vectors.f32", np.float32, self.dim))
+        return files
+
+    def _header(self):
+        return {
+            "metadata": self.metadata,
+            "quantization": self.codec.name,
+            "full_precision": self.full_precision,
+            "dim": self.dim,
+        }
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        damaged = False
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            self.metadata = header.get("metadata") or self.metadata
+            self.codec = get_codec(header["quantization"])
+            self.full_precision = header["full_precision"]
+            self.dim = header["dim"]
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping damaged sidecar line in {self.name}")
+                    damaged = True
+                    continue
+                if "dim" in record:
+                    self.dim = record["dim"]
+                else:
+                    self._apply(record["id"], record["document"], record["metadata"])
+        if damaged:
+            # Rewrite so later appends do not land on the torn line
+            self._save_meta()
+
+    def _apply(self, chunk_id, document, metadata):
+        """Insert or replace one entry; returns its row"""
+        self._value_rows = {}
+        row = self._row_of.get(chunk_id)
+        if row is None:
+            row = len(self.ids)
+            self._row_of[chunk_id] = row
+            self.ids.append(chunk_id)
+            self.documents.append(document)
+            self.metadatas.append(metadata)
+        else:
+            self.documents[row] = document
+            self.metadatas[row] = metadata
+        return row
+
+    def _save_meta(self):
+        """Rewrite the sidecar from scratch (creation and compaction)"""
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._header()) + "\n")
+            for chunk_id, document, metadata in zip(self.ids, self.documents, self.metadatas):
+                f.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata}) + "\n")
+        os.replace(tmp_path, self._meta_path)
+
+    def _append_meta(self, records):
+        with open(self._meta_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def _map(self, suffix):
+        """Memory-mapped rows of one file; rows beyond len(ids) are ignored"""
+        if not self.ids:
+            return None
+        if suffix not in self._maps:
+            for file_suffix, dtype, width in self._files():
+                if file_suffix == suffix:
+                    shape = (len(self.ids), width) if width > 1 else (len(self.ids),)
+                    self._maps[suffix] = np.memmap(
+                        os.path.join(self.path, suffix), dtype=dtype, mode="r", shape=shape
+                    )
+        return self._maps.get(suffix)
+
+    def _codes(self):
+        return self._map(_SUFFIXES[self.codec.name])
+
+    def _scales(self):
+        return self._map("scales.f32") if self.codec.has_scales else None
+
+    def _blocks(self, rows=None):
+        """Yield (start, codes, scales) over all (or the given) rows, a block at a time"""
+        codes, scales = self._codes(), self._scales()
+        total = len(self.ids) if rows is None else len(rows)
+        for start in range(0, total, VECTOR_SEARCH_BLOCK_ROWS):
+            end = start + VECTOR_SEARCH_BLOCK_ROWS
+            picked = slice(start, end) if rows is None else rows[start:end]
+            yield start, codes[picked], scales[picked] if scales is not None else None
+
+    def _norms(self):
+        if self._sq_norms is None:
+            norms = np.empty(len(self.ids), dtype=np.float32)
+            buffer = np.empty((min(VECTOR_SEARCH_BLOCK_ROWS, len(self.ids)), self.dim), dtype=np.float32)
+            for start, codes, scales in self._blocks():
+                block = self.codec.decode_into(codes, scales, buffer[:len(codes)])
+                norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+            self._sq_norms = norms
+        return self._sq_norms
+
+    def _vectors(self, rows):
+        """float32 rows: full precision when stored, decoded otherwise"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if self.full_precision:
+            return self._read_full_rows(rows)
+        scales = self._scales()
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        return self.codec.decode_into(self._codes()[rows], scales[rows] if scales is not None else None, out)
+
+    def _read_full_rows(self, rows):
+        """
+        Read float32 rows with plain reads rather than through a memmap:
+        page faults on a mapping pull in read-ahead around every row, which
+        would make the full-precision file resident and undo the saving.
+        """
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        row_bytes = self.dim * 4
+        with open(os.path.join(self.path, "vectors.f32"), "rb") as f:
+            for i, row in enumerate(rows):
+                f.seek(int(row) * row_bytes)
+                out[i] = np.frombuffer(f.read(row_bytes), dtype=np.float32)
+        return out
+
+    def _write_rows(self, rows, vectors):
+        """Encode float32 rows and write them at the given positions (may extend the files)"""
+        codes, scales = self.codec.encode(vectors)
+        arrays = {_SUFFIXES[self.codec.name]: codes, "scales.f32": scales, "vectors.f32": vectors}
+        self._maps = {}
+        self._sq_norms = None
+        for suffix, dtype, _ in self._files():
+            data = np.ascontiguousarray(arrays[suffix], dtype=dtype)
+            row_bytes = data[0].nbytes if data.ndim > 1 else data.itemsize
+            path = os.path.join(self.path, suffix)
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                for row, value in zip(rows, data):
+                    f.seek(row * row_bytes)
+                    f.write(value.tobytes())
+
+    # -- Chroma-compatible API ---------------------------------------------------
+
+    def count(self):
+        return len(self.ids)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            records = []
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                records.append({"dim": self.dim})
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match {self.dim}")
+
+            rows = []
+            for i, chunk_id in enumerate(ids):
+                document = documents[i] if documents else None
+                metadata = metadatas[i] if metadatas else None
+                rows.append(self._apply(chunk_id, document, metadata))
+                records.append({"id": chunk_id, "document": document, "metadata": metadata})
+
+            self._write_rows(rows, vectors)
+            self._append_meta(records)
+
+    add = upsert
+
+    def _rows_with(self, key, value):
+        """Rows whose metadata[key] == value, from a per-key index"""
+        index = self._value_rows.get(key)
+        if index is None:
+            index = {}
+            for row, metadata in enumerate(self.metadatas):
+                found = (metadata or {}).get(key)
+                if isinstance(found, (str, int, float, bool)):
+                    index.setdefault(found, []).append(row)
+            self._value_rows[key] = index
+        return index.get(value, [])
+
+    def _select(self, ids=None, where=None):
+        if ids is not None:
+            rows = [self._row_of[i] for i in ids if i in self._row_of]
+        elif where:
+            # An equality clause (e.g. session_id in a shared collection)
+            # narrows the rows through an index instead of a full scan
+            rows, where = _split_equality(where, self._rows_with)
+            if rows is None:
+                rows = range(len(self.ids))
+        else:
+            rows = range(len(self.ids))
+        if where:
+            rows = [r for r in rows if _matches(self.metadatas[r] or {}, where)]
+        return list(rows)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=None):
+        with self._lock:
+            rows = self._select(ids, where)[offset or 0:]
+            if limit:
+                rows = rows[:limit]
+            return {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self.documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [self.metadatas[r] for r in rows] if "metadatas" in include else None,
+                "embeddings": list(self._vectors(rows)) if "embeddings" in include else None,
+            }
+
+    def query(self, query_embeddings, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        with self._lock:
+            allowed = np.asarray(self._select(where=where), dtype=np.int64) if where else None
+            for query in query_embeddings:
+                rows, distances = self._search(np.asarray(query, dtype=np.float32), n_results, allowed)
+                results["ids"].append([self.ids[r] for r in rows])
+                results["documents"].append([self.documents[r] for r in rows])
+                results["metadatas"].append([self.metadatas[r] for r in rows])
+                results["distances"].append([float(d) for d in distances])
+                results["embeddings"].append(
+                    list(self._vectors(rows)) if "embeddings" in include else None
+                )
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key not in include:
+                results[key] = None
+        return results
+
+    def _search(self, query, n_results, allowed=None):
+        """Squared-L2 top-k (Chroma's default space) over all or allowed rows"""
+        if not self.ids or n_results <= 0:
+            return [], []
+        norms = self._norms()
+
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2 on the encoded rows; blocks
+        # are decoded into a reused float32 buffer so the product runs through BLAS
+        if allowed is not None:
+            if not len(allowed):
+                return [], []
+            norms = norms[allowed]
+        rows = np.arange(len(self.ids)) if allowed is None else allowed
+        dots = np.empty(len(rows), dtype=np.float32)
+        buffer = np.empty((min(VECTOR_SEARCH_BLOCK_ROWS, len(rows)), self.dim), dtype=np.float32)
+        for start, codes, scales in self._blocks(allowed):
+            self.codec.dots(codes, scales, query, buffer[:len(codes)], dots[start:start + len(codes)])
+        distances = norms - 2 * dots + float(query @ query)
+
+        # With full-precision rows on disk, shortlist extra candidates on the
+        # encoded distances and re-rank only those exactly
+        k = min(n_results, len(distances))
+        shortlist = min(len(distances), k * VECTOR_RESCORE_FACTOR) if self.full_precision else k
+        top = _smallest(distances, shortlist)
+        if self.full_precision:
+            candidates = np.sort(rows[top])
+            exact = self._vectors(candidates) - query
+            exact = np.einsum("ij,ij->i", exact, exact)
+            best = _smallest(exact, k)
+            return candidates[best].tolist(), exact[best]
+        top = top[:k]
+        return rows[top].tolist(), distances[top]
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            drop = set(self._select(ids, where))
+            if not drop:
+                return
+            keep = np.array([r for r in range(len(self.ids)) if r not in drop], dtype=np.int64)
+            kept = {
+                suffix: np.asarray(self._map(suffix)[keep])
+                for suffix, _, _ in self._files() if suffix != "vectors.f32"
+            }
+            if self.full_precision:
+                kept["vectors.f32"] = self._read_full_rows(keep)
+            self.ids = [self.ids[r] for r in keep]
+            self.documents = [self.documents[r] for r in keep]
+            self.metadatas = [self.metadatas[r] for r in keep]
+            self._row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self._value_rows = {}
+
+            # Compact: write the surviving rows to new files, then swap them in
+            self._maps = {}
+            self._sq_norms = None
+            for suffix, data in kept.items():
+                path = os.path.join(self.path, suffix)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(path + ".tmp", path)
+            self._save_meta()
+
+
+_SUFFIXES = {"float16": "vectors.f16", "int8": "vectors.i8"}
+_META = "meta.jsonl"
+
+
+def _smallest(values, k):
+    """Indices of the k smallest values, ascending"""
+    if k < len(values):
+        top = np.argpartition(values, k - 1)[:k]
+    else:
+        top = np.arange(len(values))
+    return top[np.argsort(values[top], kind="stable")]
+
+
+class NumpyBackend:
+    """Directory of NumpyCollections, one sub-directory per collection"""
+
+    name = "numpy"
+
+    def __init__(self, path=VECTOR_INDEX_DIR, quantization=None, rescore=None):
+        self.path = path
+        self.quantization = quantization
+        self.rescore = rescore
+        self._collections = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _dir(self, name):
+        return os.path.join(self.path, name)
+
+    def get_collection(self, name):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                if not os.path.exists(os.path.join(self._dir(name), _META)):
+                    raise ValueError(f"Collection {name} does not exist.")
+                collection = NumpyCollection(self._dir(name), name)
+                self._collections[name] = collection
+            return collection
+
+    def create_collection(self, name, metadata=None):
+        with self._lock:
+            if name in self._collections or os.path.exists(self._dir(name)):
+                raise ValueError(f"Collection {name} already exists.")
+            collection = NumpyCollection(
+                self._dir(name), name, metadata,
+                quantization=self.quantization, full_precision=self.rescore
+            )
+            os.makedirs(collection.path, exist_ok=True)
+            collection._save_meta()
+            self._collections[name] = collection
+            return collection
+
+    def delete_collection(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+            path = self._dir(name)
+            if not os.path.exists(path):
+                raise ValueError(f"Collection {name} does not exist.")
+            for entry in os.listdir(path):
+                os.remove(os.path.join(path, entry))
+            os.rmdir(path)
+
+    def list_collections(self):
+        return sorted(
+            entry for entry in os.listdir(self.path)
+            if os.path.exists(os.path.join(self._dir(entry), _META))
+        )
+
+
+_BACKENDS = {
+    "chroma": ChromaBackend,
+    "numpy": NumpyBackend,
+}
+
+
+def get_vector_backend(name=None, path=None, **options):
+    """Instantiate the configured (or named) backend; options go to its constructor"""
+    name = name or VECTOR_BACKEND
+    try:
+        backend_class = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown vector backend '{name}' (expected one of {sorted(_BACKENDS)})")
+    if path:
+        options["path"] = path
+    return backend_class(**options)
@@ -1,35 +1,277 @@
 # db/vector_store.py
+import threading
+import time
 
-import chromadb
-from chromadb.config import Settings
-from utils.config import CHROMA_PERSIST_DIR, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
+from utils.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    OLLAMA_BASE_URL,
+    RAG_RETRIEVAL_MODE,
+    RAG_FUSION_CANDIDATES,
+    RAG_RRF_K,
+    RAG_MMR_ENABLED,
+    RAG_MMR_LAMBDA,
+    RAG_MERGE_ADJACENT,
+    RAG_CONTEXT_EXPANSION,
+    RAG_CONTEXT_WINDOW,
+    VECTOR_COLLECTION_LAYOUT,
+    SINGLE_COLLECTION_NAME,
+    LIBRARY_COLLECTION_NAME,
+    RAG_COMPRESSION_TOKENS,
+    RAG_ADAPTIVE_DEPTH,
+    RAG_MIN_SIMILARITY,
+    RAG_SCORE_GAP,
+    RAG_LEXICAL_KEEP,
+    RAG_MULTI_QUERY_MAX,
+    RAG_MULTI_QUERY_SEARCH_SECONDS,
+)
+from db.database import get_attached_library_files
+from db.lexical_index import get_lexical_index, lexical_index_exists, delete_lexical_index
+from db.query_cache import (
+    query_embeddings, retrieval_results, sentence_embeddings, normalize_query, generation, bump_generation
+)
+from db.retrieval import (
+    reciprocal_rank_fusion, mmr_select, select_relevant, has_exact_terms, cap_tokens, merge_adjacent_hits, expand_hits, compress_passages
+)
+from db.vector_backends import get_vector_backend
+from utils.helpers import hash_text, estimate_tokens
+import numpy as np
 import ollama
 
-# Initialize ChromaDB client
-chroma_client = chromadb.PersistentClient(
-    path=CHROMA_PERSIST_DIR,
-    settings=Settings(anonymized_telemetry=False)
-)
+# Chroma or the in-process NumPy store, per VECTOR_BACKEND
+vector_backend = get_vector_backend()
+
+# Owner of the shared document library's chunks, used where a session id
+# is expected (collection, BM25 index, cache generation)
+LIBRARY = LIBRARY_COLLECTION_NAME
+
+# Collection handles by name, opened once per process
+_collections = {}
+_collections_lock = threading.Lock()
+
+# Threads for the variant searches of multi-query retrieval
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+# Same server as the chat calls in services/llm_service
+ollama_client = ollama.Client(host=OLLAMA_BASE_URL)
+
+def _embed(text, priority, session_id):
+    """Embed one text through the shared Ollama scheduler"""
+    # Imported lazily: services imports db, so a top-level import would cycle
+    from services.llm_service import ollama_scheduler
+
+    response = ollama_scheduler.run(
+        ollama_client.embeddings,
+        model=EMBEDDING_MODEL,
+        prompt=text,
+        priority=priority,
+        session_id=session_id
+    )
+    return response['embedding']
+
+def _query_embedding(query_text, session_id):
+    """Embedding of a search query, from the LRU when it was asked before"""
+    key = (EMBEDDING_MODEL, normalize_query(query_text))
+    embedding = query_embeddings.get(key)
+    if embedding is None:
+        embedding = _embed(query_text, "interactive", session_id)
+        query_embeddings.put(key, embedding)
+    return embedding
+
+def _query_embeddings(query_texts, session_id):
+    """Embeddings of several search queries: cached ones from the LRU, the rest in one batch"""
+    keys = [(EMBEDDING_MODEL, normalize_query(text)) for text in query_texts]
+    embeddings = [query_embeddings.get(key) for key in keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        batch = embed_texts([query_texts[i] for i in missing], "interactive", session_id)
+        for i, embedding in zip(missing, batch):
+            if embedding is not None:
+                query_embeddings.put(keys[i], embedding)
+                embeddings[i] = embedding
+    return embeddings
+
+def embed_texts(texts, priority, session_id):
+    """
+    Embed a batch with one /api/embed call; falls back to one request per
+    text if the batch fails. Failed texts come back as None.
+    """
+    from services.llm_service import ollama_scheduler
 
-def get_or_create_collection(session_id):
-    """Get or create a ChromaDB collection for a session"""
-    collection_name = f"session_{session_id}"
-    
     try:
-        collection = chroma_client.get_collection(collection_name)
-        print(f"✅ Loaded existing collection: {collection_name}")
-    except:
-        collection = chroma_client.create_collection(
-            name=collection_name,
-            metadata={"session_id": session_id}
+        response = ollama_scheduler.run(
+            ollama_client.embed,
+            model=EMBEDDING_MODEL,
+            input=list(texts),
+            priority=priority,
+            session_id=session_id
         )
-        print(f"✅ Created new collection: {collection_name}")
+        return list(response['embeddings'])
+    except Exception as e:
+        print(f"⚠️ Batch embedding failed ({e}), embedding one by one")
+    
+    embeddings = []
+    for text in texts:
+        try:
+            embeddings.append(_embed(text, priority, session_id))
+        except Exception as e:
+            print(f"❌ Error generating embedding: {e}")
+            embeddings.append(None)
+            if not any(embeddings):
+                # Nothing has worked yet: Ollama is likely down, skip the rest
+                return embeddings + [None] * (len(texts) - len(embeddings))
+    return embeddings
+
+def upsert_chunks(session_id, file_id, filename, items):
+    """
+    Write embedded chunks of a file straight into the session's stores
+    
+    Args:
+        items: List of (chunk_index, text, embedding, extra_metadata) - extra
+               metadata such as char offsets and pages may be None; ids are
+               file_{file_id}_chunk_{chunk_index}, so rewrites are idempotent
     
-    return collection
+    The BM25 index is updated in memory; call save_lexical_index when done.
+    Returns the number of chunks written.
+    """
+    items = [item for item in items if item[2] is not None]
+    if not items:
+        return 0
+    
+    collection = get_or_create_collection(session_id)
+    lexical = _lexical_index_for(session_id, collection)
+    ids = [f"file_{file_id}_chunk_{index}" for index, _, _, _ in items]
+    collection.upsert(
+        ids=ids,
+        embeddings=[embedding for _, _, embedding, _ in items],
+        documents=[text for _, text, _, _ in items],
+        metadatas=[
+            {
+                "file_id": file_id,
+                "filename": filename,
+                "chunk_index": index,
+                "session_id": session_id,
+                **(extra or {})
+            }
+            for index, _, _, extra in items
+        ]
+    )
+    lexical.add(ids, [text for _, text, _, _ in items])
+    bump_generation(_session_key(session_id))
+    return len(items)
+
+def get_file_chunks(session_id, file_id):
+    """
+    What is already indexed for a file, for diffing a re-upload
+    
+    Returns:
+        ({chunk_index: (chunk_id, text_hash, metadata)}, {text_hash: embedding}).
+        Embeddings are float32 rows, fetched up front because re-indexing
+        overwrites the ids they are stored under.
+    """
+    collection = _get_collection(session_id)
+    if collection is None:
+        return {}, {}
+    
+    stored = collection.get(
+        where=_session_filter(session_id, {"file_id": file_id}),
+        include=["documents", "metadatas", "embeddings"]
+    )
+    if not len(stored["ids"]):
+        return {}, {}
+    
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    positions, embeddings = {}, {}
+    for i, chunk_id in enumerate(stored["ids"]):
+        text_hash = hash_text(stored["documents"][i])
+        metadata = stored["metadatas"][i]
+        positions[metadata["chunk_index"]] = (chunk_id, text_hash, metadata)
+        embeddings[text_hash] = vectors[i]
+    return positions, embeddings
+
+def delete_chunks(session_id, ids):
+    """Remove chunks from the session's vector store and (in memory) BM25 index"""
+    if not ids:
+        return
+    collection = get_or_create_collection(session_id)
+    collection.delete(ids=list(ids))
+    _lexical_index_for(session_id, collection).remove(ids)
+    bump_generation(_session_key(session_id))
+
+def delete_file_chunks(session_id, file_id):
+    """Remove every chunk of a file and save the BM25 index; returns how many"""
+    collection = _get_collection(session_id)
+    if collection is None:
+        return 0
+    ids = [chunk_id for chunk_id, _ in _stored_metadatas(collection, _session_filter(session_id, {"file_id": file_id}))]
+    if ids:
+        delete_chunks(session_id, ids)
+        save_lexical_index(session_id)
+    return len(ids)
+
+def save_lexical_index(session_id):
+    get_lexical_index(_session_key(session_id)).save()
+
+def restore_lexical_chunks(session_id, file_id):
+    """
+    Re-add the stored chunks of a file that the BM25 index lacks, e.g. after a
+    crash mid-file (the index is saved once per file); returns how many
+    """
+    collection = _get_collection(session_id)
+    if collection is None:
+        return 0
+    lexical = _lexical_index_for(session_id, collection)
+    where = _session_filter(session_id, {"file_id": file_id})
+    missing = [chunk_id for chunk_id, _ in _stored_metadatas(collection, where) if chunk_id not in lexical]
+    if missing:
+        stored = collection.get(ids=missing, include=["documents"])
+        lexical.add(stored["ids"], stored["documents"])
+    return len(missing)
+
+def _session_key(session_id):
+    """Name of a session's (or the library's) BM25 index and cache generation, in either layout"""
+    return LIBRARY if session_id == LIBRARY else f"session_{session_id}"
+
+def _collection_name(session_id):
+    if VECTOR_COLLECTION_LAYOUT == "single":
+        return SINGLE_COLLECTION_NAME
+    return _session_key(session_id)
+
+def _session_filter(session_id, where=None):
+    """Metadata filter that keeps a search in the shared collection to one session"""
+    if VECTOR_COLLECTION_LAYOUT != "single":
+        return where
+    scope = {"session_id": session_id}
+    return {"$and": [scope, where]} if where else scope
+
+def _get_collection(session_id, create=False):
+    """Cached handle of the collection holding a session's chunks (None if missing)"""
+    name = _collection_name(session_id)
+    with _collections_lock:
+        collection = _collections.get(name)
+        if collection is None:
+            try:
+                collection = vector_backend.get_collection(name)
+            except Exception:
+                if not create:
+                    return None
+                single = VECTOR_COLLECTION_LAYOUT == "single"
+                collection = vector_backend.create_collection(
+                    name=name,
+                    metadata={"layout": "single"} if single else {"session_id": session_id}
+                )
+                print(f"✅ Created new collection: {name}")
+            _collections[name] = collection
+        return collection
+
+def get_or_create_collection(session_id):
+    """Get or create the vector collection for a session"""
+    return _get_collection(session_id, create=True)
 
 def add_document_chunks(session_id, file_id, filename, chunks, progress_callback=None):
     """
-    Add document chunks to ChromaDB with batched embedding generation
+    Add document chunks to the vector store with batched embedding generation
     
     Args:
         session_id: Chat session ID
@@ -63,11 +305,8 @@ def add_document_chunks(session_id, file_id, filename, chunks, progress_callback
             for i, chunk in enumerate(batch):
                 chunk_index = batch_start + i
                 try:
-                    embedding_response = ollama.embeddings(
-                        model=EMBEDDING_MODEL,
-                        prompt=chunk
-                    )
-                    embeddings.append(embedding_response['embedding'])
+                    # Ingestion is background work: it yields to chat
+                    embeddings.append(_embed(chunk, "background", session_id))
                     
                     # Call progress callback
                     if progress_callback:
@@ -122,6 +361,12 @@ def add_document_chunks(session_id, file_id, filename, chunks, progress_callback
             ids=ids
         )
         
+        # Keep the BM25 index in step with the collection
+        lexical = _lexical_index_for(session_id, collection)
+        lexical.add(ids, valid_chunks)
+        lexical.save()
+        bump_generation(_session_key(session_id))
+        
         print(f"✅ Added {len(valid_chunks)} chunks from {filename} to session {session_id}")
         if failed_chunks:
             print(f"⚠️ {len(failed_chunks)} chunks failed to process")
@@ -131,37 +376,407 @@ def add_document_chunks(session_id, file_id, filename, chunks, progress_callback
         print(f"❌ Error adding chunks to collection: {e}")
         return False
 
-def query_relevant_chunks(session_id, query_text, n_results=8):
-    """Query relevant document chunks for a session"""
-    collection_name = f"session_{session_id}"
+def _lexical_index_for(session_id, collection):
+    """BM25 index for a session, backfilled from the vector store for older sessions"""
+    name = _session_key(session_id)
+    if not lexical_index_exists(name) and collection.count() > 0:
+        stored = collection.get(where=_session_filter(session_id), include=["documents"])
+        lexical = get_lexical_index(name)
+        lexical.add(stored["ids"], stored["documents"])
+        lexical.save()
+        print(f"✅ Built lexical index for {name} ({len(lexical)} chunks)")
+    return get_lexical_index(name)
+
+def _search_sources(session_id, attached):
+    """
+    What a session searches, as (collection, where, BM25 index, id prefixes):
+    its own collection (uploads from before the library) and the library
+    documents attached to it
+    """
+    sources = []
+    own = _get_collection(session_id)
+    lexical = _lexical_index_for(session_id, own) if own is not None else None
+    if lexical:
+        # Skipped when empty, e.g. the shared collection of the single layout
+        sources.append((own, _session_filter(session_id), lexical, None))
+    library = _get_collection(LIBRARY) if attached else None
+    if library is not None:
+        sources.append((
+            library,
+            _session_filter(LIBRARY, {"file_id": {"$in": list(attached)}}),
+            _lexical_index_for(LIBRARY, library),
+            tuple(f"file_{file_id}_chunk_" for file_id in attached),
+        ))
+    return sources
+
+def _dense_hits(sources, query_embedding, n, with_embeddings=False):
+    """Top-n vector matches over all sources as a best-first list of hit dicts"""
+    include = ["documents", "metadatas", "distances"]
+    if with_embeddings:
+        include.append("embeddings")
+    hits = []
+    for collection, where, _, _ in sources:
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=min(n, max(1, collection.count())),
+            where=where,
+            include=include
+        )
+        embeddings = results.get("embeddings")
+        hits.extend(
+            {
+                "id": chunk_id,
+                "document": results["documents"][0][i],
+                "metadata": results["metadatas"][0][i],
+                "distance": results["distances"][0][i],
+                "embedding": embeddings[0][i] if with_embeddings else None,
+            }
+            for i, chunk_id in enumerate(results["ids"][0])
+        )
+    # One embedding model everywhere, so distances compare across sources
+    hits.sort(key=lambda hit: hit["distance"])
+    return hits[:n]
+
+def _hybrid_hits(sources, query_text, query_embedding, n, with_embeddings=False):
+    """BM25 + dense candidates fused with RRF; hits carry their BM25 rank (lexical_rank, or None)"""
+    dense = _dense_hits(sources, query_embedding, n, with_embeddings)
+    lexical = sorted(
+        (
+            (chunk_id, score, collection)
+            for collection, _, index, prefixes in sources
+            for chunk_id, score in index.search(query_text, n_results=n, prefixes=prefixes)
+        ),
+        key=lambda hit: hit[1],
+        reverse=True
+    )[:n]
+    
+    fused = reciprocal_rank_fusion(
+        [[hit["id"] for hit in dense], [chunk_id for chunk_id, _, _ in lexical]],
+        k=RAG_RRF_K,
+        n_results=n
+    )
+    
+    # Lexical-only hits are not in the dense results; fetch what they lack
+    known = {hit["id"]: hit for hit in dense}
+    wanted = {chunk_id for chunk_id, _ in fused if chunk_id not in known}
+    missing = {}
+    for chunk_id, _, collection in lexical:
+        if chunk_id in wanted:
+            missing.setdefault(id(collection), (collection, []))[1].append(chunk_id)
+    include = ["documents", "metadatas"] + (["embeddings"] if with_embeddings else [])
+    for collection, ids in missing.values():
+        stored = collection.get(ids=ids, include=include)
+        for i, chunk_id in enumerate(stored["ids"]):
+            known[chunk_id] = {
+                "id": chunk_id,
+                "document": stored["documents"][i],
+                "metadata": stored["metadatas"][i],
+                "distance": None,
+                "embedding": stored["embeddings"][i] if with_embeddings else None,
+            }
+    
+    lexical_ranks = {chunk_id: rank for rank, (chunk_id, _, _) in enumerate(lexical)}
+    hits = []
+    for chunk_id, score in fused:
+        if chunk_id in known:
+            hits.append({**known[chunk_id], "fusion_score": score, "lexical_rank": lexical_ranks.get(chunk_id)})
+    return hits
+
+def _search_hits(sources, query_text, query_embedding, mode, n, with_embeddings=False):
+    if mode == "hybrid":
+        return _hybrid_hits(sources, query_text, query_embedding, n, with_embeddings)
+    return _dense_hits(sources, query_embedding, n, with_embeddings)
+
+def _get_search_pool():
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _search_pool = ThreadPoolExecutor(max_workers=RAG_MULTI_QUERY_MAX, thread_name_prefix="rag-search")
+        return _search_pool
+
+def _multi_query_hits(sources, query_text, query_embedding, variants, mode, n, with_embeddings=False):
+    """
+    Search the question and its variants [(text, embedding)] in parallel
+    and fuse the rankings with RRF
+    
+    The question is searched on the calling thread, so a busy pool never
+    delays it. Variant searches not finished RAG_MULTI_QUERY_SEARCH_SECONDS
+    after the start (or once the question's search is done, if later) are
+    left out of this turn.
+    """
+    from concurrent.futures import wait
+    
+    start = time.perf_counter()
+    pool = _get_search_pool()
+    futures = [
+        pool.submit(_search_hits, sources, text, embedding, mode, n, with_embeddings)
+        for text, embedding in variants
+    ]
+    rankings = [_search_hits(sources, query_text, query_embedding, mode, n, with_embeddings)]
+    done, _ = wait(futures, timeout=max(0.0, RAG_MULTI_QUERY_SEARCH_SECONDS - (time.perf_counter() - start)))
+    skipped = 0
+    for future in futures:
+        if future in done and future.exception() is None:
+            rankings.append(future.result())
+        else:
+            skipped += 1
+    if skipped:
+        print(f"⚠️ {skipped} of {len(futures)} query variants skipped (latency budget)")
+    
+    known, lexical_ranks = {}, {}
+    for hits in rankings:
+        for hit in hits:
+            known.setdefault(hit["id"], hit)
+            if hit.get("lexical_rank") is not None:
+                lexical_ranks[hit["id"]] = min(hit["lexical_rank"], lexical_ranks.get(hit["id"], hit["lexical_rank"]))
+    fused = reciprocal_rank_fusion([[hit["id"] for hit in hits] for hits in rankings], k=RAG_RRF_K, n_results=n)
+    return [
+        {**known[chunk_id], "fusion_score": score, "lexical_rank": lexical_ranks.get(chunk_id)}
+        for chunk_id, score in fused
+    ]
+
+def _chunk_fetcher(sources):
+    """fetch() for expand_hits: stored chunks by (file_id, chunk_index)"""
+    def fetch(keys):
+        ids = [f"file_{file_id}_chunk_{index}" for file_id, index in keys]
+        found = {}
+        for collection in {id(source[0]): source[0] for source in sources}.values():
+            stored = collection.get(ids=ids, include=["documents", "metadatas"])
+            for document, meta in zip(stored["documents"], stored["metadatas"]):
+                found[(meta["file_id"], meta["chunk_index"])] = (document, meta)
+        return found
+    return fetch
+
+def _to_results(hits):
+    """Hit dicts back into Chroma's nested query-result shape"""
+    return {
+        "ids": [[hit["id"] for hit in hits]],
+        "documents": [[hit["document"] for hit in hits]],
+        "metadatas": [[hit["metadata"] for hit in hits]],
+        "distances": [[hit.get("distance") for hit in hits]],
+    }
+
+def _within_budget(hits, token_budget):
+    return hits if token_budget is None else cap_tokens(hits, token_budget, estimate_tokens)
+
+def query_relevant_chunks(session_id, query_text, n_results=8, mode=None, token_budget=None, variants=()):
+    """
+    Query relevant document chunks for a session
+    
+    Args:
+        n_results: Most chunks to return; with RAG_ADAPTIVE_DEPTH fewer (or
+                   none) when the rest score too low
+        mode: "dense" (vector only) or "hybrid" (BM25 + vector, RRF);
+              defaults to RAG_RETRIEVAL_MODE
+        token_budget: Optional cap on the tokens of the returned passages
+        variants: Extra phrasings of the query (multi-query retrieval), e.g.
+                  from services.query_expansion.expand_query; embedded in one
+                  batch, searched in parallel and fused with the query's hits
+    
+    The session's own collection and the library documents attached to it
+    are searched together.
+    
+    Results are cached per session until its collection, the library or its
+    attachments change, and query embeddings are cached by text, so a
+    repeated query does not call Ollama.
+    
+    Candidates are re-ranked with MMR so near-duplicate (overlapping)
+    chunks are not all sent. Small child chunks are then expanded to their
+    neighbours or parent (RAG_CONTEXT_EXPANSION), and neighbouring chunks of
+    the same file are merged into one passage without repeated text.
+    
+    An empty result means the session has documents but none is relevant.
+    """
+    session_key = _session_key(session_id)
+    mode = mode or RAG_RETRIEVAL_MODE
+    attached = tuple(get_attached_library_files(session_id))
+    cache_key = (
+        session_key, generation(session_key), attached, generation(LIBRARY) if attached else 0,
+        normalize_query(query_text), tuple(variants), n_results, mode,
+        RAG_MMR_ENABLED, RAG_MERGE_ADJACENT, RAG_CONTEXT_EXPANSION, RAG_CONTEXT_WINDOW,
+        RAG_ADAPTIVE_DEPTH and (RAG_MIN_SIMILARITY, RAG_SCORE_GAP, RAG_LEXICAL_KEEP)
+    )
+    cached = retrieval_results.get(cache_key)
+    if cached is not None:
+        return _to_results(_within_budget(cached, token_budget))
     
     try:
-        collection = chroma_client.get_collection(collection_name)
+        sources = _search_sources(session_id, attached)
+        if not sources:
+            print(f"⚠️ Session {session_id} has no indexed documents")
+            return None
+        if variants:
+            vectors = _query_embeddings([query_text, *variants], session_id)
+            query_embedding = vectors[0] if vectors[0] is not None else _query_embedding(query_text, session_id)
+            variants = [(text, vector) for text, vector in zip(variants, vectors[1:]) if vector is not None]
+        else:
+            query_embedding = _query_embedding(query_text, session_id)
         
-        # Generate query embedding using Ollama
-        query_embedding_response = ollama.embeddings(
-            model=EMBEDDING_MODEL,
-            prompt=query_text
-        )
-        query_embedding = query_embedding_response['embedding']
+        widen = mode == "hybrid" or RAG_MMR_ENABLED or bool(variants)
+        n_candidates = max(n_results, RAG_FUSION_CANDIDATES) if widen else n_results
+        with_embeddings = RAG_MMR_ENABLED or RAG_ADAPTIVE_DEPTH
+        if variants:
+            hits = _multi_query_hits(
+                sources, query_text, query_embedding, variants, mode, n_candidates, with_embeddings
+            )
+        else:
+            hits = _search_hits(sources, query_text, query_embedding, mode, n_candidates, with_embeddings)
         
-        # Query with pre-generated embedding
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
+        if RAG_MMR_ENABLED and len(hits) > n_results:
+            # In hybrid and multi-query mode relevance is the fused score, so
+            # lexical-only matches (exact ids, numbers) and hits found by a
+            # variant are not dropped for low cosine to the question
+            selected = mmr_select(
+                query_embedding,
+                [hit["embedding"] for hit in hits],
+                n_results,
+                lambda_mult=RAG_MMR_LAMBDA,
+                relevance=[hit["fusion_score"] for hit in hits] if mode == "hybrid" or variants else None
+            )
+            hits = [hits[i] for i in selected]
+        else:
+            hits = hits[:n_results]
         
-        return results
+        if RAG_ADAPTIVE_DEPTH and hits:
+            # Only as deep as the scores justify: casual questions get nothing.
+            # Cosine misses exact ids, numbers and codes, so when the question
+            # names one the top keyword matches stay whatever their cosine
+            keep = []
+            if mode == "hybrid" and has_exact_terms(query_text):
+                keep = [
+                    i for i, hit in enumerate(hits)
+                    if hit.get("lexical_rank") is not None and hit["lexical_rank"] < RAG_LEXICAL_KEEP
+                ]
+            relevant = select_relevant(
+                [query_embedding, *(vector for _, vector in variants)],
+                [hit["embedding"] for hit in hits],
+                min_similarity=RAG_MIN_SIMILARITY,
+                min_gap=RAG_SCORE_GAP,
+                keep=keep
+            )
+            hits = [hits[i] for i in relevant]
+        
+        if RAG_CONTEXT_EXPANSION != "none":
+            hits = expand_hits(
+                hits, _chunk_fetcher(sources), mode=RAG_CONTEXT_EXPANSION, window=RAG_CONTEXT_WINDOW
+            )
+        if RAG_MERGE_ADJACENT:
+            hits = merge_adjacent_hits(hits)
+        
+        retrieval_results.put(cache_key, [{**hit, "embedding": None} for hit in hits])
+        return _to_results(_within_budget(hits, token_budget))
     except Exception as e:
         print(f"⚠️ Error querying collection for session {session_id}: {e}")
         return None
 
+def _sentence_embeddings(sentences, session_id):
+    """Embeddings of sentences, from the LRU where possible; misses in one batch"""
+    keys = [(EMBEDDING_MODEL, hash_text(sentence)) for sentence in sentences]
+    vectors = [sentence_embeddings.get(key) for key in keys]
+    missing = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(sentences[i], []).append(i)
+    if missing:
+        texts = list(missing)
+        for text, embedding in zip(texts, embed_texts(texts, "interactive", session_id)):
+            if embedding is None:
+                continue  # Scores 0: kept only if the budget has room
+            embedding = np.asarray(embedding, dtype=np.float32)
+            sentence_embeddings.put((EMBEDDING_MODEL, hash_text(text)), embedding)
+            for i in missing[text]:
+                vectors[i] = embedding
+    dim = next((len(vector) for vector in vectors if vector is not None), 1)
+    return np.stack([vector if vector is not None else np.zeros(dim, dtype=np.float32) for vector in vectors])
+
+def compress_results(query_text, results, session_id, budget=RAG_COMPRESSION_TOKENS):
+    """
+    Keep only the sentences of retrieved passages that best match the query
+    
+    Sentences are scored by cosine similarity to the (cached) query
+    embedding and kept best first within budget tokens. Passages left
+    empty are dropped; kept ones are flagged "compressed" in their metadata.
+    Results whose passages already fit the budget are returned unchanged.
+    """
+    if not results or not results["documents"][0]:
+        return results
+    documents = results["documents"][0]
+    before = sum(estimate_tokens(document) for document in documents)
+    if before <= budget:
+        return results
+    
+    start = time.perf_counter()
+    try:
+        compressed, after = compress_passages(
+            documents,
+            _query_embedding(query_text, session_id),
+            lambda sentences: _sentence_embeddings(sentences, session_id),
+            budget,
+            estimate_tokens
+        )
+    except Exception as e:
+        print(f"⚠️ Context compression skipped: {e}")
+        return results
+    
+    kept = [i for i, text in enumerate(compressed) if text]
+    print(f"🗜️ Compressed RAG context {before} → {after} tokens ({after / before:.0%}) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    compressed_results = {
+        key: [[values[0][i] for i in kept]] for key, values in results.items() if values and len(values[0]) == len(documents)
+    }
+    compressed_results["documents"] = [[compressed[i] for i in kept]]
+    compressed_results["metadatas"] = [[{**results["metadatas"][0][i], "compressed": True} for i in kept]]
+    return compressed_results
+
 def delete_session_collection(session_id):
-    """Delete ChromaDB collection for a session"""
-    collection_name = f"session_{session_id}"
+    """Delete the vector collection for a session (its chunks, in the single layout)"""
+    collection_name = _collection_name(session_id)
     
+    delete_lexical_index(_session_key(session_id))
+    bump_generation(_session_key(session_id))
+    if VECTOR_COLLECTION_LAYOUT == "single":
+        collection = _get_collection(session_id)
+        if collection is not None:
+            collection.delete(where={"session_id": session_id})
+            print(f"✅ Deleted chunks of session {session_id} from {collection_name}")
+        return
+    
+    with _collections_lock:
+        _collections.pop(collection_name, None)
     try:
-        chroma_client.delete_collection(collection_name)
+        vector_backend.delete_collection(collection_name)
         print(f"✅ Deleted collection: {collection_name}")
     except:
-        print(f"⚠️ Collection {collection_name} not found")
\ No newline at end of file
+        print(f"⚠️ Collection {collection_name} not found")
+
+def _stored_metadatas(collection, where=None, batch=1000):
+    """(chunk_id, metadata) of every chunk in a collection, page by page"""
+    offset = 0
+    while True:
+        page = collection.get(where=where, include=["metadatas"], limit=batch, offset=offset)
+        if not len(page["ids"]):
+            return
+        yield from zip(page["ids"], page["metadatas"])
+        offset += len(page["ids"])
+
+def get_stored_session_ids():
+    """Sessions that have a collection (or, in the single layout, chunks) in the vector store"""
+    if VECTOR_COLLECTION_LAYOUT == "single":
+        collection = _get_collection(LIBRARY)  # the shared collection
+        if collection is None:
+            return set()
+        return {metadata.get("session_id") for _, metadata in _stored_metadatas(collection)} - {LIBRARY, None}
+    
+    names = [name[len("session_"):] for name in vector_backend.list_collections() if name.startswith("session_")]
+    return {int(name) if name.isdigit() else name for name in names}
+
+def get_stored_file_chunks(session_id):
+    """Chunk ids stored for a session (or the library), by file_id"""
+    collection = _get_collection(session_id)
+    files = {}
+    if collection is None:
+        return files
+    for chunk_id, metadata in _stored_metadatas(collection, _session_filter(session_id)):
+        files.setdefault(metadata.get("file_id"), []).append(chunk_id)
+    return files
@@ -22,7 +22,6 @@ from PySide6.QtWidgets import (
 from PySide6.QtWidgets import QComboBox
 from PySide6.QtCore import Qt, QTimer, QThread, Signal
 from PySide6.QtGui import QIcon
-import shutil
 import threading
 from gui.speech_popup import open_speech_popup, SpeechPopup
 from services.wake_word_detector import WakeWordDetector
@@ -32,14 +31,10 @@ from db import (
     create_session,
     save_message,
     get_session_messages,
-    save_file_metadata,
-    mark_file_processed,
     get_session_files,
 )
-from db.vector_store import add_document_chunks
 from services import (
     get_chat_response,
-    process_file,
     handle_llm_file_command,
     process_file_response,
     is_file_operation_request,
@@ -50,12 +45,14 @@ from services.file_service import (
     create_file,
     find_files_by_name,
 )
-from utils.config import UPLOAD_DIR
+from utils.config import OLLAMA_FAST_MODEL, OLLAMA_THINKING_MODEL
 from utils.helpers import sanitize_filename
 from gui.Chat_Bot_styles import get_chat_styles
 from services.chat_service import detect_todo_intent, handle_todo_intent
 from services.app_service import handle_app_command
 from services.model_manager import ModelManager
+from services.llm_service import model_lifecycle
+from services.ingestion_pipeline import LIBRARY, add_to_library, ingest_file, retire_document
 
 
 logger = logging.getLogger(__name__)
@@ -206,44 +203,43 @@ class FileProcessorWorker(QThread):
             self.status_update.emit(f"📎 Processing: {self.filename}...")
             self.progress.emit(10)
 
-            file_id = save_file_metadata(
+            # Stored and indexed once in the library, attached to this session
+            file_id, stored_path, needs_indexing, replaced = add_to_library(
                 self.session_id, self.filename, self.file_path, self.file_type
             )
-
-            self.status_update.emit(f"📖 Extracting text from {self.filename}...")
-            self.progress.emit(20)
-            chunks = process_file(self.file_path, self.file_type)
-
-            if not chunks:
-                self.error.emit(f"⚠️ Could not extract text from {self.filename}")
-                self.finished.emit(False)
+            if not needs_indexing:
+                self.status_update.emit(f"✅ {self.filename} is already in the library")
+                self.progress.emit(100)
+                self.finished.emit(True)
                 return
 
-            self.status_update.emit(
-                f"🔄 Generating embeddings for {len(chunks)} chunks..."
-            )
-            self.progress.emit(30)
+            self.status_update.emit(f"📖 Extracting and indexing {self.filename}...")
+            self.progress.emit(20)
 
-            def embedding_progress(current, total):
-                percent = 30 + int((current / total) * 60)
-                self.progress.emit(percent)
+            # Chunks become searchable batch by batch while the rest is indexed
+            def ingestion_progress(indexed, segment, total):
+                self.progress.emit(20 + int((segment / max(total, 1)) * 75))
+                self.status_update.emit(
+                    f"🔄 {indexed} chunks searchable ({segment}/{total} parts of {self.filename})..."
+                )
 
-            success = add_document_chunks(
-                self.session_id,
+            indexed = ingest_file(
+                LIBRARY,
                 file_id,
                 self.filename,
-                chunks,
-                progress_callback=embedding_progress,
+                stored_path,
+                self.file_type,
+                progress_callback=ingestion_progress,
+                reuse_from=replaced,
             )
 
-            if not success:
-                self.error.emit(f"❌ Failed to process embeddings for {self.filename}")
+            if not indexed:
+                self.error.emit(f"⚠️ Could not extract or embed text from {self.filename}")
                 self.finished.emit(False)
                 return
-
-            self.status_update.emit(f"✅ Finalizing...")
-            self.progress.emit(95)
-            mark_file_processed(file_id)
+            if replaced is not None:
+                # The new version replaces the old one in this session
+                retire_document(self.session_id, replaced)
 
             self.progress.emit(100)
             self.finished.emit(True)
@@ -284,6 +280,9 @@ class RouterWorker(QThread):
 
 # ----------------------- MAIN CHAT WINDOW ------------------------
 class ChatWindow(QWidget):
+    # (model, status text) — emitted from lifecycle threads, handled on the UI thread
+    model_status_changed = Signal(str, str)
+
     def __init__(self, go_home_callback, home_page_refresh_callback, model_manager=None):
         super().__init__()
         # Set when the last input came from voice so we can give a TTS ack
@@ -435,6 +434,19 @@ class ChatWindow(QWidget):
         self._set_wake_word_listening_state()
         h_layout.addWidget(self._wake_indicator)
 
+        self.model_status_label = QLabel(model_lifecycle.status_text(OLLAMA_FAST_MODEL))
+        self.model_status_label.setObjectName("modelStatusLabel")
+        self.model_status_label.setStyleSheet("font-size: 12px;")
+        h_layout.addWidget(self.model_status_label)
+        self.model_status_changed.connect(self._on_model_status_changed)
+        # The lifecycle is app-wide and outlives this window: unregister on destroy
+        self._model_status_listener = lambda model, status: self.model_status_changed.emit(
+            model, model_lifecycle.status_text(model)
+        )
+        model_lifecycle.add_listener(self._model_status_listener)
+        listener = self._model_status_listener
+        self.destroyed.connect(lambda: model_lifecycle.remove_listener(listener))
+
         root.addWidget(self.header)
 
         # ============= UPLOADED FILES SECTION =============
@@ -571,6 +583,24 @@ class ChatWindow(QWidget):
         mode_name = "Fast Mode" if mode == "fast" else "Thinking Mode"
         self.add_message(f"🔄 Switched to {mode_name}", False, save_to_db=False)
 
+        # Load the newly selected model now instead of inside the first chat
+        model = OLLAMA_THINKING_MODEL if mode == "thinking" else OLLAMA_FAST_MODEL
+        self.model_status_label.setText(model_lifecycle.status_text(model))
+
+        def _warm():
+            model_lifecycle.refresh()
+            model_lifecycle.preload(model, block=True)
+            self.model_status_changed.emit(model, model_lifecycle.status_text(model))
+
+        threading.Thread(target=_warm, daemon=True).start()
+
+    def _on_model_status_changed(self, model, text):
+        selected = (
+            OLLAMA_THINKING_MODEL if self.get_selected_mode() == "thinking" else OLLAMA_FAST_MODEL
+        )
+        if model == selected:
+            self.model_status_label.setText(text)
+
     def get_selected_mode(self):
         mode_text = self.mode_combo.currentText()
         if "Fast" in mode_text:
@@ -2388,7 +2418,8 @@ class ChatWindow(QWidget):
             self,
             "Select File",
             "",
-            "Supported Files (*.txt *.md *.pdf);;Text Files (*.txt);;Markdown (*.md);;PDF Files (*.pdf)",
+            "Supported Files (*.txt *.md *.pdf *.docx *.csv *.xlsx);;Text Files (*.txt);;Markdown (*.md);;"
+            "PDF Files (*.pdf);;Word Documents (*.docx);;CSV Files (*.csv);;Excel Workbooks (*.xlsx)",
         )
 
         if not file_path:
@@ -2402,16 +2433,11 @@ class ChatWindow(QWidget):
         self.add_message(f"📎 Uploading: {filename}...", False, save_to_db=False)
 
         try:
-            safe_filename = sanitize_filename(filename)
-            dest_path = os.path.join(
-                UPLOAD_DIR, f"session_{self.current_session_id}_{safe_filename}"
-            )
-            shutil.copy(file_path, dest_path)
-
-            file_type = safe_filename.split(".")[-1].lower()
+            file_type = sanitize_filename(filename).split(".")[-1].lower()
 
+            # The worker copies the file into the library (once per content)
             self.file_worker = FileProcessorWorker(
-                self.current_session_id, dest_path, file_type, filename
+                self.current_session_id, file_path, file_type, filename
             )
             self.file_worker.progress.connect(self.on_file_progress)
             self.file_worker.status_update.connect(self.on_file_status_update)
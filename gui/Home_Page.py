@@ -11,6 +11,7 @@ from db.todo_db_helper import get_all_tasks, update_task_status
 from gui.edit_task_page import EditTaskPage
 from db import get_all_sessions, delete_session
 from db.vector_store import delete_session_collection
+from services.janitor import request_collection
 
 DATA_FILE = "user_data.json"
 
@@ -192,6 +193,9 @@ class HomePage(QWidget):
                 # Delete vector store collection
                 delete_session_collection(session_id)
                 
+                # Uploads, history and leftover rows are reclaimed in the background
+                request_collection()
+                
                 print(f"✅ Chat session {session_id} deleted successfully")
                 
                 # Refresh the chat list
@@ -5,9 +5,17 @@ import re
 from html import escape
 from datetime import datetime
 
-from db.database import get_session_messages, check_session_has_files
-from db.vector_store import query_relevant_chunks
+from db.database import (
+    get_session_messages,
+    get_session_message_count,
+    get_session_summary,
+    check_session_has_files,
+)
+from db.vector_store import query_relevant_chunks, compress_results
 from db.todo_db_helper import insert_task, get_all_tasks
+from services.conversation_summary_service import maybe_schedule_summary
+from services.document_summary_service import answer_from_summaries
+from services.query_expansion import expand_query
 from services.llm_service import (
     _call_ollama_chat,
     OLLAMA_FAST_MODEL,
@@ -17,6 +25,13 @@ from utils.config import (
     MAX_HISTORY_MESSAGES_NO_FILES,
     MAX_HISTORY_MESSAGES_WITH_FILES,
     MAX_RAG_CHUNKS,
+    PROMPT_LAYOUT,
+    RAG_RETRIEVAL_MODE,
+    RAG_COMPRESSION_ENABLED,
+    RAG_MULTI_QUERY_ENABLED,
+    RAG_COMPRESSION_TOKENS,
+    MAX_TOTAL_TOKENS,
+    RESERVED_RESPONSE_TOKENS,
 )
 from utils.helpers import estimate_tokens
 from utils.extract_info import extract_info
@@ -67,10 +82,7 @@ def _get_user_notes() -> str | None:
 # ── Message builders ──────────────────────────────────────────────────────────
 
 
-def build_messages_thinking(session_id: str, user_query: str) -> list:
-    messages = []
-
-    # System prompt
+def _system_prompt_thinking() -> str:
     system = _SYSTEM_THINKING
     name = _get_user_name()
     if name:
@@ -78,33 +90,148 @@ def build_messages_thinking(session_id: str, user_query: str) -> list:
     notes = _get_user_notes()
     if notes:
         system += f"\nUser notes: {notes}"
-    messages.append({"role": "system", "content": system})
-
-    # RAG context
-    if check_session_has_files(session_id):
-        chunks = query_relevant_chunks(session_id, user_query, n_results=MAX_RAG_CHUNKS)
-        if chunks and chunks["documents"][0]:
-            rag_text = "\n\n".join(
-                f"[From {chunks['metadatas'][0][i]['filename']}]\n{chunk}"
-                for i, chunk in enumerate(chunks["documents"][0])
-            )
-            messages.append(
-                {
-                    "role": "system",
-                    "content": f"Document context (use only if relevant):\n{rag_text}",
-                }
-            )
+    return system
+
 
-    # History
-    limit = (
-        MAX_HISTORY_MESSAGES_WITH_FILES
-        if check_session_has_files(session_id)
-        else MAX_HISTORY_MESSAGES_NO_FILES
+def _system_prompt_fast() -> str:
+    system = _SYSTEM_FAST
+    name = _get_user_name()
+    if name:
+        system += f"\nThe user's name is {name}."
+    return system
+
+
+def _prompt_tokens(messages: list, user_query: str) -> int:
+    return estimate_tokens(" ".join(m["content"] for m in messages)) + estimate_tokens(user_query)
+
+
+def _rag_context_message(session_id: str, user_query: str, used_tokens: int = 0) -> dict | None:
+    """
+    Retrieve document chunks for this turn as a system message.
+    used_tokens is the rest of the prompt; the chunks get what is left of
+    the context window. None when nothing in the documents is relevant to
+    the query.
+    """
+    budget = MAX_TOTAL_TOKENS - RESERVED_RESPONSE_TOKENS - used_tokens
+    # Short or vague questions are also searched as rewrites, in parallel
+    variants = expand_query(session_id, user_query) if RAG_MULTI_QUERY_ENABLED else ()
+    chunks = query_relevant_chunks(
+        session_id, user_query, n_results=MAX_RAG_CHUNKS, mode=RAG_RETRIEVAL_MODE,
+        token_budget=budget, variants=variants
+    )
+    if RAG_COMPRESSION_ENABLED:
+        # Only the sentences that match the query: far less prefill on CPU
+        chunks = compress_results(
+            user_query, chunks, session_id, budget=min(RAG_COMPRESSION_TOKENS, budget)
+        )
+    if not chunks or not chunks["documents"][0]:
+        return None
+    rag_text = "\n\n".join(
+        f"[From {chunks['metadatas'][0][i]['filename']}]\n{chunk}"
+        for i, chunk in enumerate(chunks["documents"][0])
     )
-    for role, content, _ in get_session_messages(session_id, limit=limit):
-        messages.append({"role": role, "content": content})
+    return {
+        "role": "system",
+        "content": f"Document context (use only if relevant):\n{rag_text}",
+    }
+
+
+def _with_summary(system: str, session_id: str) -> tuple[str, int]:
+    """
+    Append the rolling conversation summary to the system prompt.
+    Returns (system prompt, id of the last summarized message); history is
+    then taken only from messages after that id.
+    """
+    summary, last_message_id = get_session_summary(session_id)
+    if not summary:
+        return system, 0
+    return f"{system}\n\nSummary of the earlier conversation:\n{summary}", last_message_id
+
+
+def _dedupe_current_query(history: list, user_query: str) -> list:
+    # The GUI stores the user's message before asking for a reply; the
+    # current query is appended after the per-turn context instead.
+    if history and history[-1]["role"] == "user" and history[-1]["content"] == user_query.strip():
+        history.pop()
+    return history
+
+
+def _stable_history(session_id: str, limit: int, user_query: str, after_message_id: int = 0) -> list:
+    """
+    History window that only moves in steps of limit // 2.
+
+    A plain "last N messages" window drops one message from the front every
+    turn, so the prompt prefix changes every turn. Anchoring the start to a
+    step keeps the window append-only between jumps.
+    """
+    count = get_session_message_count(session_id, after_message_id=after_message_id)
+    step = max(1, limit // 2)
+    overflow = max(0, count - limit)
+    start = -(-overflow // step) * step  # round up to the next step
+    history = [
+        {"role": role, "content": content}
+        for role, content, _ in get_session_messages(
+            session_id, limit=count - start, after_message_id=after_message_id
+        )
+    ] if count > start else []
+    return _dedupe_current_query(history, user_query)
+
+
+def _build_messages_stable(
+    session_id: str,
+    user_query: str,
+    system: str,
+    limit: int,
+    has_files: bool,
+    seed: list | None = None,
+) -> list:
+    """[system] + history + [per-turn context] + [query] — prefix-cache friendly."""
+    system, after_message_id = _with_summary(system, session_id)
+    messages = [{"role": "system", "content": system}]
+    history = _stable_history(session_id, limit, user_query, after_message_id)
+    messages.extend(history or (seed or []))
+
+    if has_files:
+        context = _rag_context_message(session_id, user_query, _prompt_tokens(messages, user_query))
+        if context:
+            messages.append(context)
 
     messages.append({"role": "user", "content": user_query})
+    return messages
+
+
+def build_messages_thinking(session_id: str, user_query: str, has_files: bool | None = None) -> list:
+    if has_files is None:
+        has_files = check_session_has_files(session_id)
+    limit = MAX_HISTORY_MESSAGES_WITH_FILES if has_files else MAX_HISTORY_MESSAGES_NO_FILES
+
+    if PROMPT_LAYOUT == "stable":
+        messages = _build_messages_stable(
+            session_id, user_query, _system_prompt_thinking(), limit, has_files
+        )
+    else:
+        system, after_message_id = _with_summary(_system_prompt_thinking(), session_id)
+        messages = [{"role": "system", "content": system}]
+
+        # History (only turns not yet folded into the summary)
+        history = [
+            {"role": role, "content": content}
+            for role, content, _ in get_session_messages(
+                session_id, limit=limit, after_message_id=after_message_id
+            )
+        ]
+
+        # RAG context
+        if has_files:
+            context = _rag_context_message(
+                session_id, user_query, _prompt_tokens(messages + history, user_query)
+            )
+            if context:
+                messages.append(context)
+
+        messages.extend(history)
+
+        messages.append({"role": "user", "content": user_query})
 
     print(
         f"📊 Thinking tokens: ~{estimate_tokens(' '.join(m['content'] for m in messages))}"
@@ -112,40 +239,34 @@ def build_messages_thinking(session_id: str, user_query: str) -> list:
     return messages
 
 
-def build_messages_fast(session_id: str, user_query: str) -> list:
+def build_messages_fast(session_id: str, user_query: str, has_files: bool | None = None) -> list:
     # FIX: was mixing two implementations (messages list + prompt_parts list)
     # and referencing undefined variables. Rewritten to use messages list only.
-    messages = []
+    if has_files is None:
+        has_files = check_session_has_files(session_id)
 
-    system = _SYSTEM_FAST
-    name = _get_user_name()
-    if name:
-        system += f"\nThe user's name is {name}."
-    messages.append({"role": "system", "content": system})
-
-    history = get_session_messages(session_id, limit=4)
-    if not history:
-        messages.extend(_FAST_SEED)
+    if PROMPT_LAYOUT == "stable":
+        messages = _build_messages_stable(
+            session_id, user_query, _system_prompt_fast(), 4, has_files, seed=_FAST_SEED
+        )
     else:
-        for role, content, _ in history:
-            messages.append({"role": role, "content": content})
-
-    # RAG context (if files exist)
-    if check_session_has_files(session_id):
-        chunks = query_relevant_chunks(session_id, user_query, n_results=MAX_RAG_CHUNKS)
-        if chunks and chunks["documents"][0]:
-            rag_text = "\n\n".join(
-                f"[From {chunks['metadatas'][0][i]['filename']}]\n{chunk}"
-                for i, chunk in enumerate(chunks["documents"][0])
-            )
-            messages.append(
-                {
-                    "role": "system",
-                    "content": f"Document context (use only if relevant):\n{rag_text}",
-                }
-            )
+        system, after_message_id = _with_summary(_system_prompt_fast(), session_id)
+        messages = [{"role": "system", "content": system}]
 
-    messages.append({"role": "user", "content": user_query})
+        history = get_session_messages(session_id, limit=4, after_message_id=after_message_id)
+        if not history:
+            messages.extend(_FAST_SEED)
+        else:
+            for role, content, _ in history:
+                messages.append({"role": role, "content": content})
+
+        # RAG context (if files exist)
+        if has_files:
+            context = _rag_context_message(session_id, user_query, _prompt_tokens(messages, user_query))
+            if context:
+                messages.append(context)
+
+        messages.append({"role": "user", "content": user_query})
 
     print(
         f"📊 Fast tokens: ~{estimate_tokens(' '.join(m['content'] for m in messages))}"
@@ -167,15 +288,31 @@ def get_chat_response(session_id: str, user_query: str, mode: str = "fast") -> s
     if is_todo:
         return handle_todo_intent(todo_text)
 
-    # 3. Existing Ollama routing.
+    # One lookup per turn, shared by the summary check and the prompt builders
+    has_files = check_session_has_files(session_id)
+
+    # 3. Summary / outline of uploaded documents, precomputed at ingestion.
+    kind, target = detect_document_summary_intent(user_query)
+    if kind and has_files:
+        answer = answer_from_summaries(session_id, kind, target)
+        if answer:
+            return answer
+
+    # 4. Existing Ollama routing.
     if mode == "thinking":
-        messages = build_messages_thinking(session_id, user_query)
+        messages = build_messages_thinking(session_id, user_query, has_files)
         model, timeout = OLLAMA_THINKING_MODEL, 180
     else:
-        messages = build_messages_fast(session_id, user_query)
+        messages = build_messages_fast(session_id, user_query, has_files)
         model, timeout = OLLAMA_FAST_MODEL, 60
 
-    return _call_ollama_chat(messages, model, timeout)
+    response = _call_ollama_chat(
+        messages, model, timeout, priority="interactive", session_id=session_id
+    )
+
+    # Fold older turns in the background once the session has grown enough
+    maybe_schedule_summary(session_id)
+    return response
 
 
 # Backward-compat alias
@@ -221,6 +358,36 @@ def handle_search_intent(query: str) -> str:
     return f"{safe_answer}{ref_text}"
 
 
+# ── Document summary helpers ──────────────────────────────────────────────────
+
+_DOC_SUMMARY_PATTERNS = [
+    r'^(?:summari[sz]e|sum up)\s*(.*)',
+    r'^(?:give|show|write)(?: me)? (?:an? |the )?(?:short |brief |quick )?(?:summary|overview|outline|gist)(?: of)?\s*(.*)',
+    r'^(?:show|list)(?: me)? the (?:outline|sections|table of contents|structure)(?: of)?\s*(.*)',
+    r'^(?:summary|overview|outline|tl;?dr|gist)(?: of)?\s*(.*)',
+    r'^what(?:\'s| is) (.+?) about',
+]
+
+
+def detect_document_summary_intent(user_query: str):
+    """
+    Detect "summarize the file" / "outline of report.pdf" style requests.
+    Returns ("summary" | "outline", the text naming the document) or (None, None).
+    """
+    query = user_query.lower().strip().rstrip("?.! ")
+    query = re.sub(r'^(?:please|can you|could you|would you)\s+', '', query).removesuffix(" please")
+    if re.search(r'\b(?:conversation|chat|discussion|we talked)\b', query):
+        return None, None
+
+    for pattern in _DOC_SUMMARY_PATTERNS:
+        match = re.match(pattern, query)
+        if match:
+            kind = "outline" if re.search(r'\b(?:outline|sections|table of contents|structure)\b', query) else "summary"
+            return kind, match.group(1).strip()
+
+    return None, None
+
+
 # ── Todo helpers ──────────────────────────────────────────────────────────────
 
 
@@ -0,0 +1,123 @@
+# services/conversation_summary_service.py
+"""
+Rolling conversation summaries.
+
+Once the unsummarized part of a session (everything except the newest
+SUMMARY_KEEP_RECENT_MESSAGES) grows past SUMMARY_TRIGGER_TOKENS, a background
+thread folds it into the stored summary using the fast model at background
+priority. chat_service then sends summary + recent turns, so prompt size
+stays roughly flat however long the session gets. A long backlog (the
+first fold of an old session) is folded SUMMARY_BATCH_TOKENS at a time,
+each call carrying the summary so far.
+"""
+import threading
+
+from db.database import get_messages_with_ids, get_session_summary, save_session_summary
+from services.llm_service import _call_ollama_chat, _FALLBACK
+from utils.config import (
+    OLLAMA_FAST_MODEL,
+    SUMMARY_ENABLED,
+    SUMMARY_TRIGGER_TOKENS,
+    SUMMARY_KEEP_RECENT_MESSAGES,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_BATCH_TOKENS,
+)
+from utils.helpers import estimate_tokens
+
+_SUMMARY_SYSTEM = f"""You maintain the running summary of a conversation between a user and GemServe, an offline desktop assistant.
+Merge the previous summary with the new messages into one updated summary.
+Keep names, facts, decisions, open questions and user preferences. Drop greetings and filler.
+Write plain sentences in the third person, at most {SUMMARY_MAX_TOKENS * 3 // 4} words. Reply with the summary only."""
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def _foldable_messages(session_id) -> tuple[str | None, list]:
+    """Return (current summary, messages that can be folded into it)."""
+    summary, last_message_id = get_session_summary(session_id)
+    messages = get_messages_with_ids(session_id, after_message_id=last_message_id)
+    if len(messages) <= SUMMARY_KEEP_RECENT_MESSAGES:
+        return summary, []
+    return summary, messages[:-SUMMARY_KEEP_RECENT_MESSAGES]
+
+
+def needs_summary(session_id) -> bool:
+    _, foldable = _foldable_messages(session_id)
+    return sum(estimate_tokens(content) for _, _, content in foldable) >= SUMMARY_TRIGGER_TOKENS
+
+
+def _batches(foldable) -> list:
+    """Split messages into runs of at most SUMMARY_BATCH_TOKENS; longer messages are cut"""
+    batches, batch, tokens = [], [], 0
+    for message_id, role, content in foldable:
+        content = content[:SUMMARY_BATCH_TOKENS * 4]
+        size = estimate_tokens(content)
+        if batch and tokens + size > SUMMARY_BATCH_TOKENS:
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append((message_id, role, content))
+        tokens += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def summarize_session(session_id) -> bool:
+    """Fold older turns into the stored summary. Returns True if it was updated."""
+    summary, foldable = _foldable_messages(session_id)
+    if not foldable:
+        return False
+
+    folded = 0
+    for batch in _batches(foldable):
+        transcript = "\n".join(f"{role.capitalize()}: {content}" for _, role, content in batch)
+        messages = [
+            {"role": "system", "content": _SUMMARY_SYSTEM},
+            {
+                "role": "user",
+                "content": f"Previous summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}",
+            },
+        ]
+        result = _call_ollama_chat(
+            messages, OLLAMA_FAST_MODEL, timeout=180, priority="background", session_id=session_id
+        )
+        if not result or result.startswith("❌") or result == _FALLBACK:
+            print(f"⚠️ Summary for session {session_id} skipped: {result}")
+            break
+        # Saved per batch, so a failure later on keeps what was folded
+        summary = result
+        save_session_summary(session_id, summary, batch[-1][0])
+        folded += len(batch)
+
+    if not folded:
+        return False
+    print(f"✅ Folded {folded} messages into summary for session {session_id}")
+    return True
+
+
+def _run(session_id):
+    try:
+        summarize_session(session_id)
+    except Exception as e:
+        print(f"⚠️ Summary for session {session_id} failed: {e}")
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(session_id)
+
+
+def maybe_schedule_summary(session_id) -> bool:
+    """Start a background fold for the session if it crossed the threshold."""
+    if not SUMMARY_ENABLED or session_id is None:
+        return False
+    with _in_flight_lock:
+        if session_id in _in_flight:
+            return False
+    if not needs_summary(session_id):
+        return False
+    with _in_flight_lock:
+        if session_id in _in_flight:
+            return False
+        _in_flight.add(session_id)
+    threading.Thread(target=_run, args=(session_id,), daemon=True).start()
+    return True
@@ -0,0 +1,256 @@
+# services/document_summary_service.py
+"""
+Precomputed document summaries and outlines.
+
+"Summarize this file" used to retrieve eight chunks for the raw question,
+which covers a few random pages of the document. Instead, once a file is
+indexed, a background thread runs a map-reduce pass with the fast model at
+background priority:
+
+    map     the text is cut into sections (iter_chunks, up to
+            DOC_SUMMARY_SECTION_TOKENS each); every section gets a heading
+            and a short summary
+    reduce  the section summaries are folded, DOC_SUMMARY_REDUCE_TOKENS at
+            a time, until one document summary is left
+
+The summary, the outline (section headings, with pages for PDFs) and the
+section summaries are stored in chat.db, keyed by file_id, so a library
+document is summarized once for every session that attaches it. A section
+whose text was summarized before (e.g. an edited re-upload) reuses its
+stored summary. chat_service answers summary and outline questions from
+these rows without calling the model (answer_from_summaries).
+
+Documents with more than DOC_SUMMARY_MAX_SECTIONS sections get longer
+sections, of which only the first DOC_SUMMARY_SECTION_TOKENS are read, so
+the number of model calls stays bounded.
+"""
+import re
+import threading
+from bisect import bisect_right
+
+from db.database import (
+    save_document_summary,
+    get_document_summaries,
+    find_section_summary,
+    get_files_without_summary,
+    get_session_files,
+)
+from services.extractors import iter_text_segments
+from services.llm_service import _call_ollama_chat, _FALLBACK
+from utils.chunker import iter_chunks
+from utils.config import (
+    OLLAMA_FAST_MODEL,
+    CHUNK_SIZE,
+    CHILD_CHUNK_SIZE,
+    DOC_SUMMARY_ENABLED,
+    DOC_SUMMARY_SECTION_TOKENS,
+    DOC_SUMMARY_MAX_SECTIONS,
+    DOC_SUMMARY_SECTION_WORDS,
+    DOC_SUMMARY_REDUCE_TOKENS,
+    DOC_SUMMARY_MAX_WORDS,
+)
+from utils.helpers import estimate_tokens, hash_text
+
+_SECTION_SYSTEM = f"""You summarize one part of a longer document.
+On the first line write a short title for this part (at most 8 words, no numbering).
+Then write a summary of at most {DOC_SUMMARY_SECTION_WORDS} words with its key facts, names and numbers.
+Reply with the title and the summary only."""
+
+_REDUCE_SYSTEM = f"""You combine summaries of consecutive parts of one document into a single summary.
+Keep the main topics, conclusions, names and numbers, in document order. Do not invent anything.
+Write at most {DOC_SUMMARY_MAX_WORDS} words of plain prose. Reply with the summary only."""
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+class SummaryFailed(Exception):
+    pass
+
+
+def _ask(system: str, content: str, file_id) -> str:
+    result = _call_ollama_chat(
+        [{"role": "system", "content": system}, {"role": "user", "content": content}],
+        OLLAMA_FAST_MODEL, timeout=300, priority="background", session_id=f"summary:{file_id}",
+    )
+    if not result or result.startswith("❌") or result == _FALLBACK:
+        raise SummaryFailed(result)
+    return result.strip()
+
+
+def _parse_section(result: str) -> tuple[str, str]:
+    """(heading, summary) from a section reply: title line first"""
+    lines = [line.strip() for line in result.splitlines() if line.strip()]
+    heading = re.sub(r"^(?:#+|\*+|title:)\s*|\*+$", "", lines[0], flags=re.IGNORECASE).strip()
+    summary = " ".join(lines[1:]) or heading
+    return heading[:120], summary
+
+
+def _sections(file_path, file_type, section_tokens):
+    """Yield (text, page, page_end) per section; pages only for PDFs"""
+    page_starts = []
+    offset = 0
+
+    def texts():
+        nonlocal offset
+        for text, _, _ in iter_text_segments(file_path, file_type):
+            page_starts.append(offset)
+            offset += len(text)
+            yield text
+
+    for chunk in iter_chunks(texts(), max_tokens=section_tokens, overlap_tokens=0):
+        # Long sections of a long document: read their start only
+        text = chunk.text[:DOC_SUMMARY_SECTION_TOKENS * 4]
+        if file_type == "pdf":
+            yield text, bisect_right(page_starts, chunk.start), bisect_right(page_starts, chunk.end - 1)
+        else:
+            yield text, None, None
+
+
+def _reduce(summaries: list, file_id) -> str:
+    """
+    Fold summaries, as many per call as fit, until one is left
+
+    Every call folds at least two summaries, so each round at least halves
+    the list; each input is cut to half of DOC_SUMMARY_REDUCE_TOKENS so a
+    pair always fits, even when the model overshoots its word limit.
+    """
+    while len(summaries) > 1:
+        summaries = [summary[:DOC_SUMMARY_REDUCE_TOKENS // 2 * 4] for summary in summaries]
+        groups, group = [], []
+        for summary in summaries:
+            if len(group) >= 2 and estimate_tokens("\n\n".join(group + [summary])) > DOC_SUMMARY_REDUCE_TOKENS:
+                groups.append(group)
+                group = []
+            group.append(summary)
+        if len(group) == 1 and groups:
+            groups[-1].append(group[0])
+        else:
+            groups.append(group)
+        summaries = [_ask(_REDUCE_SYSTEM, "\n\n".join(group), file_id) for group in groups]
+    return summaries[0]
+
+
+def _outline(sections: list) -> str:
+    lines = []
+    for number, (heading, _, _, page, page_end) in enumerate(sections, 1):
+        pages = ""
+        if page:
+            pages = f" (p. {page})" if page == page_end else f" (pp. {page}-{page_end})"
+        lines.append(f"{number}. {heading}{pages}")
+    return "\n".join(lines)
+
+
+def summarize_document(file_id, filename, file_path, file_type, chunk_count=0) -> bool:
+    """Map-reduce summary of an indexed file. Returns True if it was stored."""
+    chunk_tokens = CHILD_CHUNK_SIZE or CHUNK_SIZE
+    section_tokens = max(DOC_SUMMARY_SECTION_TOKENS, chunk_count * chunk_tokens // DOC_SUMMARY_MAX_SECTIONS + 1)
+
+    sections, reused = [], 0
+    for text, page, page_end in _sections(file_path, file_type, section_tokens):
+        text_hash = hash_text(text)
+        known = find_section_summary(text_hash, OLLAMA_FAST_MODEL)
+        if known:
+            heading, summary = known
+            reused += 1
+        else:
+            heading, summary = _parse_section(_ask(_SECTION_SYSTEM, text, file_id))
+        sections.append((heading, summary, text_hash, page, page_end))
+    if not sections:
+        return False
+
+    parts = [f"Part {number}: {heading}\n{summary}" for number, (heading, summary, *_) in enumerate(sections, 1)]
+    summary = _reduce(parts, file_id) if len(parts) > 1 else sections[0][1]
+    save_document_summary(file_id, summary, _outline(sections), sections, OLLAMA_FAST_MODEL)
+    print(f"✅ Summarized {filename}: {len(sections)} sections ({reused} reused)")
+    return True
+
+
+def _run(file_id, filename, file_path, file_type, chunk_count):
+    try:
+        summarize_document(file_id, filename, file_path, file_type, chunk_count)
+    except SummaryFailed as e:
+        print(f"⚠️ Summary of {filename} skipped: {e}")
+    except Exception as e:
+        print(f"⚠️ Summary of {filename} failed: {e}")
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(file_id)
+
+
+def schedule_document_summary(file_id, filename, file_path, file_type, chunk_count=0) -> bool:
+    """Summarize an indexed file on a background thread (once at a time per file)"""
+    if not DOC_SUMMARY_ENABLED:
+        return False
+    with _in_flight_lock:
+        if file_id in _in_flight:
+            return False
+        _in_flight.add(file_id)
+    threading.Thread(
+        target=_run, args=(file_id, filename, file_path, file_type, chunk_count),
+        name=f"doc-summary-{file_id}", daemon=True
+    ).start()
+    return True
+
+
+def summarize_missing_documents():
+    """Summarize, one after another, every indexed file that has none yet (run at startup)"""
+    if not DOC_SUMMARY_ENABLED:
+        return
+    for file_id, filename, file_path, file_type, chunk_count in get_files_without_summary():
+        with _in_flight_lock:
+            if file_id in _in_flight:
+                continue
+            _in_flight.add(file_id)
+        _run(file_id, filename, file_path, file_type, chunk_count or 0)
+
+
+# ── Answering from stored summaries ──────────────────────────────────────────
+
+_GENERIC_WORDS = {
+    "", "a", "all", "an", "attached", "doc", "docs", "document", "documents", "file", "files",
+    "for", "it", "me", "my", "of", "pdf", "please", "that", "the", "these", "this", "those",
+    "upload", "uploaded", "uploads", "whole", "entire",
+}
+
+
+def _pick_files(files: list, target: str) -> list:
+    """Session files the question is about: one named in it, or all for a generic request"""
+    target = target.lower()
+    named = []
+    for file_id, filename, *_ in files:
+        stem = filename.lower().rsplit(".", 1)[0]
+        if filename.lower() in target or (len(stem) >= 3 and re.search(rf"\b{re.escape(stem)}\b", target)):
+            named.append((file_id, filename))
+    if named:
+        return named
+    if set(re.findall(r"[\w.]+", target)) <= _GENERIC_WORDS:
+        return [(file_id, filename) for file_id, filename, *_ in files]
+    return []
+
+
+def answer_from_summaries(session_id, kind: str, target: str = "") -> str | None:
+    """
+    Answer a summary ("summary") or outline ("outline") request from stored rows
+
+    Returns None when the session has no matching document or none is
+    summarized yet, so the caller falls back to retrieval.
+    """
+    picked = _pick_files(get_session_files(session_id), target)
+    if not picked:
+        return None
+    stored = get_document_summaries(file_id for file_id, _ in picked)
+    if not stored:
+        return None
+
+    blocks = []
+    for file_id, filename in picked:
+        if file_id not in stored:
+            blocks.append(f"⏳ The summary of {filename} is still being prepared.")
+            continue
+        summary, outline = stored[file_id]
+        if kind == "outline":
+            blocks.append(f"📑 Outline of {filename}\n{outline}")
+        else:
+            blocks.append(f"📄 {filename}\n{summary}")
+    return "\n\n".join(blocks)
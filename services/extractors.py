@@ -0,0 +1,249 @@
+# services/extractors.py
+"""
+Text extraction for every supported file type, in one place.
+
+Readers are registered per file type and stream the text of a file in
+document order as (text, segment_index, total_segments):
+
+    txt, md     TEXT_SEGMENT_CHARS characters at a time
+    pdf         one page at a time (utils/pdf_extractor)
+    docx        paragraphs and table rows, in body order
+    csv, xlsx   rows, one line each ("a | b | c."), header first
+
+RAG ingestion and file tagging both read through iter_text_segments. The
+text is cached in TEXT_CACHE_DIR under a key of (path, size, mtime), so a
+file already parsed once (for tagging, a previous upload or an interrupted
+ingestion) is streamed back from the cache instead of parsed again. Only a
+complete read is cached.
+
+A read that fails, even after some segments, raises ExtractionError, so
+ingestion never mistakes a truncated read for the end of the file.
+extract_text is the best-effort form: it prints the error and returns what
+it read.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from utils.config import TEXT_SEGMENT_CHARS, TEXT_CACHE_DIR, TEXT_CACHE_MAX_MB, PDF_EXTRACTOR
+from utils.pdf_extractor import iter_pdf_pages
+
+# Bump when a reader's output changes, so stale cache entries are not used
+_CACHE_VERSION = 1
+
+EXTRACTORS = {}
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def register_extractor(*file_types):
+    """Register a reader(file_path) yielding (text, index, total) for file types"""
+    def decorator(reader):
+        for file_type in file_types:
+            EXTRACTORS[file_type] = reader
+        return reader
+    return decorator
+
+
+def supported_file_types():
+    return sorted(EXTRACTORS)
+
+
+def _row_text(cells):
+    """One table row as a line; the final period keeps rows apart when chunking"""
+    text = " | ".join(str(cell).strip() for cell in cells if cell is not None and str(cell).strip())
+    if text and text[-1] not in ".!?":
+        text += "."
+    return text
+
+
+def _segments(lines, total=1, line_count=None):
+    """
+    Group lines into segments of about TEXT_SEGMENT_CHARS
+
+    line_count, if known, refines the total from the lines read so far.
+    """
+    buffer, size, index, read = [], 0, 0, 0
+    for line in lines:
+        if not line:
+            continue
+        buffer.append(line)
+        size += len(line) + 1
+        read += 1
+        if size >= TEXT_SEGMENT_CHARS:
+            if line_count:
+                total = -(-line_count * (index + 1) // read)
+            yield "\n".join(buffer) + "\n", index, max(total, index + 1)
+            buffer, size, index = [], 0, index + 1
+    if buffer:
+        yield "\n".join(buffer) + "\n", index, index + 1
+
+
+@register_extractor("txt", "md")
+def _read_text(file_path):
+    total = max(1, -(-os.path.getsize(file_path) // TEXT_SEGMENT_CHARS))
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        index = 0
+        while True:
+            block = f.read(TEXT_SEGMENT_CHARS)
+            if not block:
+                break
+            yield block, index, max(total, index + 1)
+            index += 1
+
+
+@register_extractor("pdf")
+def _read_pdf(file_path):
+    # PyMuPDF with a process pool for long files, pypdf as fallback
+    for page_number, text, page_count in iter_pdf_pages(file_path):
+        yield text + "\n", page_number - 1, page_count
+
+
+@register_extractor("docx")
+def _read_docx(file_path):
+    from docx import Document
+    from docx.table import Table
+
+    # python-docx parses the whole file up front anyway
+    lines = []
+    for block in Document(file_path).iter_inner_content():
+        if isinstance(block, Table):
+            lines.extend(_row_text(cell.text for cell in row.cells) for row in block.rows)
+        else:
+            lines.append(block.text)
+    yield from _segments(lines, line_count=len(lines))
+
+
+@register_extractor("csv")
+def _read_csv(file_path):
+    import csv
+
+    total = max(1, -(-os.path.getsize(file_path) // TEXT_SEGMENT_CHARS))
+    with open(file_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        yield from _segments((_row_text(row) for row in csv.reader(f)), total)
+
+
+@register_extractor("xlsx")
+def _read_xlsx(file_path):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = (row for sheet in workbook.worksheets for row in sheet.iter_rows(values_only=True))
+        line_count = sum(sheet.max_row or 0 for sheet in workbook.worksheets)
+        yield from _segments((_row_text(row) for row in rows), line_count=line_count)
+    finally:
+        workbook.close()
+
+
+# ── Parsed-text cache ─────────────────────────────────────────────────────────
+
+
+def _cache_path(file_path, file_type):
+    stat = os.stat(file_path)
+    key = f"{_CACHE_VERSION}|{PDF_EXTRACTOR}|{file_type}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(TEXT_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".jsonl")
+
+
+def _read_cache(path):
+    os.utime(path)  # mtime is the LRU clock
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            text, index, total = json.loads(line)
+            yield text, index, total
+
+
+def _trim_cache():
+    """Evict least recently used entries past TEXT_CACHE_MAX_MB"""
+    entries = []
+    for name in os.listdir(TEXT_CACHE_DIR):
+        if not name.endswith(".jsonl"):
+            continue  # reads still in progress
+        try:
+            stat = os.stat(os.path.join(TEXT_CACHE_DIR, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    excess = sum(size for _, size, _ in entries) - TEXT_CACHE_MAX_MB * 2**20
+    for _, size, name in sorted(entries):
+        if excess <= 0:
+            break
+        try:
+            os.remove(os.path.join(TEXT_CACHE_DIR, name))
+            excess -= size
+        except OSError:
+            pass
+
+
+def _read_and_cache(reader, file_path, path):
+    fd, temp_path = tempfile.mkstemp(dir=TEXT_CACHE_DIR, suffix=".part")
+    complete = False
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for segment in reader(file_path):
+                f.write(json.dumps(segment) + "\n")
+                yield segment
+        complete = True
+    finally:
+        # An abandoned or failed read leaves nothing behind
+        if complete:
+            os.replace(temp_path, path)
+            _trim_cache()
+        else:
+            os.remove(temp_path)
+
+
+def iter_text_segments(file_path, file_type=None, use_cache=True):
+    """
+    Stream the text of a file in document order
+    Supports the types in EXTRACTORS (txt, md, pdf, docx, csv, xlsx)
+    Yields:
+        (text, segment_index, total_segments) - one PDF page (segment_index
+        is the 0-based page number) or about TEXT_SEGMENT_CHARS of any
+        other file at a time. total_segments may be an estimate.
+    Raises:
+        ExtractionError: unsupported type, missing library or a failed read,
+            also after segments were already yielded
+    """
+    file_type = (file_type or os.path.splitext(file_path)[1].lstrip('.')).lower()
+    reader = EXTRACTORS.get(file_type)
+    if reader is None:
+        raise ExtractionError(f"Unsupported file type: {file_type}")
+
+    try:
+        if not use_cache:
+            yield from reader(file_path)
+            return
+        path = _cache_path(file_path, file_type)
+        if os.path.exists(path):
+            yield from _read_cache(path)
+        else:
+            yield from _read_and_cache(reader, file_path, path)
+    except ImportError as e:
+        raise ExtractionError(f"{e.name or 'A required library'} is not installed, cannot read {file_type} files") from e
+    except Exception as e:
+        raise ExtractionError(f"Error extracting {file_type}: {e}") from e
+
+
+def extract_text(file_path, file_type=None, max_chars=None):
+    """
+    Text of a file ("" if unsupported; what was read if reading fails)
+    Args:
+        max_chars: Stop reading once this many characters are collected
+    """
+    parts, size = [], 0
+    segments = iter_text_segments(file_path, file_type)
+    try:
+        for text, _, _ in segments:
+            parts.append(text)
+            size += len(text)
+            if max_chars and size >= max_chars:
+                segments.close()
+                break
+    except ExtractionError as e:
+        print(f"⚠️ {e}")
+    text = "".join(parts)
+    return text[:max_chars] if max_chars else text
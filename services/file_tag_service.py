@@ -3,6 +3,8 @@ import os
 import re
 from pathlib import Path
 
+from services.extractors import EXTRACTORS, extract_text
+
 
 def is_file_tag_command(text: str) -> bool:
     t = text.lower().strip()
@@ -20,67 +22,13 @@ def _load_text_for_tagging(file_path: str) -> str:
     path = Path(file_path)
     ext = path.suffix.lower().replace(".", "")
 
-    if not path.exists():
-        return ""
-
-    try:
-        if ext in ("txt", "md"):
-            return path.read_text(encoding="utf-8", errors="ignore")
-
-        if ext == "pdf":
-            try:
-                import PyPDF2
-                text = ""
-                with open(path, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                return text
-            except Exception:
-                return ""
-
-        if ext == "docx":
-            try:
-                from docx import Document
-                doc = Document(path)
-                return "\n".join(p.text for p in doc.paragraphs if p.text)
-            except Exception:
-                return ""
-
-        if ext == "csv":
-            try:
-                import csv
-                rows = []
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    reader = csv.reader(f)
-                    for i, row in enumerate(reader):
-                        if i >= 5:
-                            break
-                        rows.append(" ".join(row))
-                return "\n".join(rows)
-            except Exception:
-                return ""
-
-        if ext == "xlsx":
-            try:
-                import openpyxl
-                wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
-                ws = wb.active
-                rows = []
-                for i, row in enumerate(ws.iter_rows(values_only=True), start=1):
-                    if i > 5:
-                        break
-                    rows.append(" ".join(str(cell) for cell in row if cell is not None))
-                return "\n".join(rows)
-            except Exception:
-                return ""
-
-    except Exception:
+    if not path.exists() or ext not in EXTRACTORS:
         return ""
 
-    return ""
+    if ext in ("csv", "xlsx"):
+        # Header and first rows are enough to tag a table
+        return "\n".join(extract_text(file_path, ext, max_chars=8192).splitlines()[:5])
+    return extract_text(file_path, ext)
 
 
 def _extract_text_tags(text: str) -> set:
@@ -185,7 +133,7 @@ def auto_generate_tags(file_path: str) -> list:
     # For spreadsheet-like files, add headers and first rows as natural tags
     if ext in ("csv", "xlsx") and text:
         header_line = text.splitlines()[0] if text else ""
-        for token in re.split(r"[\s,;|]+", header_line):
+        for token in re.split(r"[\s,;|.]+", header_line):
             tok = token.strip().lower()
             if tok and len(tok) > 2:
                 tags.add(tok)
@@ -0,0 +1,454 @@
+# services/ingestion_pipeline.py
+"""
+Streaming document ingestion.
+
+    extract --q--> chunk --q--> embed --q--> upsert
+
+Each stage runs on its own thread and the stages are joined by bounded
+queues (INGEST_QUEUE_SIZE), so a fast stage waits for a slow one instead of
+buffering the whole document: memory stays flat however large the file is.
+Every embedded batch is upserted into the vector store and the BM25 index
+as soon as it arrives and uploaded_files.indexed_chunks moves forward, so
+the first pages are searchable while the rest is still being embedded.
+
+Ingestion is resumable. Chunk ids are deterministic (file_{id}_chunk_{i})
+and writes are upserts. Every INGEST_CHECKPOINT_SECONDS the first chunk
+index not yet durably indexed is recorded in chat.db, with the file's
+content hash and the chunk settings. If the app or Ollama stops,
+resume_unfinished_ingestion() re-chunks the file (cheap), skips the chunks
+before the checkpoint and embeds only the rest. A changed file or changed
+chunk settings start over. The BM25 index is saved once per file, not per
+checkpoint; a resume re-adds the file's stored chunks it is missing.
+
+Uploads go to the document library (add_to_library): files are stored
+once under LIBRARY_DIR by content hash and indexed once into the library
+collection, and a session only records which library documents it has
+attached. Uploading bytes the library already holds, in any session, just
+attaches them: nothing is extracted or embedded. Re-uploading a file whose
+size and mtime match the session's document of that name is not even
+hashed.
+
+Re-indexing is incremental. A changed file uploaded under a name the
+session already has is a new library document, but its chunks are diffed
+against the old version's by text hash: a chunk unchanged at its position
+is left alone, a chunk that moved reuses its stored embedding, and only new
+text is embedded. Chunks past the new end are deleted. Once the new version
+is indexed the old one is detached (retire_document), and its chunks are
+deleted right away unless another session still attaches it. Content-defined chunk boundaries
+(CHUNK_BOUNDARY_DIVISOR) keep an edit from shifting every later chunk.
+
+A fully indexed file is then summarized in the background
+(services/document_summary_service).
+
+With CHILD_CHUNK_SIZE set the index has two levels: the stored and embedded
+chunks are small children, and each records its parent (parent_index and
+the chunk range parent_first..parent_last) for expanding search hits.
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+from bisect import bisect_right
+
+from db.database import (
+    save_file_metadata,
+    mark_file_processed,
+    find_library_document,
+    find_session_document,
+    attach_document,
+    detach_document,
+    delete_unattached_document,
+    get_file_fingerprint,
+    update_file_fingerprint,
+    update_file_progress,
+    get_unprocessed_files,
+    get_ingestion_checkpoint,
+    save_ingestion_checkpoint,
+    clear_ingestion_checkpoint,
+)
+from db.vector_store import (
+    LIBRARY,
+    embed_texts,
+    upsert_chunks,
+    get_file_chunks,
+    delete_chunks,
+    delete_file_chunks,
+    save_lexical_index,
+    restore_lexical_chunks,
+)
+from services.document_summary_service import schedule_document_summary, summarize_missing_documents
+from services.extractors import iter_text_segments
+from utils.config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNK_BOUNDARY_DIVISOR,
+    CHILD_CHUNK_SIZE,
+    EMBEDDING_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    INGEST_CHECKPOINT_SECONDS,
+    LIBRARY_DIR,
+)
+from utils.chunker import iter_chunks, group_parents, get_token_counter
+from utils.helpers import hash_file, hash_text
+
+_DONE = object()
+
+# file_id -> thread indexing it. Uploading bytes whose first upload is still
+# being indexed attaches them without starting a second run on the same chunks.
+_indexing = {}
+_indexing_lock = threading.Lock()
+
+
+def _claim_indexing(file_id):
+    """Claim file_id for indexing on this thread; False if another thread has it"""
+    me = threading.get_ident()
+    with _indexing_lock:
+        return _indexing.setdefault(file_id, me) == me
+
+
+def _release_indexing(file_id):
+    with _indexing_lock:
+        _indexing.pop(file_id, None)
+
+
+class _Pipeline:
+    """Threads and queues of one ingestion run"""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.errors = []
+        self.threads = []
+
+    def put(self, outbox, item):
+        # Poll so a failed downstream stage cannot leave us blocked forever
+        while not self.stop.is_set():
+            try:
+                outbox.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(self, inbox):
+        while not self.stop.is_set():
+            try:
+                item = inbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def stage(self, name, produce, outbox):
+        """Run produce() on a thread, feeding its items into outbox"""
+        def run():
+            try:
+                for item in produce():
+                    if not self.put(outbox, item):
+                        return
+            except Exception as e:
+                self.errors.append(e)
+                self.stop.set()
+                print(f"❌ Ingestion stage '{name}' failed: {e}")
+            finally:
+                self.put(outbox, _DONE)
+
+        thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+
+def add_to_library(session_id, filename, source_path, file_type):
+    """
+    Add an upload to the document library and attach it to the session
+
+    The file is stored once under LIBRARY_DIR, named by its content hash.
+    Bytes the library already has are only attached; if they are still
+    being indexed elsewhere, needs_indexing is False and the running
+    ingestion finishes them. When it is True the calling thread holds the
+    claim on file_id that ingest_file needs. An upload with the
+    size and mtime of the session's indexed document of the same name is
+    taken to be that document, without hashing it.
+
+    Returns:
+        (file_id, stored_path, needs_indexing, replaced): replaced is the
+        library document the session had under this filename, whose chunks
+        ingest_file can reuse; retire it once the new version is indexed
+    """
+    stat = os.stat(source_path)
+    replaced = find_session_document(session_id, filename)
+    if replaced is not None:
+        known = get_file_fingerprint(replaced)
+        if known is not None:
+            stored_path, size, mtime, _, processed = known
+            if processed and (size, mtime) == (stat.st_size, stat.st_mtime) and os.path.exists(stored_path):
+                return replaced, stored_path, False, None
+
+    content_hash = hash_file(source_path)
+    existing = find_library_document(content_hash)
+    if existing is not None:
+        file_id, stored_path, processed = existing
+        attach_document(session_id, file_id)
+        update_file_fingerprint(file_id, stat.st_size, stat.st_mtime, content_hash)
+        if replaced is not None and replaced != file_id:
+            retire_document(session_id, replaced)
+        return file_id, stored_path, not processed and _claim_indexing(file_id), None
+
+    stored_path = os.path.join(LIBRARY_DIR, f"{content_hash}.{file_type}")
+    # The copy is dated now, not with the upload's mtime: the janitor only
+    # spares unreferenced files younger than JANITOR_MIN_AGE_SECONDS
+    if not os.path.exists(stored_path):
+        partial = stored_path + ".part"
+        shutil.copyfile(source_path, partial)
+        os.replace(partial, stored_path)
+    else:
+        os.utime(stored_path)
+    file_id = save_file_metadata(
+        session_id, filename, stored_path, file_type, shared=True, content_hash=content_hash
+    )
+    update_file_fingerprint(file_id, stat.st_size, stat.st_mtime, content_hash)
+    _claim_indexing(file_id)
+    return file_id, stored_path, True, replaced
+
+
+def retire_document(session_id, file_id):
+    """
+    Detach a replaced version from the session; if no other session
+    attaches it, delete its record and chunks now instead of leaving them
+    to the janitor (which removes the stored file later)
+    """
+    detach_document(session_id, file_id)
+    if delete_unattached_document(file_id):
+        removed = delete_file_chunks(LIBRARY, file_id)
+        print(f"🗑️ Removed {removed} chunks of replaced document {file_id}")
+
+
+def ingest_file(session_id, file_id, filename, file_path, file_type, progress_callback=None,
+                reuse_from=None, content_hash=None):
+    """
+    Extract, chunk, embed and index a file, streaming
+
+    Chunks already stored for file_id are diffed by text hash, so a
+    re-indexed file only embeds chunks whose text is new. One run per
+    file_id at a time: while another thread indexes it, this returns 0.
+
+    Args:
+        session_id: Session that owns the chunks, or LIBRARY for library documents
+        reuse_from: Optional file_id of an earlier version (same owner) whose
+            embeddings are reused for chunks with identical text
+        progress_callback: Optional callback(indexed_chunks, segments_done, total_segments)
+            called after every upserted batch
+        content_hash: hash_file(file_path), if the caller has it. Library
+            documents default to the hash add_to_library recorded (their
+            stored copy is named by it), so a large upload is read once
+
+    Returns:
+        Number of chunks indexed (0 if nothing could be extracted or embedded)
+    """
+    if not _claim_indexing(file_id):
+        print(f"⏳ {filename} is already being indexed")
+        return 0
+    try:
+        if content_hash is None and session_id == LIBRARY:
+            known = get_file_fingerprint(file_id)
+            content_hash = known[3] if known else None
+        return _ingest(
+            session_id, file_id, filename, file_path, file_type, progress_callback, reuse_from,
+            content_hash or hash_file(file_path)
+        )
+    finally:
+        _release_indexing(file_id)
+
+
+def _ingest(session_id, file_id, filename, file_path, file_type, progress_callback, reuse_from, content_hash):
+    counter = get_token_counter()
+    chunking = f"chunker:{counter.name}:{CHUNK_SIZE}:{CHUNK_OVERLAP}:{CHILD_CHUNK_SIZE}:{CHUNK_BOUNDARY_DIVISOR}"
+    resume_from = 0
+    saved = get_ingestion_checkpoint(file_id)
+    if saved:
+        next_chunk_index, saved_hash, saved_chunking = saved
+        if (saved_hash, saved_chunking) == (content_hash, chunking):
+            resume_from = next_chunk_index
+            print(f"🔄 Resuming {filename} from chunk {resume_from}")
+            restore_lexical_chunks(session_id, file_id)
+        else:
+            print(f"⚠️ {filename} changed since its last checkpoint, re-indexing from the start")
+
+    # Stored chunks of this file: {chunk_index: (id, text_hash, metadata)}, {text_hash: embedding}
+    previous, reusable = get_file_chunks(session_id, file_id)
+    if reuse_from is not None:
+        reusable = {**get_file_chunks(session_id, reuse_from)[1], **reusable}
+    live = set()                 # chunk indexes of the new text
+    counts = {"unchanged": 0, "reused": 0, "embedded": 0}
+
+    pipeline = _Pipeline()
+    segments_q = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    chunks_q = queue.Queue(maxsize=INGEST_QUEUE_SIZE * EMBEDDING_BATCH_SIZE)
+    embedded_q = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    position = {"segment": 0, "total": 1}
+    page_starts = []             # PDF: stream offset where each page begins
+
+    def extract():
+        yield from iter_text_segments(file_path, file_type)
+
+    def chunk():
+        offset = 0
+
+        def texts():
+            nonlocal offset
+            for text, index, total in pipeline.drain(segments_q):
+                position["segment"], position["total"] = index + 1, total
+                page_starts.append(offset)
+                offset += len(text)
+                yield text
+
+        def span_metadata(chunk):
+            metadata = {"char_start": chunk.start, "char_end": chunk.end}
+            if file_type == "pdf":
+                # Segments of a PDF are its pages, in order
+                metadata["page"] = bisect_right(page_starts, chunk.start)
+                metadata["page_end"] = bisect_right(page_starts, chunk.end - 1)
+            return metadata
+
+        if CHILD_CHUNK_SIZE:
+            children = iter_chunks(
+                texts(), max_tokens=CHILD_CHUNK_SIZE, overlap_tokens=0,
+                boundary_divisor=CHUNK_BOUNDARY_DIVISOR, counter=counter
+            )
+            parents = group_parents(children, max_tokens=CHUNK_SIZE, boundary_divisor=CHUNK_BOUNDARY_DIVISOR)
+        else:
+            chunks = iter_chunks(
+                texts(), max_tokens=CHUNK_SIZE, overlap_tokens=CHUNK_OVERLAP,
+                boundary_divisor=CHUNK_BOUNDARY_DIVISOR, counter=counter
+            )
+            parents = ([chunk] for chunk in chunks)
+
+        chunk_index = 0
+        for parent_index, group in enumerate(parents):
+            first = chunk_index
+            for chunk in group:
+                metadata = span_metadata(chunk)
+                if CHILD_CHUNK_SIZE:
+                    metadata.update(parent_index=parent_index, parent_first=first,
+                                    parent_last=first + len(group) - 1)
+                item = changed_chunk(chunk_index, chunk.text, metadata)
+                chunk_index += 1
+                if item:
+                    yield item
+
+    def changed_chunk(chunk_index, text, metadata):
+        live.add(chunk_index)
+        # Chunks before the checkpoint are already indexed
+        if chunk_index < resume_from:
+            return None
+        text_hash = hash_text(text)
+        stored = previous.get(chunk_index)
+        if (stored and stored[1] == text_hash
+                and all(stored[2].get(key) == value for key, value in metadata.items())):
+            counts["unchanged"] += 1
+            return None
+        # Text that moved keeps its embedding (only its metadata is
+        # rewritten); None means embed it
+        known = reusable.get(text_hash)
+        return chunk_index, text, position["segment"], position["total"], known, metadata
+
+    def embed_batch(batch):
+        todo = [text for _, text, _, _, known, _ in batch if known is None]
+        fresh = iter(embed_texts(todo, "background", session_id) if todo else [])
+        counts["embedded"] += len(todo)
+        counts["reused"] += len(batch) - len(todo)
+        return batch, [known.tolist() if known is not None else next(fresh) for *_, known, _ in batch]
+
+    def embed():
+        batch = []
+        for item in pipeline.drain(chunks_q):
+            batch.append(item)
+            if len(batch) >= EMBEDDING_BATCH_SIZE:
+                yield embed_batch(batch)
+                batch = []
+        if batch and not pipeline.stop.is_set():
+            yield embed_batch(batch)
+
+    pipeline.stage("extract", extract, segments_q)
+    pipeline.stage("chunk", chunk, chunks_q)
+    pipeline.stage("embed", embed, embedded_q)
+
+    def checkpoint(next_chunk_index):
+        # Only the vector store is durable here: BM25 is saved once the file
+        # ends, and a resume re-adds whatever it lost from the stored chunks
+        save_ingestion_checkpoint(file_id, next_chunk_index, content_hash, chunking)
+
+    # Upsert on the caller's thread (the GUI worker), batch by batch
+    indexed, failed = resume_from, 0
+    resume_point = None          # first chunk that failed to embed, if any
+    removed = []
+    last_checkpoint = time.monotonic()
+    try:
+        for batch, embeddings in pipeline.drain(embedded_q):
+            items = [(index, text, emb, spans) for (index, text, _, _, _, spans), emb in zip(batch, embeddings)]
+            written = upsert_chunks(session_id, file_id, filename, items)
+            indexed += written
+            failed += len(items) - written
+            if resume_point is None:
+                resume_point = next((index for index, _, emb, _ in items if emb is None), None)
+            update_file_progress(file_id, indexed + counts["unchanged"])
+            if time.monotonic() - last_checkpoint >= INGEST_CHECKPOINT_SECONDS:
+                checkpoint(resume_point if resume_point is not None else batch[-1][0] + 1)
+                last_checkpoint = time.monotonic()
+            if progress_callback:
+                segment, total = batch[-1][2:4]
+                progress_callback(indexed + counts["unchanged"], segment, total)
+        indexed += counts["unchanged"]
+
+        # Only once the whole new text has been seen: drop chunks it no longer has
+        if not pipeline.errors and not failed:
+            removed = [chunk_id for index, (chunk_id, *_) in previous.items() if index not in live]
+            delete_chunks(session_id, removed)
+    except Exception as e:
+        pipeline.errors.append(e)
+        raise
+    finally:
+        pipeline.stop.set()
+        for thread in pipeline.threads:
+            thread.join(timeout=5)
+        if indexed or removed:
+            save_lexical_index(session_id)
+
+    if pipeline.errors:
+        raise pipeline.errors[0]
+    if failed:
+        # Leave the file unfinished so the next start retries the failed chunks
+        print(f"⚠️ {failed} chunks of {filename} failed embedding generation")
+        checkpoint(resume_point)
+    elif indexed:
+        mark_file_processed(file_id)
+        clear_ingestion_checkpoint(file_id)
+        schedule_document_summary(file_id, filename, file_path, file_type, chunk_count=indexed)
+    if previous or reuse_from is not None:
+        print(f"♻️ Re-indexed {filename}: {counts['embedded']} embedded, {counts['reused']} reused, "
+              f"{counts['unchanged']} unchanged, {len(removed)} removed")
+    if indexed:
+        owner = "the library" if session_id == LIBRARY else f"session {session_id}"
+        print(f"✅ Indexed {indexed} chunks from {filename} into {owner}")
+    return indexed
+
+
+def resume_unfinished_ingestion():
+    """Continue every upload whose ingestion did not finish, then summarize unsummarized files (run at startup)"""
+    for file_id, session_id, filename, file_path, file_type, shared in get_unprocessed_files():
+        if not os.path.exists(file_path):
+            print(f"⚠️ Cannot resume {filename}: {file_path} is missing")
+            continue
+        try:
+            ingest_file(LIBRARY if shared else session_id, file_id, filename, file_path, file_type)
+        except Exception as e:
+            print(f"❌ Resuming {filename} failed: {e}")
+    summarize_missing_documents()
+
+
+def start_ingestion_resume():
+    """Resume unfinished uploads on a background thread"""
+    thread = threading.Thread(target=resume_unfinished_ingestion, name="ingest-resume", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,257 @@
+# services/janitor.py
+"""
+Background garbage collection of what deleted chats leave behind.
+
+delete_session() only removes the chat's session row. Everything else the
+chat owned is reconciled here against chat_sessions:
+
+    chat.db     messages, summaries, attachments, uploads and checkpoints of
+                deleted sessions; library documents no session attaches;
+                document summaries of deleted files
+    vectors     session_{id} collections (their rows in the single layout),
+                BM25 indexes, library chunks of deleted documents
+    files       uploaded copies and library files no record references,
+                abandoned .part files (uploads and the text cache)
+    caches      file_history/user_{id}_files.json
+
+The janitor runs on a daemon thread at the lowest OS priority (start_janitor):
+JANITOR_START_DELAY seconds after startup, then every
+JANITOR_INTERVAL_SECONDS, or soon after a chat is deleted (request_collection).
+Space is reclaimed in batches of JANITOR_BATCH_SIZE, and every batch first
+waits until Ollama has been idle for JANITOR_IDLE_SECONDS, so it never
+competes with chat or ingestion. Unreferenced files younger than
+JANITOR_MIN_AGE_SECONDS are left alone: they may be uploads in progress.
+
+    python -m services.janitor      # one pass now, e.g. with the app closed
+"""
+import os
+import threading
+import time
+
+from db.database import (
+    get_session_ids,
+    delete_orphaned_records,
+    get_library_file_ids,
+    get_stored_file_paths,
+    vacuum_database,
+)
+from db.lexical_index import delete_lexical_index
+from db.vector_store import (
+    LIBRARY,
+    delete_chunks,
+    delete_session_collection,
+    get_stored_file_chunks,
+    get_stored_session_ids,
+    save_lexical_index,
+)
+from services.file_service import CACHE_DIR
+from services.llm_service import ollama_scheduler
+from utils.config import (
+    DB_PATH,
+    UPLOAD_DIR,
+    LIBRARY_DIR,
+    TEXT_CACHE_DIR,
+    CHROMA_PERSIST_DIR,
+    VECTOR_INDEX_DIR,
+    LEXICAL_INDEX_DIR,
+    JANITOR_ENABLED,
+    JANITOR_START_DELAY,
+    JANITOR_INTERVAL_SECONDS,
+    JANITOR_IDLE_SECONDS,
+    JANITOR_BATCH_SIZE,
+    JANITOR_MIN_AGE_SECONDS,
+)
+
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _disk_usage():
+    """Bytes used by every store the janitor cleans"""
+    total = 0
+    for root in (UPLOAD_DIR, TEXT_CACHE_DIR, CHROMA_PERSIST_DIR, VECTOR_INDEX_DIR, str(CACHE_DIR), DB_PATH):
+        if os.path.isfile(root):
+            total += os.path.getsize(root)
+            continue
+        for folder, _, files in os.walk(root):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(folder, name))
+                except OSError:
+                    pass
+    return total
+
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), JANITOR_BATCH_SIZE):
+        yield items[start:start + JANITOR_BATCH_SIZE]
+
+
+def _wait_for_idle(stop):
+    """Block until Ollama has been idle for JANITOR_IDLE_SECONDS; False if stopped"""
+    while not stop.is_set():
+        idle = ollama_scheduler.idle_seconds()
+        if idle >= JANITOR_IDLE_SECONDS:
+            return True
+        stop.wait(max(1.0, JANITOR_IDLE_SECONDS - idle))
+    return False
+
+
+def _session_id_of(name, prefix, suffix):
+    """3 for e.g. user_3_files.json, None for names that do not match"""
+    if not (name.startswith(prefix) and name.endswith(suffix)):
+        return None
+    session_id = name[len(prefix):len(name) - len(suffix)]
+    return int(session_id) if session_id.isdigit() else None
+
+
+def _unreferenced_files(referenced):
+    """Upload copies, library files and .part leftovers no file record points to"""
+    cutoff = time.time() - JANITOR_MIN_AGE_SECONDS
+    referenced = {os.path.abspath(path) for path in referenced}
+    for folder in (UPLOAD_DIR, LIBRARY_DIR, TEXT_CACHE_DIR):
+        for name in os.listdir(folder):
+            path = os.path.abspath(os.path.join(folder, name))
+            if not os.path.isfile(path) or path in referenced:
+                continue
+            # The text cache only loses abandoned writes; its LRU trims the rest
+            if folder == TEXT_CACHE_DIR and not name.endswith(".part"):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    yield path
+            except OSError:
+                pass
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError as e:
+        print(f"⚠️ Janitor could not remove {path}: {e}")
+        return False
+
+
+def collect_garbage(stop=None):
+    """
+    Run one full pass
+
+    Args:
+        stop: Optional threading.Event; the pass ends after the current batch once set
+    Returns:
+        Counts of what was removed and bytes_freed
+    """
+    stop = stop or threading.Event()
+    report = {"rows": 0, "sessions": 0, "chunks": 0, "files": 0, "bytes_freed": 0}
+    before = _disk_usage()
+    live = get_session_ids()
+
+    # Records first: the vector and file passes reconcile against them
+    if not _wait_for_idle(stop):
+        return report
+    report["rows"], _ = delete_orphaned_records(JANITOR_MIN_AGE_SECONDS)
+
+    # Vectors and BM25 indexes of deleted sessions
+    stored = get_stored_session_ids()
+    lexical = {
+        session_id for session_id in (
+            _session_id_of(name, "session_", ".npz")
+            for name in (os.listdir(LEXICAL_INDEX_DIR) if os.path.isdir(LEXICAL_INDEX_DIR) else [])
+        ) if session_id is not None
+    }
+    for batch in _batches(sorted((stored | lexical) - live, key=str)):
+        if not _wait_for_idle(stop):
+            break
+        for session_id in batch:
+            if session_id in stored:
+                delete_session_collection(session_id)
+            else:
+                delete_lexical_index(f"session_{session_id}")
+        report["sessions"] += len(batch)
+
+    # Library chunks of documents that no longer have a record
+    documents = get_library_file_ids()
+    dead = [
+        chunk_id for file_id, chunk_ids in get_stored_file_chunks(LIBRARY).items()
+        if file_id not in documents for chunk_id in chunk_ids
+    ]
+    for batch in _batches(dead):
+        if not _wait_for_idle(stop):
+            break
+        delete_chunks(LIBRARY, batch)
+        save_lexical_index(LIBRARY)
+        report["chunks"] += len(batch)
+
+    # Files: uploads and library copies without a record, file history of deleted sessions
+    history = [
+        os.path.join(CACHE_DIR, name) for name in (os.listdir(CACHE_DIR) if os.path.isdir(CACHE_DIR) else [])
+        if _session_id_of(name, "user_", "_files.json") not in live | {None}
+    ]
+    for batch in _batches([*_unreferenced_files(get_stored_file_paths()), *history]):
+        if not _wait_for_idle(stop):
+            break
+        report["files"] += sum(_remove_file(path) for path in batch)
+
+    if report["rows"]:
+        vacuum_database()
+    report["bytes_freed"] = max(0, before - _disk_usage())
+    if any(report[key] for key in ("rows", "sessions", "chunks", "files")):
+        print(f"🧹 Janitor freed {report['bytes_freed'] / 2**20:.1f} MB: {report['sessions']} sessions, "
+              f"{report['chunks']} library chunks, {report['files']} files, {report['rows']} rows")
+    return report
+
+
+def _lower_priority():
+    """Run this thread at the lowest OS scheduling priority where supported"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass  # Windows has no per-thread nice level
+
+
+def _run():
+    _lower_priority()
+    _wake.wait(JANITOR_START_DELAY)
+    while not _stop.is_set():
+        _wake.clear()
+        try:
+            collect_garbage(_stop)
+        except Exception as e:
+            print(f"❌ Janitor pass failed: {e}")
+        _wake.wait(JANITOR_INTERVAL_SECONDS)
+
+
+def start_janitor():
+    """Start the background janitor thread (once per process)"""
+    global _thread
+    if not JANITOR_ENABLED:
+        return None
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_run, name="janitor", daemon=True)
+            _thread.start()
+        return _thread
+
+
+def request_collection():
+    """Run a pass soon (e.g. after a chat was deleted) instead of waiting for the interval"""
+    _wake.set()
+
+
+def stop_janitor():
+    _stop.set()
+    _wake.set()
+
+
+if __name__ == "__main__":
+    from db import init_database
+
+    init_database()
+    JANITOR_IDLE_SECONDS = 0  # Nothing else is running
+    result = collect_garbage()
+    print(f"✅ Janitor pass done: {result}")
@@ -53,7 +53,9 @@ def _llm_parse_intent(text: str) -> dict:
 
     try:
         prompt = _INTENT_PROMPT.replace("{message}", text)
-        response = _call_ollama(prompt, OLLAMA_FAST_MODEL, timeout=15).strip()
+        response = _call_ollama(
+            prompt, OLLAMA_FAST_MODEL, timeout=15, priority="intent"
+        ).strip()
 
         # Extract JSON from response
         # Try direct parse first
@@ -1,7 +1,28 @@
 # services/llm_service.py
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
 import requests
 
-from utils.config import GEMINI_API_KEY, OLLAMA_BASE_URL, OLLAMA_FAST_MODEL, OLLAMA_THINKING_MODEL
+from utils.config import (
+    GEMINI_API_KEY,
+    OLLAMA_BASE_URL,
+    OLLAMA_FAST_MODEL,
+    OLLAMA_THINKING_MODEL,
+    OLLAMA_PRIORITY_CLASSES,
+    OLLAMA_MAX_CONCURRENT,
+    OLLAMA_CLASS_CONCURRENCY,
+    OLLAMA_INTERACTIVE_RESERVED_SLOTS,
+    OLLAMA_STATS_WINDOW,
+    OLLAMA_KEEP_ALIVE_HOT,
+    OLLAMA_KEEP_ALIVE_WARM,
+    OLLAMA_KEEP_ALIVE_COLD,
+    OLLAMA_KEEP_ALIVE_HOT_USES,
+    OLLAMA_USAGE_WINDOW_SECONDS,
+    OLLAMA_PRELOAD_TIMEOUT,
+)
 
 # Backward-compat: some imports expect OLLAMA_MODEL
 try:
@@ -12,6 +33,342 @@ except ImportError:
 _FALLBACK = "I'm not sure how to respond to that. Could you rephrase or ask something else?"
 
 
+# ── Request scheduler ─────────────────────────────────────────────────────────
+
+
+class _Ticket:
+    __slots__ = ("priority", "session_key", "enqueued_at", "granted")
+
+    def __init__(self, priority: str, session_key):
+        self.priority = priority
+        self.session_key = session_key
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+
+
+class _ClassStats:
+    """Rolling queue-wait / service-time samples for one priority class."""
+
+    def __init__(self, window: int):
+        self.submitted = 0
+        self.completed = 0
+        self.wait = deque(maxlen=window)
+        self.service = deque(maxlen=window)
+
+    @staticmethod
+    def _summary(samples) -> dict:
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {
+            "p50_ms": round(pick(0.50) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+
+class OllamaScheduler:
+    """
+    Admission control for the single local Ollama server.
+
+    Callers block in slot() until the scheduler grants them a place:
+    - classes are strictly ordered, so queued background work is held back
+      as soon as any interactive or intent request is waiting;
+    - every class has its own in-flight limit, and lower classes can never
+      take the slots reserved for interactive chat;
+    - inside a class, sessions are served round-robin so one session's bulk
+      job cannot delay another session's requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = OLLAMA_MAX_CONCURRENT,
+        class_limits: dict | None = None,
+        reserved_interactive: int = OLLAMA_INTERACTIVE_RESERVED_SLOTS,
+        stats_window: int = OLLAMA_STATS_WINDOW,
+    ):
+        self.classes = tuple(OLLAMA_PRIORITY_CLASSES)
+        self.max_concurrent = max(1, max_concurrent)
+        self.class_limits = dict(class_limits or OLLAMA_CLASS_CONCURRENCY)
+        self.reserved_interactive = max(0, min(reserved_interactive, self.max_concurrent - 1))
+        self._cond = threading.Condition()
+        self._queues = {name: OrderedDict() for name in self.classes}
+        self._running = {name: 0 for name in self.classes}
+        self._stats = {name: _ClassStats(stats_window) for name in self.classes}
+        self._last_active = time.monotonic()
+
+    # -- admission -------------------------------------------------------------
+
+    def _can_start(self, priority: str) -> bool:
+        total = sum(self._running.values())
+        capacity = self.max_concurrent
+        if priority != self.classes[0]:
+            capacity -= self.reserved_interactive
+        limit = self.class_limits.get(priority, self.max_concurrent)
+        return total < capacity and self._running[priority] < limit
+
+    def _next_ticket(self) -> _Ticket | None:
+        for priority in self.classes:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            # Strict priority: nothing below a waiting class may start.
+            if not self._can_start(priority):
+                return None
+            session_key, tickets = next(iter(queue.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                queue.move_to_end(session_key)
+            else:
+                del queue[session_key]
+            return ticket
+        return None
+
+    def _dispatch(self):
+        """Grant tickets while capacity allows. Caller holds the lock."""
+        granted = False
+        while (ticket := self._next_ticket()) is not None:
+            ticket.granted = True
+            self._running[ticket.priority] += 1
+            self._stats[ticket.priority].wait.append(time.perf_counter() - ticket.enqueued_at)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _acquire(self, priority: str, session_id) -> _Ticket:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown Ollama priority class: {priority}")
+        ticket = _Ticket(priority, session_id)
+        with self._cond:
+            self._last_active = time.monotonic()
+            self._stats[priority].submitted += 1
+            self._queues[priority].setdefault(session_id, deque()).append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+        return ticket
+
+    def _release(self, ticket: _Ticket, service_time: float):
+        with self._cond:
+            self._last_active = time.monotonic()
+            self._running[ticket.priority] -= 1
+            stats = self._stats[ticket.priority]
+            stats.completed += 1
+            stats.service.append(service_time)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: str = "interactive", session_id=None):
+        """Hold one Ollama slot for the duration of the with-block."""
+        ticket = self._acquire(priority, session_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(ticket, time.perf_counter() - start)
+
+    def run(self, fn, *args, priority: str = "interactive", session_id=None, **kwargs):
+        """Call fn(*args, **kwargs) once a slot of the given class is free."""
+        with self.slot(priority, session_id):
+            return fn(*args, **kwargs)
+
+    # -- reporting -------------------------------------------------------------
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last request finished; 0 while any is queued or running."""
+        with self._cond:
+            if any(self._running.values()) or any(self._queues.values()):
+                return 0.0
+            return time.monotonic() - self._last_active
+
+    def stats(self) -> dict:
+        """Per-class counters plus queue-wait and service-time percentiles."""
+        with self._cond:
+            report = {}
+            for name in self.classes:
+                stats = self._stats[name]
+                report[name] = {
+                    "submitted": stats.submitted,
+                    "completed": stats.completed,
+                    "queued": sum(len(t) for t in self._queues[name].values()),
+                    "running": self._running[name],
+                    "queue_wait": _ClassStats._summary(stats.wait),
+                    "service_time": _ClassStats._summary(stats.service),
+                }
+            return report
+
+
+ollama_scheduler = OllamaScheduler()
+
+
+def get_scheduler_stats() -> dict:
+    return ollama_scheduler.stats()
+
+
+# ── Model lifecycle ───────────────────────────────────────────────────────────
+
+
+class OllamaModelLifecycle:
+    """
+    Tracks which Ollama models are resident and keeps the ones in use warm.
+
+    - preload() loads a model ahead of the first chat (an empty /api/generate
+      request loads weights without generating anything);
+    - keep_alive_for() picks a keep_alive from how often the model was used
+      recently, so a busy model is not unloaded between turns;
+    - listeners are called with (model, status) whenever a model's state
+      changes, so the UI can show "loading" / "ready".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._listeners = []
+
+    def _entry(self, model: str) -> dict:
+        return self._models.setdefault(
+            model,
+            {
+                "state": "unloaded",
+                "uses": deque(),
+                "load_seconds": None,
+                "expires_at": None,
+                "size_vram": None,
+                "error": None,
+            },
+        )
+
+    def _set_state(self, model: str, state: str, **fields):
+        with self._lock:
+            entry = self._entry(model)
+            changed = entry["state"] != state
+            entry["state"] = state
+            entry.update(fields)
+        if changed:
+            status = self.status(model)
+            for listener in list(self._listeners):
+                try:
+                    listener(model, status)
+                except Exception as e:
+                    print(f"⚠️ Model status listener failed: {e}")
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # -- usage / keep_alive ------------------------------------------------------
+
+    def record_use(self, model: str):
+        """Note a completed request; the model is resident afterwards."""
+        now = time.time()
+        with self._lock:
+            uses = self._entry(model)["uses"]
+            uses.append(now)
+            while uses and uses[0] < now - OLLAMA_USAGE_WINDOW_SECONDS:
+                uses.popleft()
+        self._set_state(model, "resident", error=None)
+
+    def keep_alive_for(self, model: str) -> str:
+        now = time.time()
+        with self._lock:
+            uses = self._entry(model)["uses"]
+            recent = sum(1 for t in uses if t >= now - OLLAMA_USAGE_WINDOW_SECONDS)
+        if recent >= OLLAMA_KEEP_ALIVE_HOT_USES:
+            return OLLAMA_KEEP_ALIVE_HOT
+        if recent:
+            return OLLAMA_KEEP_ALIVE_WARM
+        return OLLAMA_KEEP_ALIVE_COLD
+
+    # -- loading -----------------------------------------------------------------
+
+    def _load(self, model: str):
+        self._set_state(model, "loading", error=None)
+        start = time.perf_counter()
+        try:
+            with ollama_scheduler.slot("background", f"preload:{model}"):
+                response = requests.post(
+                    f"{OLLAMA_BASE_URL}/api/generate",
+                    json={"model": model, "prompt": "", "stream": False,
+                          "keep_alive": self.keep_alive_for(model)},
+                    timeout=OLLAMA_PRELOAD_TIMEOUT,
+                )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - start
+            self._set_state(model, "resident", load_seconds=round(elapsed, 2))
+            print(f"✅ Preloaded {model} in {elapsed:.1f}s")
+        except Exception as e:
+            self._set_state(model, "error", error=str(e))
+            print(f"⚠️ Could not preload {model}: {e}")
+
+    def preload(self, model: str, block: bool = False):
+        """Load a model unless it is already resident or loading."""
+        with self._lock:
+            state = self._entry(model)["state"]
+        if state in ("resident", "loading"):
+            return
+        if block:
+            self._load(model)
+        else:
+            threading.Thread(target=self._load, args=(model,), daemon=True).start()
+
+    def refresh(self):
+        """Sync residency with Ollama's /api/ps (models Ollama unloaded on idle)."""
+        try:
+            response = requests.get(f"{OLLAMA_BASE_URL}/api/ps", timeout=5)
+            response.raise_for_status()
+            running = {m.get("name") or m.get("model"): m for m in response.json().get("models", [])}
+        except Exception as e:
+            print(f"⚠️ Could not query Ollama model residency: {e}")
+            return
+        with self._lock:
+            tracked = list(self._models)
+        for model in set(tracked) | set(running):
+            info = running.get(model)
+            if info:
+                self._set_state(model, "resident",
+                                expires_at=info.get("expires_at"),
+                                size_vram=info.get("size_vram"))
+            elif self.status(model)["state"] == "resident":
+                self._set_state(model, "unloaded", expires_at=None, size_vram=None)
+
+    # -- reporting ---------------------------------------------------------------
+
+    def status(self, model: str) -> dict:
+        with self._lock:
+            entry = self._entry(model)
+            return {
+                "model": model,
+                "state": entry["state"],
+                "load_seconds": entry["load_seconds"],
+                "expires_at": entry["expires_at"],
+                "size_vram": entry["size_vram"],
+                "error": entry["error"],
+            }
+
+    def status_text(self, model: str) -> str:
+        status = self.status(model)
+        state = status["state"]
+        if state == "loading":
+            return f"⏳ Loading {model}..."
+        if state == "resident":
+            loaded = f" (loaded in {status['load_seconds']}s)" if status["load_seconds"] else ""
+            return f"🟢 {model} ready{loaded}"
+        if state == "error":
+            return f"⚠️ {model} unavailable"
+        return f"⚪ {model} not loaded"
+
+
+model_lifecycle = OllamaModelLifecycle()
+
+
+def preload_model(model: str, block: bool = False):
+    model_lifecycle.preload(model, block=block)
+
+
 def _extract_gemini_sources(response) -> list[dict]:
     sources = []
 
@@ -44,11 +401,19 @@ def _extract_gemini_sources(response) -> list[dict]:
     return deduped
 
 
-def _call_ollama_chat(messages: list, model: str, timeout: int = 60, retries: int = 2) -> str:
+def _call_ollama_chat(
+    messages: list,
+    model: str,
+    timeout: int = 60,
+    retries: int = 2,
+    priority: str = "interactive",
+    session_id=None,
+) -> str:
     """
     Call Ollama /api/chat with a proper messages array.
     Correctly separates system prompt from conversation so the model
     does NOT re-introduce itself on every reply.
+    The request waits for a scheduler slot of the given priority class.
 
     messages format:
         [{"role": "system",    "content": "..."},
@@ -57,12 +422,19 @@ def _call_ollama_chat(messages: list, model: str, timeout: int = 60, retries: in
          {"role": "user",      "content": "current query"}]
     """
     url  = f"{OLLAMA_BASE_URL}/api/chat"
-    data = {"model": model, "messages": messages, "stream": False}
+    data = {
+        "model": model,
+        "messages": messages,
+        "stream": False,
+        "keep_alive": model_lifecycle.keep_alive_for(model),
+    }
 
     for attempt in range(1, retries + 1):
         try:
-            response = requests.post(url, json=data, timeout=timeout)
+            with ollama_scheduler.slot(priority, session_id):
+                response = requests.post(url, json=data, timeout=timeout)
             response.raise_for_status()
+            model_lifecycle.record_use(model)
             text = response.json().get("message", {}).get("content", "").strip()
             if text:
                 return text
@@ -70,6 +442,8 @@ def _call_ollama_chat(messages: list, model: str, timeout: int = 60, retries: in
         except requests.exceptions.ConnectionError:
             return "❌ Cannot connect to Ollama. Make sure Ollama is running."
         except requests.exceptions.Timeout:
+            # Keep loading in the background so the retry finds it warm
+            model_lifecycle.preload(model)
             return "❌ Request timed out. The model might be loading — try again."
         except Exception as e:
             return f"❌ Error: {str(e)}"
@@ -77,18 +451,32 @@ def _call_ollama_chat(messages: list, model: str, timeout: int = 60, retries: in
     return _FALLBACK
 
 
-def _call_ollama(prompt: str, model: str, timeout: int = 60, retries: int = 2) -> str:
+def _call_ollama(
+    prompt: str,
+    model: str,
+    timeout: int = 60,
+    retries: int = 2,
+    priority: str = "intent",
+    session_id=None,
+) -> str:
     """
     Legacy /api/generate caller — kept for backward compatibility.
     Used by ask_ollama() and file intent parsing.
     """
     url  = f"{OLLAMA_BASE_URL}/api/generate"
-    data = {"model": model, "prompt": prompt, "stream": False}
+    data = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": model_lifecycle.keep_alive_for(model),
+    }
 
     for attempt in range(1, retries + 1):
         try:
-            response = requests.post(url, json=data, timeout=timeout)
+            with ollama_scheduler.slot(priority, session_id):
+                response = requests.post(url, json=data, timeout=timeout)
             response.raise_for_status()
+            model_lifecycle.record_use(model)
             text = response.json().get("response", "").strip()
             if text:
                 return text
@@ -96,6 +484,8 @@ def _call_ollama(prompt: str, model: str, timeout: int = 60, retries: int = 2) -
         except requests.exceptions.ConnectionError:
             return "❌ Cannot connect to Ollama. Make sure Ollama is running."
         except requests.exceptions.Timeout:
+            # Keep loading in the background so the retry finds it warm
+            model_lifecycle.preload(model)
             return "❌ Request timed out. The model might be loading — try again."
         except Exception as e:
             return f"❌ Error: {str(e)}"
@@ -161,4 +551,6 @@ def get_chat_response(session_id, user_query: str, mode: str = "fast") -> str:
     """Lightweight wrapper — used only if chat_service is not available."""
     model   = OLLAMA_FAST_MODEL if mode == "fast" else OLLAMA_THINKING_MODEL
     timeout = 60 if mode == "fast" else 180
-    return _call_ollama(user_query, model, timeout)
\ No newline at end of file
+    return _call_ollama(
+        user_query, model, timeout, priority="interactive", session_id=session_id
+    )
\ No newline at end of file
@@ -0,0 +1,148 @@
+# services/query_expansion.py
+"""
+Query variants for multi-query retrieval (RAG_MULTI_QUERY_ENABLED).
+
+Short or vague questions ("and the second one?", "costs?") retrieve
+poorly, and rephrasing them costs the user a full model turn each time.
+expand_query() produces up to RAG_MULTI_QUERY_MAX extra search queries:
+
+    keywords    the question without question words and filler
+    follow-up   for short questions (at most RAG_MULTI_QUERY_SHORT_WORDS
+                words, ending in "?" or starting with a question word),
+                their keywords plus those of the previous question
+    rewrites    optional (RAG_MULTI_QUERY_LLM): rephrasings by the fast
+                model, cached per question; a rewrite that is not back
+                within RAG_MULTI_QUERY_REWRITE_SECONDS is skipped this turn
+                and lands in the cache for the next one
+
+db.vector_store.query_relevant_chunks embeds the variants in one batch,
+searches them in parallel and fuses the results.
+"""
+import re
+import threading
+
+from db.database import get_session_messages
+from db.query_cache import query_rewrites, normalize_query
+from services.llm_service import _call_ollama_chat, _FALLBACK
+from utils.config import (
+    OLLAMA_FAST_MODEL,
+    RAG_MULTI_QUERY_LLM,
+    RAG_MULTI_QUERY_MAX,
+    RAG_MULTI_QUERY_SHORT_WORDS,
+    RAG_MULTI_QUERY_REWRITE_SECONDS,
+)
+
+_WORD_RE = re.compile(r"[\w][\w.\-/]*\w|\w")
+
+_STOPWORDS = {
+    "a", "about", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "been", "but",
+    "by", "can", "could", "did", "do", "does", "doc", "document", "else", "explain", "file", "for",
+    "from", "give", "had", "has", "have", "how", "i", "if", "in", "into", "is", "it", "its", "me",
+    "mention", "mentioned", "more", "my", "no", "not", "of", "on", "or", "our", "please", "say", "says",
+    "should", "so", "some", "tell", "than", "that", "the", "their", "them", "then", "there", "these",
+    "they", "this", "those", "to", "us", "was", "we", "were", "what", "when", "where", "which", "who",
+    "whom", "why", "will", "with", "would", "you", "your",
+}
+
+_QUESTION_WORDS = {
+    "and", "are", "can", "could", "did", "do", "does", "how", "is", "was", "were", "what", "when",
+    "where", "which", "who", "why", "will",
+}
+
+_REWRITE_SYSTEM = f"""You rewrite a search query for searching the user's documents.
+Write {RAG_MULTI_QUERY_MAX} different rephrasings that use other words (synonyms, the full form of abbreviations).
+One per line, no numbering, no explanations."""
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def keywords(text: str) -> list:
+    """Content words of a question, in order, without repeats"""
+    seen, words = set(), []
+    for word in _WORD_RE.findall(text):
+        key = word.lower()
+        if key not in _STOPWORDS and key not in seen:
+            seen.add(key)
+            words.append(word)
+    return words
+
+
+def _is_short_question(query_text):
+    words = query_text.split()
+    if not words or len(words) > RAG_MULTI_QUERY_SHORT_WORDS:
+        return False
+    return query_text.rstrip().endswith("?") or words[0].lower().strip(",") in _QUESTION_WORDS
+
+
+def _previous_question(session_id, query_text):
+    """The user's last message before this one, or None"""
+    current = query_text.strip()
+    for role, content, _ in reversed(get_session_messages(session_id, limit=4)):
+        if role == "user" and content.strip() != current:
+            return content
+    return None
+
+
+def _rewrite(key, query_text, session_id):
+    try:
+        result = _call_ollama_chat(
+            [{"role": "system", "content": _REWRITE_SYSTEM}, {"role": "user", "content": query_text}],
+            OLLAMA_FAST_MODEL, timeout=30, priority="interactive", session_id=session_id,
+        )
+        if result and not result.startswith("❌") and result != _FALLBACK:
+            rewrites = [
+                re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip().strip('"')
+                for line in result.splitlines()
+            ]
+            query_rewrites.put(key, [line for line in rewrites if line][:RAG_MULTI_QUERY_MAX])
+    except Exception as e:
+        print(f"⚠️ Query rewrite failed: {e}")
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def _model_rewrites(query_text, session_id):
+    """Cached fast-model rewrites; waits at most RAG_MULTI_QUERY_REWRITE_SECONDS for new ones"""
+    key = (OLLAMA_FAST_MODEL, normalize_query(query_text).lower())
+    cached = query_rewrites.get(key)
+    if cached is not None:
+        return cached
+    with _pending_lock:
+        thread = _pending.get(key)
+        if thread is None:
+            thread = threading.Thread(
+                target=_rewrite, args=(key, query_text, session_id), name="query-rewrite", daemon=True
+            )
+            _pending[key] = thread
+            thread.start()
+    thread.join(RAG_MULTI_QUERY_REWRITE_SECONDS)
+    return query_rewrites.get(key) or []
+
+
+def expand_query(session_id, query_text: str) -> list:
+    """
+    Extra search queries for a question (the question itself not included)
+
+    Returns at most RAG_MULTI_QUERY_MAX distinct variants; none for a
+    question that is all filler.
+    """
+    words = keywords(query_text)
+    candidates = [" ".join(words)]
+    if _is_short_question(query_text):
+        previous = _previous_question(session_id, query_text)
+        if previous:
+            context = [word for word in keywords(previous) if word.lower() not in {w.lower() for w in words}]
+            candidates.append(" ".join(words + context))
+    if RAG_MULTI_QUERY_LLM and words:
+        candidates.extend(_model_rewrites(query_text, session_id))
+
+    seen = {normalize_query(query_text).lower()}
+    variants = []
+    for candidate in candidates:
+        key = normalize_query(candidate).lower()
+        if key and key not in seen:
+            seen.add(key)
+            variants.append(candidate)
+    return variants[:RAG_MULTI_QUERY_MAX]
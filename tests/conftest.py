@@ -0,0 +1,12 @@
+# tests/conftest.py
+"""Run against a throwaway data directory and the in-process NumPy vector store."""
+import os
+import sys
+import tempfile
+
+# Before utils.config is imported anywhere: it reads these once
+os.environ.setdefault("GEMSERVE_DATA_DIR", tempfile.mkdtemp(prefix="gemserve_tests_"))
+os.environ.setdefault("GEMSERVE_VECTOR_BACKEND", "numpy")
+os.environ.setdefault("GEMSERVE_EMBEDDING_TOKENIZER", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
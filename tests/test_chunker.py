@@ -0,0 +1,95 @@
+# tests/test_chunker.py
+import random
+
+import pytest
+
+from utils.chunker import iter_chunks, group_parents, TokenCounter
+from utils.helpers import chunk_text_by_sentences
+
+
+def _random_text(rng, words):
+    parts = []
+    for _ in range(words):
+        word = "".join(rng.choice("abcdefgh") for _ in range(rng.randint(1, 9)))
+        parts.append(word + rng.choice([". ", "! ", "? ", " ", " ", " "]))
+    return "".join(parts)
+
+
+def _segments(rng, text):
+    pieces, i = [], 0
+    while i < len(text):
+        size = rng.randint(5, 200)
+        pieces.append(text[i:i + size])
+        i += size
+    return pieces
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_chunks_stay_within_budget_and_map_back_to_the_text(seed):
+    rng = random.Random(seed)
+    text = _random_text(rng, rng.randint(50, 800))
+    max_tokens = rng.randint(10, 80)
+    overlap = rng.randint(0, max_tokens)
+    divisor = rng.choice([None, 3, 7])
+
+    chunks = list(iter_chunks(_segments(rng, text), max_tokens, overlap, divisor, TokenCounter()))
+
+    assert chunks
+    for chunk in chunks:
+        assert chunk.tokens <= max_tokens
+        assert text[chunk.start:chunk.end] == chunk.text
+    # Every chunk brings new text and the chunks cover the whole document
+    ends = [chunk.end for chunk in chunks]
+    assert ends == sorted(set(ends))
+    assert chunks[0].start == len(text) - len(text.lstrip())
+    assert not text[chunks[-1].end:].strip()
+
+
+def test_overlap_is_trimmed_to_leave_room_for_the_next_sentence():
+    # 40-token sentences, budget 50, overlap 30: carrying one over would make 80
+    sentence = "x" * 159 + ". "
+    chunks = list(iter_chunks([sentence * 6], max_tokens=50, overlap_tokens=30,
+                              boundary_divisor=None, counter=TokenCounter()))
+    assert len(chunks) == 6
+    assert all(chunk.tokens == 40 for chunk in chunks)
+
+
+def test_overlap_carries_trailing_sentences():
+    text = " ".join(f"Sentence number {i:03d} here." for i in range(40))
+    chunks = list(iter_chunks([text], max_tokens=24, overlap_tokens=8,
+                              boundary_divisor=None, counter=TokenCounter()))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start < previous.end   # overlapping
+        assert chunk.end > previous.end     # but moving on
+
+
+def test_long_sentence_is_split_at_whitespace():
+    text = " ".join("word" for _ in range(400)) + "."
+    chunks = list(iter_chunks([text], max_tokens=50, overlap_tokens=0,
+                              boundary_divisor=None, counter=TokenCounter()))
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 50 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks) == text
+
+
+def test_segment_boundaries_do_not_change_the_chunks():
+    rng = random.Random(1)
+    text = _random_text(rng, 600)
+    whole = list(iter_chunks([text], 40, 10, 5, TokenCounter()))
+    streamed = list(iter_chunks(_segments(rng, text), 40, 10, 5, TokenCounter()))
+    assert whole == streamed
+
+
+def test_group_parents_keeps_order_and_budget():
+    rng = random.Random(2)
+    children = list(iter_chunks([_random_text(rng, 800)], 20, 0, 5, TokenCounter()))
+    parents = list(group_parents(children, max_tokens=100, boundary_divisor=5))
+    assert [child for group in parents for child in group] == children
+    assert all(sum(child.tokens for child in group) <= 100 for group in parents)
+
+
+def test_chunk_text_by_sentences_is_greedy_iter_chunks():
+    text = "Alpha beta gamma delta. " * 500
+    expected = [chunk.text for chunk in iter_chunks([text], 60, 20, None)]
+    assert len(expected) > 1
+    assert chunk_text_by_sentences(text, max_tokens=60, overlap_tokens=20) == expected
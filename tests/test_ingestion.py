@@ -0,0 +1,120 @@
+# tests/test_ingestion.py
+import hashlib
+import time
+
+import pytest
+
+pytest.importorskip("ollama")  # importing db pulls in the vector store
+
+from db import database, lexical_index
+from db.vector_store import LIBRARY, get_stored_file_chunks, save_lexical_index
+from services import ingestion_pipeline
+
+
+class StubEmbedder:
+    """Stands in for embed_texts: deterministic vectors, optional failures"""
+
+    def __init__(self, crash_after_checkpoint=None, fail_text=None):
+        self.crash_after_checkpoint = crash_after_checkpoint
+        self.fail_text = fail_text
+        self.calls = 0
+        self.embedded = 0
+
+    def __call__(self, texts, priority, session_id):
+        self.calls += 1
+        if self.crash_after_checkpoint and self.calls > 1:
+            # Embedding runs ahead of the upserts: fail once a checkpoint is on disk
+            deadline = time.monotonic() + 5
+            while database.get_ingestion_checkpoint(self.crash_after_checkpoint) is None:
+                assert time.monotonic() < deadline, "no checkpoint was written"
+                time.sleep(0.01)
+            raise RuntimeError("embedding server went away")
+        self.embedded += len(texts)
+        return [None if self.fail_text and self.fail_text in text else self._vector(text) for text in texts]
+
+    @staticmethod
+    def _vector(text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [byte / 255 + 0.01 for byte in digest[:16]]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    database.init_database()
+    monkeypatch.setattr(ingestion_pipeline, "INGEST_CHECKPOINT_SECONDS", 0)
+    monkeypatch.setattr(ingestion_pipeline, "schedule_document_summary", lambda *args, **kwargs: False)
+    return ingestion_pipeline
+
+
+def _upload(tmp_path, pipeline, tag, sentences=2000):
+    source = tmp_path / f"{tag}.txt"
+    source.write_text(" ".join(f"Sentence {tag}{i} is about topic{i % 37}." for i in range(sentences)))
+    session_id = database.create_session(tag)
+    file_id, stored_path, needs_indexing, _ = pipeline.add_to_library(session_id, source.name, str(source), "txt")
+    assert needs_indexing
+    return file_id, source.name, stored_path
+
+
+def _unprocessed(file_id):
+    return file_id in {row[0] for row in database.get_unprocessed_files()}
+
+
+def test_crash_resumes_from_the_checkpoint(tmp_path, monkeypatch, pipeline):
+    file_id, filename, path = _upload(tmp_path, pipeline, "crash")
+
+    # Killed mid-file: the BM25 index is never saved
+    crashing = StubEmbedder(crash_after_checkpoint=file_id)
+    monkeypatch.setattr(pipeline, "embed_texts", crashing)
+    monkeypatch.setattr(pipeline, "save_lexical_index", lambda session_id: None)
+    with pytest.raises(RuntimeError):
+        pipeline.ingest_file(LIBRARY, file_id, filename, path, "txt")
+    next_chunk, _, _ = database.get_ingestion_checkpoint(file_id)
+    assert 0 < next_chunk <= crashing.embedded
+    assert _unprocessed(file_id)
+
+    # Restart: nothing cached in memory
+    monkeypatch.setattr(pipeline, "save_lexical_index", save_lexical_index)
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    resumed = StubEmbedder()
+    monkeypatch.setattr(pipeline, "embed_texts", resumed)
+    total = pipeline.ingest_file(LIBRARY, file_id, filename, path, "txt")
+
+    chunk_ids = get_stored_file_chunks(LIBRARY)[file_id]
+    assert total == len(chunk_ids)
+    assert resumed.embedded == total - next_chunk
+    assert database.get_ingestion_checkpoint(file_id) is None
+    assert not _unprocessed(file_id)
+
+    # Chunks indexed before the crash are back in BM25, also after a reload
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    index = lexical_index.get_lexical_index(LIBRARY)
+    assert all(chunk_id in index for chunk_id in chunk_ids)
+    assert index.search("crash0", n_results=1)[0][0] == f"file_{file_id}_chunk_0"
+
+
+def test_failed_embeddings_leave_a_checkpoint_to_retry(tmp_path, monkeypatch, pipeline):
+    file_id, filename, path = _upload(tmp_path, pipeline, "flaky", sentences=600)
+
+    monkeypatch.setattr(pipeline, "embed_texts", StubEmbedder(fail_text="flaky300 "))
+    pipeline.ingest_file(LIBRARY, file_id, filename, path, "txt")
+    next_chunk, _, _ = database.get_ingestion_checkpoint(file_id)
+    assert next_chunk > 0
+    assert _unprocessed(file_id)
+
+    retry = StubEmbedder()
+    monkeypatch.setattr(pipeline, "embed_texts", retry)
+    total = pipeline.ingest_file(LIBRARY, file_id, filename, path, "txt")
+    assert retry.embedded == 1  # the rest past the checkpoint is stored already
+    assert len(get_stored_file_chunks(LIBRARY)[file_id]) == total
+    assert not _unprocessed(file_id)
+
+
+def test_a_changed_file_starts_over(tmp_path, monkeypatch, pipeline):
+    file_id, filename, path = _upload(tmp_path, pipeline, "edited", sentences=600)
+    database.save_ingestion_checkpoint(file_id, 5, "stale hash", "stale chunking")
+
+    embedder = StubEmbedder()
+    monkeypatch.setattr(pipeline, "embed_texts", embedder)
+    total = pipeline.ingest_file(LIBRARY, file_id, filename, path, "txt")
+    assert embedder.embedded == total
+    assert database.get_ingestion_checkpoint(file_id) is None
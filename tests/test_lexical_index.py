@@ -0,0 +1,72 @@
+# tests/test_lexical_index.py
+import random
+
+import pytest
+
+pytest.importorskip("ollama")  # importing db pulls in the vector store
+
+from db.lexical_index import BM25Index
+
+WORDS = [f"w{i}" for i in range(40)]
+
+
+def _text(rng):
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 20)))
+
+
+def _fresh_copy(index):
+    """The same live chunks added to an empty index, in the same order"""
+    copy = BM25Index()
+    live = [chunk_id for chunk_id in index.ids if chunk_id is not None]
+    copy.add(live, [" ".join(_terms(index, chunk_id)) for chunk_id in live])
+    return copy
+
+
+def _terms(index, chunk_id):
+    vocab = sorted(index.vocab, key=index.vocab.get)
+    terms, tfs = index._rows[index._row_of[chunk_id]]
+    return [vocab[t] for t, tf in zip(terms.tolist(), tfs.tolist()) for _ in range(int(tf))]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_writes_score_like_a_fresh_index(seed):
+    rng = random.Random(seed)
+    index = BM25Index()
+    for _ in range(300):
+        ids = list({f"file_{rng.randrange(3)}_chunk_{rng.randrange(200)}" for _ in range(rng.randint(1, 6))})
+        if rng.random() < 0.7:
+            index.add(ids, [_text(rng) for _ in ids])
+        else:
+            index.remove(ids)
+        if rng.random() < 0.2:
+            query = " ".join(rng.choices(WORDS, k=3))
+            prefixes = rng.choice([None, ("file_1_",), ("file_0_", "file_2_")])
+            expected = _fresh_copy(index).search(query, 10, prefixes)
+            got = index.search(query, 10, prefixes)
+            assert [round(score, 4) for _, score in got] == [round(score, 4) for _, score in expected]
+            assert {chunk_id for chunk_id, _ in got} <= set(index._row_of)
+
+
+def test_replace_and_remove():
+    index = BM25Index()
+    index.add(["a", "b"], ["invoice INV-7 paid", "nothing here"])
+    assert index.search("INV-7")[0][0] == "a"
+    index.add(["a"], ["replaced text"])
+    assert index.search("INV-7") == []
+    assert len(index) == 2
+    index.remove(["b", "missing"])
+    assert len(index) == 1 and "b" not in index
+    assert index.search("nothing") == []
+
+
+def test_save_and_load_drop_removed_chunks(tmp_path):
+    index = BM25Index(str(tmp_path / "index.npz"))
+    index.add(["a", "b", "c"], ["alpha beta", "beta gamma", "gamma delta"])
+    index.remove(["b"])
+    index.save()
+
+    loaded = BM25Index.load(index.path)
+    assert loaded.ids == ["a", "c"]
+    assert loaded.search("gamma") == index.search("gamma")
+    loaded.add(["d"], ["gamma gamma"])
+    assert loaded.search("gamma")[0][0] == "d"
@@ -0,0 +1,84 @@
+# tests/test_retrieval.py
+import numpy as np
+import pytest
+
+pytest.importorskip("ollama")  # importing db pulls in the vector store
+
+from db.retrieval import reciprocal_rank_fusion, mmr_select, merge_adjacent_hits
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    scores = dict(fused)
+    assert scores["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert scores["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert scores["b"] == pytest.approx(1 / 62)
+    assert [item_id for item_id, _ in fused] == ["a", "c", "b"]
+
+
+def test_rrf_lifts_an_id_found_by_both_retrievers():
+    fused = reciprocal_rank_fusion([["x", "shared", "y"], ["z", "w", "shared"]])
+    assert fused[0][0] == "shared"
+
+
+def test_rrf_limits_results_and_handles_empty_rankings():
+    assert reciprocal_rank_fusion([["a", "b", "c"]], n_results=2) == reciprocal_rank_fusion([["a", "b", "c"]])[:2]
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_mmr_skips_a_near_duplicate_of_the_first_pick():
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]]
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.5) == [0, 2]
+    # Relevance only: plain similarity order
+    assert mmr_select(query, candidates, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_mmr_uses_given_relevance_and_returns_distinct_indices():
+    rng = np.random.default_rng(3)
+    candidates = rng.standard_normal((30, 8))
+    relevance = np.linspace(0.1, 3.0, 30)
+    picked = mmr_select(rng.standard_normal(8), candidates, k=10, relevance=relevance)
+    assert picked[0] == 29
+    assert len(picked) == len(set(picked)) == 10
+
+
+def test_mmr_edge_cases():
+    assert mmr_select([1.0, 0.0], [], k=3) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], k=0) == []
+    assert mmr_select([1.0, 0.0], [[0.0, 1.0], [1.0, 0.0]], k=5) == [0, 1]
+
+
+def _hit(file_id, index, text, start=None):
+    metadata = {"file_id": file_id, "chunk_index": index}
+    if start is not None:
+        metadata.update(char_start=start, char_end=start + len(text))
+    return {"id": f"file_{file_id}_chunk_{index}", "document": text, "metadata": metadata}
+
+
+def test_merge_joins_consecutive_chunks_by_offsets():
+    source = "One two. Three four. Five six. Seven eight."
+    hits = [
+        _hit(1, 1, source[9:30], start=9),
+        {"id": "other", "document": "unrelated", "metadata": {}},
+        _hit(1, 0, source[0:20], start=0),
+        _hit(1, 2, source[21:], start=21),
+    ]
+    merged = merge_adjacent_hits(hits)
+    assert [hit["id"] for hit in merged] == ["file_1_chunk_1", "other"]
+    assert merged[0]["document"] == source
+    metadata = merged[0]["metadata"]
+    assert (metadata["chunk_index"], metadata["chunk_index_end"]) == (0, 2)
+    assert (metadata["char_start"], metadata["char_end"]) == (0, len(source))
+
+
+def test_merge_drops_repeated_overlap_without_offsets():
+    hits = [_hit(2, 4, "Alpha beta gamma. Delta epsilon zeta."), _hit(2, 5, "Delta epsilon zeta. Eta theta.")]
+    merged = merge_adjacent_hits(hits)
+    assert len(merged) == 1
+    assert merged[0]["document"] == "Alpha beta gamma. Delta epsilon zeta. Eta theta."
+
+
+def test_merge_keeps_gaps_and_other_files_apart():
+    hits = [_hit(1, 0, "a"), _hit(1, 2, "c"), _hit(2, 1, "b")]
+    assert merge_adjacent_hits(hits) == hits
@@ -0,0 +1,112 @@
+# tests/test_vector_backends.py
+import numpy as np
+import pytest
+
+pytest.importorskip("ollama")  # importing db pulls in the vector store
+
+from db.vector_backends import NumpyBackend
+
+FORMATS = [("float16", False), ("int8", False), ("int8", True)]
+
+
+def _vectors(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _fill(collection, vectors):
+    ids = [f"c{i}" for i in range(len(vectors))]
+    collection.upsert(
+        ids, vectors.tolist(),
+        documents=[f"doc {i}" for i in range(len(vectors))],
+        metadatas=[{"file_id": i % 3, "chunk_index": i} for i in range(len(vectors))],
+    )
+    return ids
+
+
+@pytest.fixture(params=FORMATS, ids=lambda f: f"{f[0]}{'+rescore' if f[1] else ''}")
+def backend(request, tmp_path):
+    quantization, rescore = request.param
+    return NumpyBackend(str(tmp_path), quantization=quantization, rescore=rescore)
+
+
+def test_query_finds_each_row_as_its_own_nearest(backend):
+    collection = backend.create_collection("session_1")
+    vectors = _vectors(50)
+    ids = _fill(collection, vectors)
+    results = collection.query(vectors[:10].tolist(), n_results=3)
+    assert [hits[0] for hits in results["ids"]] == ids[:10]
+    assert all(len(hits) == 3 for hits in results["ids"])
+    assert results["documents"][4][0] == "doc 4"
+    distances = results["distances"][0]
+    assert distances == sorted(distances)
+
+
+def test_query_with_a_filter_only_returns_matching_rows(backend):
+    collection = backend.create_collection("session_1")
+    _fill(collection, _vectors(30))
+    results = collection.query(_vectors(1, seed=9).tolist(), n_results=5, where={"file_id": 2})
+    assert len(results["ids"][0]) == 5
+    assert all(metadata["file_id"] == 2 for metadata in results["metadatas"][0])
+
+
+def test_upsert_replaces_an_existing_id(backend):
+    collection = backend.create_collection("session_1")
+    vectors = _vectors(20)
+    _fill(collection, vectors)
+    collection.upsert(["c3"], [vectors[7].tolist()], documents=["new text"], metadatas=[{"file_id": 9}])
+    assert collection.count() == 20
+    stored = collection.get(ids=["c3"])
+    assert stored["documents"] == ["new text"]
+    assert stored["metadatas"] == [{"file_id": 9}]
+    hits = collection.query([vectors[7].tolist()], n_results=2)["ids"][0]
+    assert set(hits) == {"c3", "c7"}
+
+
+def test_delete_by_id_and_filter(backend):
+    collection = backend.create_collection("session_1")
+    vectors = _vectors(30)
+    _fill(collection, vectors)
+    collection.delete(ids=["c0", "c1", "missing"])
+    collection.delete(where={"file_id": 2})
+    remaining = collection.get()["ids"]
+    assert len(remaining) == collection.count() == 18
+    assert "c0" not in remaining and "c2" not in remaining
+    results = collection.query(vectors[[4, 7]].tolist(), n_results=1)
+    assert results["ids"] == [["c4"], ["c7"]]
+
+
+def test_reopen_restores_rows_and_format(backend, tmp_path):
+    collection = backend.create_collection("session_1")
+    vectors = _vectors(40)
+    _fill(collection, vectors)
+    collection.delete(ids=["c5"])
+    collection.upsert(["c6"], [vectors[6].tolist()], documents=["changed"], metadatas=[{"file_id": 0}])
+    collection.upsert(["extra"], [vectors[0].tolist()], documents=["extra"], metadatas=[{"file_id": 1}])
+
+    reopened = NumpyBackend(str(tmp_path)).get_collection("session_1")
+    assert reopened.codec.name == collection.codec.name
+    assert reopened.full_precision == collection.full_precision
+    assert reopened.get() == collection.get()
+    query = vectors[[6, 10]].tolist()
+    assert reopened.query(query, n_results=4) == collection.query(query, n_results=4)
+
+
+def test_backend_lists_and_deletes_collections(backend):
+    backend.create_collection("session_1")
+    backend.create_collection("library")
+    assert sorted(backend.list_collections()) == ["library", "session_1"]
+    with pytest.raises(ValueError):
+        backend.create_collection("library")
+    backend.delete_collection("session_1")
+    assert backend.list_collections() == ["library"]
+    with pytest.raises(ValueError):
+        backend.get_collection("session_1")
+
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    collection = NumpyBackend(str(tmp_path)).create_collection("session_1")
+    collection.upsert(["a"], _vectors(1, dim=8).tolist())
+    with pytest.raises(ValueError):
+        collection.upsert(["b"], _vectors(1, dim=4).tolist())
@@ -1,6 +1,8 @@
 from .helpers import (
     truncate_text,
     estimate_tokens,
+    hash_file,
+    hash_text,
     sanitize_filename,
     format_timestamp,
     chunk_text_by_sentences
@@ -9,6 +11,8 @@ from .helpers import (
 __all__ = [
     'truncate_text',
     'estimate_tokens',
+    'hash_file',
+    'hash_text',
     'sanitize_filename',
     'format_timestamp',
     'chunk_text_by_sentences'
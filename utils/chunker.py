@@ -0,0 +1,249 @@
+# utils/chunker.py
+"""
+Streaming, token-accurate sentence chunker.
+
+    for chunk in iter_chunks(pages):
+        chunk.text, chunk.start, chunk.end, chunk.tokens
+
+Text arrives as an iterable of segments (pages, file blocks). Only the text
+of the chunk being built plus the newest segment is kept, so memory does
+not grow with the document. Sentences are found with one regex scan per
+segment, and all of a segment's sentences are tokenized in one call. A chunk is a slice of that buffer between sentence offsets,
+never a re-joined list, and the overlap is the run of trailing sentences
+that fits in overlap_tokens, tracked by offset. start/end are character
+offsets into the concatenated segments, so a chunk maps back to its page
+and neighbouring chunks can be joined exactly.
+
+Tokens are counted with the embedding model's tokenizer (EMBEDDING_TOKENIZER,
+loaded once) or estimated as characters / 4 when it is not available. A
+sentence longer than max_tokens is split at whitespace.
+
+group_parents() folds small chunks into parents for the two-level index
+(CHILD_CHUNK_SIZE): children are embedded, parents are what a hit can be
+expanded to.
+"""
+import os
+import re
+import zlib
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from typing import NamedTuple
+
+from utils.config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_BOUNDARY_DIVISOR, EMBEDDING_TOKENIZER
+
+_SENTENCE_END = re.compile(r'[.!?]\s+')
+_NON_SPACE = re.compile(r'\S')
+
+
+class Chunk(NamedTuple):
+    text: str
+    start: int      # offset of the first character in the stream
+    end: int        # offset just past the last character
+    tokens: int
+
+
+class TokenCounter:
+    """Batch token counts for one tokenizer; name identifies it in checkpoints"""
+
+    def __init__(self, tokenizer=None, name="chars/4"):
+        self.tokenizer = tokenizer
+        self.name = name
+
+    def count(self, texts):
+        if self.tokenizer is None:
+            return [len(text) // 4 for text in texts]
+        encodings = self.tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+    def count_spans(self, text, spans):
+        """
+        Tokens in each (start, end) span of text, for sorted spans
+
+        The covered text is encoded once and tokens are assigned to spans by
+        their start offsets, which is much cheaper than encoding every span.
+        """
+        if not spans:
+            return []
+        if self.tokenizer is None:
+            return [(end - start) // 4 for start, end in spans]
+        origin = spans[0][0]
+        encoding = self.tokenizer.encode(text[origin:spans[-1][1]], add_special_tokens=False)
+        starts = [origin + offset[0] for offset in encoding.offsets]
+        return [bisect_left(starts, end) - bisect_left(starts, start) for start, end in spans]
+
+    def __call__(self, text):
+        return self.count([text])[0]
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer=EMBEDDING_TOKENIZER):
+    """
+    Token counter for a tokenizer.json path or a cached Hugging Face repo
+
+    Loaded once per name. Nothing is downloaded: an unavailable tokenizer
+    falls back to the characters / 4 estimate.
+    """
+    if not tokenizer:
+        return TokenCounter()
+    try:
+        from tokenizers import Tokenizer
+
+        path = tokenizer
+        if not os.path.exists(path):
+            from huggingface_hub import hf_hub_download
+            path = hf_hub_download(tokenizer, "tokenizer.json", local_files_only=True)
+        loaded = Tokenizer.from_file(path)
+        loaded.no_truncation()
+        loaded.no_padding()
+        return TokenCounter(loaded, name=tokenizer)
+    except Exception as e:
+        print(f"⚠️ Tokenizer '{tokenizer}' not available ({type(e).__name__}), estimating tokens as characters / 4")
+        return TokenCounter()
+
+
+def _is_content_boundary(sentence, divisor):
+    """True for roughly 1 in divisor sentences, chosen by their text alone"""
+    return zlib.crc32(sentence.strip().encode('utf-8')) % divisor == 0
+
+
+def _split_long(text, start, end, tokens, max_tokens):
+    """Cut an over-long sentence into about equal pieces at whitespace"""
+    pieces = -(-tokens // max_tokens)
+    step = (end - start) // pieces
+    spans, cut = [], start
+    for _ in range(pieces - 1):
+        target = cut + step
+        space = text.rfind(' ', cut + 1 - start, target - start)
+        stop = start + space if space > 0 else target
+        spans.append((cut, stop))
+        cut = stop + 1 if space > 0 else stop
+    spans.append((cut, end))
+    return spans
+
+
+def iter_chunks(segments, max_tokens=CHUNK_SIZE, overlap_tokens=CHUNK_OVERLAP,
+                boundary_divisor=CHUNK_BOUNDARY_DIVISOR, counter=None):
+    """
+    Chunk a stream of text segments
+
+    Args:
+        segments: Iterable of text pieces in document order
+        max_tokens: Token budget per chunk
+        overlap_tokens: Trailing sentences up to this many tokens start the next chunk
+        boundary_divisor: If set, a chunk past max_tokens // 2 also ends after any
+            sentence picked by _is_content_boundary, so boundaries depend on
+            nearby text and an edit only changes the chunks around it
+            (None for greedy packing)
+        counter: TokenCounter; defaults to get_token_counter()
+    Yields:
+        Chunk(text, start, end, tokens)
+    """
+    counter = counter or get_token_counter()
+    buffer = ""          # stream text from offset base on
+    base = 0
+    scan = 0             # buffer index where the next sentence starts
+    sentences = deque()  # (start, end, tokens) of the chunk being built, stream offsets
+    state = {"tokens": 0, "fresh": False}   # fresh: has sentences beyond the overlap
+
+    def emit():
+        first, last = sentences[0][0], sentences[-1][1]
+        return Chunk(buffer[first - base:last - base], first, last, state["tokens"])
+
+    def trim(limit):
+        # Drop leading sentences until the rest fits in limit tokens
+        total = sum(tokens for _, _, tokens in sentences)
+        while sentences and total > limit:
+            total -= sentences.popleft()[2]
+        state["tokens"] = total
+
+    def keep_overlap(room=max_tokens):
+        # Carry the tail that fits the overlap and leaves room for what comes next (at least one goes)
+        sentences.popleft()
+        trim(min(overlap_tokens, room))
+        state["fresh"] = False
+
+    def complete_sentences(final):
+        nonlocal scan
+        spans = []
+        start = scan
+        for match in _SENTENCE_END.finditer(buffer, scan):
+            spans.append((start, match.start() + 1))
+            start = match.end()
+        if final and start < len(buffer):
+            spans.append((start, len(buffer)))
+            start = len(buffer)
+        # Only a span starting where the last scan stopped can open with
+        # whitespace (start of the stream or of a segment); later ones
+        # begin after the whitespace the regex consumed
+        if spans and buffer[scan:scan + 1].isspace():
+            first = _NON_SPACE.search(buffer, scan, spans[0][1])
+            if first:
+                spans[0] = (first.start(), spans[0][1])
+            else:
+                del spans[0]
+        scan = start
+        return spans
+
+    def add(spans):
+        nonlocal buffer, base, scan
+        counts = counter.count_spans(buffer, spans)
+        for (start, end), tokens in zip(spans, counts):
+            pieces = [(start, end, tokens)]
+            if tokens > max_tokens:
+                sub = _split_long(buffer[start:end], start, end, tokens, max_tokens)
+                pieces = [(s, e, n) for (s, e), n in zip(sub, counter.count_spans(buffer, sub))]
+            for start, end, tokens in pieces:
+                if state["tokens"] + tokens > max_tokens and sentences:
+                    if state["fresh"]:
+                        yield emit()
+                        keep_overlap(max_tokens - tokens)
+                    else:
+                        # Only carried overlap so far, already sent: shorten it
+                        trim(max_tokens - tokens)
+                sentences.append((base + start, base + end, tokens))
+                state["tokens"] += tokens
+                state["fresh"] = True
+                if (boundary_divisor and state["tokens"] >= max_tokens // 2
+                        and _is_content_boundary(buffer[start:end], boundary_divisor)):
+                    yield emit()
+                    keep_overlap()
+
+        # Forget text before the current chunk
+        cut = (sentences[0][0] - base) if sentences else scan
+        if cut > 0:
+            buffer, base, scan = buffer[cut:], base + cut, scan - cut
+
+    for segment in segments:
+        buffer += segment
+        # Offsets in spans are buffer indexes; add() converts them
+        yield from add(complete_sentences(final=False))
+
+    yield from add(complete_sentences(final=True))
+    if sentences and state["fresh"]:
+        yield emit()
+
+
+def group_parents(chunks, max_tokens=CHUNK_SIZE, boundary_divisor=CHUNK_BOUNDARY_DIVISOR):
+    """
+    Group consecutive chunks into parents of up to max_tokens
+
+    A parent past max_tokens // 2 also ends after a child picked by content
+    hash (as sentences are in iter_chunks), so an edit regroups only the
+    parents around it.
+    Yields:
+        Lists of Chunk, in order
+    """
+    group, tokens = [], 0
+    for chunk in chunks:
+        if group and tokens + chunk.tokens > max_tokens:
+            yield group
+            group, tokens = [], 0
+        group.append(chunk)
+        tokens += chunk.tokens
+        if (boundary_divisor and tokens >= max_tokens // 2
+                and _is_content_boundary(chunk.text, boundary_divisor)):
+            yield group
+            group, tokens = [], 0
+    if group:
+        yield group
@@ -5,7 +5,7 @@ load_dotenv()
 
 # ==================== PATHS ====================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.getenv("GEMSERVE_DATA_DIR", os.path.join(BASE_DIR, "data"))
 DB_PATH = os.path.join(DATA_DIR, "chat.db")
 UPLOAD_DIR = os.path.join(DATA_DIR, "uploaded_files")
 LOG_FILE = os.path.join(DATA_DIR, "app.log")
@@ -14,15 +14,42 @@ os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ==================== LLM SETTINGS ====================
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_FAST_MODEL     = "gemma3:1b"
 OLLAMA_THINKING_MODEL = "gemma3:4b"
 OLLAMA_MODEL          = OLLAMA_FAST_MODEL   # backward-compat alias
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# ==================== OLLAMA SCHEDULER SETTINGS ====================
+# Every call to the local Ollama server goes through one scheduler so a bulk
+# ingest cannot starve interactive chat. Classes are served in this order.
+OLLAMA_PRIORITY_CLASSES = ("interactive", "intent", "background")
+OLLAMA_MAX_CONCURRENT = 2          # Total requests in flight to Ollama
+OLLAMA_CLASS_CONCURRENCY = {       # Per-class in-flight limits
+    "interactive": 2,
+    "intent": 1,
+    "background": 1,
+}
+OLLAMA_INTERACTIVE_RESERVED_SLOTS = 1  # Slots lower classes may never take
+OLLAMA_STATS_WINDOW = 256          # Samples kept per class for percentiles
+
+# ==================== MODEL LIFECYCLE SETTINGS ====================
+# keep_alive sent with every request, picked from recent use of that model
+OLLAMA_KEEP_ALIVE_HOT = "30m"      # Used at least HOT_USES times in the window
+OLLAMA_KEEP_ALIVE_WARM = "10m"     # Used at least once in the window
+OLLAMA_KEEP_ALIVE_COLD = "5m"      # Not used recently (Ollama's default)
+OLLAMA_KEEP_ALIVE_HOT_USES = 5
+OLLAMA_USAGE_WINDOW_SECONDS = 900
+OLLAMA_PRELOAD_TIMEOUT = 300       # Seconds allowed for a cold model load
+
 # ==================== EMBEDDING SETTINGS ====================
 EMBEDDING_MODEL = "embeddinggemma:latest"
 EMBEDDING_BATCH_SIZE = 10  # Number of chunks to embed in one batch
+# Tokenizer used to size chunks: a tokenizer.json path or a Hugging Face repo
+# already in the local HF cache (never downloaded at run time), e.g. after
+#   huggingface-cli download google/embeddinggemma-300m tokenizer.json
+# Falls back to estimating 1 token per 4 characters.
+EMBEDDING_TOKENIZER = os.getenv("GEMSERVE_EMBEDDING_TOKENIZER", "google/embeddinggemma-300m")
 
 # ==================== CONTEXT WINDOW SETTINGS ====================
 MAX_TOTAL_TOKENS = 32000
@@ -40,14 +67,161 @@ MAX_HISTORY_TOKENS_WITH_FILES = 4000
 MAX_RAG_CHUNKS = 8
 MAX_CHUNK_TOKENS = 1800
 
+# ==================== PROMPT LAYOUT SETTINGS ====================
+# "stable": system prompt, profile and history form a byte-identical prefix
+#           across turns and per-turn RAG context goes last, so Ollama can
+#           reuse its KV cache instead of re-prefilling the whole history.
+# "legacy": original layouts (context before history in thinking mode).
+PROMPT_LAYOUT = "stable"
+
+# ==================== CONVERSATION SUMMARY SETTINGS ====================
+# Older turns are folded into a stored per-session summary in the
+# background, so the prompt is summary + recent turns on long sessions.
+SUMMARY_ENABLED = True
+SUMMARY_TRIGGER_TOKENS = 2000      # Unsummarized tokens (beyond recent turns) that trigger a fold
+SUMMARY_KEEP_RECENT_MESSAGES = 6   # Newest messages never folded
+SUMMARY_MAX_TOKENS = 400           # Target length of the stored summary
+SUMMARY_BATCH_TOKENS = 3000        # Most message tokens folded per model call
+
+# ==================== DOCUMENT SUMMARY SETTINGS ====================
+# After a file is indexed, a background map-reduce pass with the fast model
+# summarizes each section, then the section summaries, and stores them with
+# an outline in chat.db; "summarize this file" is answered from them.
+DOC_SUMMARY_ENABLED = True
+DOC_SUMMARY_SECTION_TOKENS = 1500  # Text sent per section (fits Ollama's default context)
+DOC_SUMMARY_MAX_SECTIONS = 48      # Longer documents get longer sections; only their start is read
+DOC_SUMMARY_SECTION_WORDS = 60     # Target length of a section summary
+DOC_SUMMARY_REDUCE_TOKENS = 1500   # Section summaries combined per reduce call
+DOC_SUMMARY_MAX_WORDS = 250        # Target length of the document summary
+
 # ==================== CHUNKING SETTINGS ====================
 CHUNK_SIZE = 1800
 CHUNK_OVERLAP = 200
+# Past half of CHUNK_SIZE, about 1 in CHUNK_BOUNDARY_DIVISOR sentences (picked
+# by a hash of the sentence) ends a chunk, so chunk boundaries follow the
+# text and an edited page only changes the chunks around it. None = greedy.
+CHUNK_BOUNDARY_DIVISOR = 16
+# Two-level index: CHILD_CHUNK_SIZE-token chunks (no overlap) are embedded
+# and searched; consecutive children are grouped into parents of up to
+# CHUNK_SIZE tokens, recorded in their metadata. None = embed CHUNK_SIZE chunks.
+CHILD_CHUNK_SIZE = 256
+
+# ==================== INGESTION SETTINGS ====================
+# Uploads stream through extract -> chunk -> embed -> upsert stages joined
+# by bounded queues; each embedded batch is searchable as soon as it lands.
+TEXT_SEGMENT_CHARS = 65536         # Text files are read this many chars at a time
+INGEST_QUEUE_SIZE = 4              # Items buffered between pipeline stages
+INGEST_CHECKPOINT_SECONDS = 5      # Save BM25 + resume point at most this often
+
+# ==================== PDF EXTRACTION SETTINGS ====================
+# "pymupdf" (falls back to pypdf/PyPDF2 if missing) or "pypdf"
+PDF_EXTRACTOR = os.getenv("GEMSERVE_PDF_EXTRACTOR", "pymupdf")
+PDF_EXTRACT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))   # Process pool size
+PDF_PARALLEL_MIN_PAGES = 300       # Shorter PDFs are read in-process: pool startup costs more
+PDF_PAGES_PER_TASK = 16            # Pages per pool task
+
+# ==================== TEXT CACHE SETTINGS ====================
+# Extracted text is cached on disk, keyed by (path, size, mtime), so tagging,
+# re-indexing and resumed uploads do not parse the same file again.
+TEXT_CACHE_DIR = os.path.join(DATA_DIR, "text_cache")
+TEXT_CACHE_MAX_MB = 512            # Least recently used entries are evicted past this
+os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+
+# ==================== DOCUMENT LIBRARY SETTINGS ====================
+# Uploads are stored once, named by content hash, and indexed once in the
+# shared library collection; sessions attach documents by reference, so the
+# same handbook in ten chats is one copy and one set of embeddings.
+LIBRARY_DIR = os.path.join(UPLOAD_DIR, "library")
+LIBRARY_COLLECTION_NAME = "library"
+os.makedirs(LIBRARY_DIR, exist_ok=True)
+
+# ==================== JANITOR SETTINGS ====================
+# Background garbage collection of what deleted chats leave behind (vector
+# collections, uploads, BM25 indexes, file history), see services/janitor.py
+JANITOR_ENABLED = True
+JANITOR_START_DELAY = 300          # Seconds after startup before the first pass
+JANITOR_INTERVAL_SECONDS = 6 * 3600
+JANITOR_IDLE_SECONDS = 30          # Ollama must have been idle this long before each batch
+JANITOR_BATCH_SIZE = 200           # Sessions, files or chunks removed per batch
+JANITOR_MIN_AGE_SECONDS = 3600     # Younger unreferenced files may be uploads in progress
 
 # ==================== CHROMADB SETTINGS ====================
 CHROMA_PERSIST_DIR = os.path.join(DATA_DIR, "chroma_db")
 os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
 
+# ==================== VECTOR STORE SETTINGS ====================
+# "chroma": chromadb.PersistentClient. "numpy": in-process memory-mapped
+# float16 matrices with a JSON sidecar (no Chroma needed at runtime).
+VECTOR_BACKEND = os.getenv("GEMSERVE_VECTOR_BACKEND", "chroma")
+VECTOR_INDEX_DIR = os.path.join(DATA_DIR, "vector_index")
+VECTOR_SEARCH_BLOCK_ROWS = 2048    # Rows upcast to float32 per BLAS call
+VECTOR_QUANTIZATION = "int8"       # numpy backend: "int8" (1 B/dim) or "float16" (2 B/dim)
+# Re-scoring keeps a float32 copy of every row (vectors.f32) next to the
+# encoded rows, so it costs more disk than plain float32 storage: at 20k x 768,
+# int8 takes 16 MB without it and 75 MB with it, for recall@8 0.97 -> 1.00.
+# Affects new collections only.
+VECTOR_RESCORE = False             # Keep float32 rows on disk to re-score the shortlist
+VECTOR_RESCORE_FACTOR = 4          # Shortlist = factor x n_results
+# "per_session": one collection per chat session (session_3, ...).
+# "single": all sessions share SINGLE_COLLECTION_NAME and searches filter on
+#           session_id metadata, so there is one index to open, not hundreds.
+# Move existing data with: python -m db.migrate_collections --to single
+VECTOR_COLLECTION_LAYOUT = os.getenv("GEMSERVE_COLLECTION_LAYOUT", "per_session")
+SINGLE_COLLECTION_NAME = "gemserve_chunks"
+
+# ==================== RETRIEVAL SETTINGS ====================
+# "dense": vector search only. "hybrid": BM25 + vector fused with
+# reciprocal-rank fusion, which also finds exact ids, names and numbers.
+RAG_RETRIEVAL_MODE = "hybrid"
+RAG_FUSION_CANDIDATES = 24         # Candidates taken from each retriever
+RAG_RRF_K = 60
+RAG_MMR_ENABLED = True             # Diversity re-ranking of the candidates
+RAG_MMR_LAMBDA = 0.7               # 1.0 = relevance only, 0.0 = diversity only
+RAG_MERGE_ADJACENT = True          # Merge neighbouring chunks, dropping their overlap
+# Child-chunk hits are expanded before they go into the prompt:
+# "window": RAG_CONTEXT_WINDOW neighbouring children on each side,
+# "parent": the whole parent span, "none": the child alone.
+# Overlapping spans are merged, so no text is sent twice.
+RAG_CONTEXT_EXPANSION = "window"
+RAG_CONTEXT_WINDOW = 1
+# Adaptive depth: instead of always sending MAX_RAG_CHUNKS, hits below
+# RAG_MIN_SIMILARITY (cosine to the query) are dropped, and so is
+# everything below the largest score drop if it is at least RAG_SCORE_GAP.
+# In hybrid mode, when the question contains an id, number or code, the
+# top RAG_LEXICAL_KEEP BM25 matches are kept whatever their cosine.
+# RAG_MIN_SIMILARITY depends on the embedding model; calibrate it with
+# benchmarks/rag_eval.py --real-embeddings before turning this on.
+# The passages sent are always capped by what remains of MAX_TOTAL_TOKENS
+# after the rest of the prompt and RESERVED_RESPONSE_TOKENS.
+RAG_ADAPTIVE_DEPTH = False
+RAG_MIN_SIMILARITY = 0.3
+RAG_SCORE_GAP = 0.1
+RAG_LEXICAL_KEEP = 2
+# Multi-query retrieval: the question is also searched as cheap rewrites
+# (its keywords; short follow-ups also with the previous question's
+# keywords; with RAG_MULTI_QUERY_LLM, rephrasings by the fast model). All
+# variants are embedded in one call, searched in parallel and fused with
+# RRF. Variant searches still running RAG_MULTI_QUERY_SEARCH_SECONDS after
+# the fan-out started (and after the question's own search) are left out.
+RAG_MULTI_QUERY_ENABLED = False
+RAG_MULTI_QUERY_LLM = False
+RAG_MULTI_QUERY_MAX = 3                  # Variants besides the question itself
+RAG_MULTI_QUERY_SHORT_WORDS = 6          # Questions up to this long borrow the previous one's keywords
+RAG_MULTI_QUERY_REWRITE_SECONDS = 1.5    # Longest wait for fast-model rewrites (cached afterwards)
+RAG_MULTI_QUERY_SEARCH_SECONDS = 0.25
+QUERY_REWRITE_CACHE_SIZE = 256           # Fast-model rewrites kept in memory (LRU)
+QUERY_EMBEDDING_CACHE_SIZE = 512  # Query embeddings kept in memory (LRU)
+RAG_RESULT_CACHE_SIZE = 128        # Retrieval results kept in memory, dropped when a session's files change
+# Extractive compression before prompting: sentences of the retrieved
+# passages are scored by cosine similarity to the query and only the best
+# that fit RAG_COMPRESSION_TOKENS are sent, in document order.
+RAG_COMPRESSION_ENABLED = True
+RAG_COMPRESSION_TOKENS = 1500      # Context budget; smaller contexts are sent unchanged
+SENTENCE_EMBEDDING_CACHE_SIZE = 8192  # Sentence embeddings kept in memory (LRU)
+BM25_K1 = 1.5
+BM25_B = 0.75
+LEXICAL_INDEX_DIR = os.path.join(CHROMA_PERSIST_DIR, "lexical")
+
 # ==================== SYSTEM PROMPT ====================
 # NOTE: chat_service.py now uses its own inline system prompts via /api/chat.
 # This constant is kept for any legacy code that still imports it.
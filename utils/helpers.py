@@ -1,4 +1,5 @@
 # utils/helpers.py
+import hashlib
 import re
 from datetime import datetime
 
@@ -12,6 +13,18 @@ def estimate_tokens(text):
     """Rough estimation: 1 token ≈ 4 characters"""
     return len(text) // 4
 
+def hash_file(file_path, block_size=1 << 20):
+    """SHA-256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text):
+    """SHA-1 of a chunk's text, used to tell unchanged chunks from edited ones"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
 def sanitize_filename(filename):
     """Remove special characters from filename"""
     return re.sub(r'[<>:"/\\|?*]', '_', filename)
@@ -32,32 +45,8 @@ def chunk_text_by_sentences(text, max_tokens=1800, overlap_tokens=200):
         max_tokens: Maximum tokens per chunk
         overlap_tokens: Overlap between chunks
     Returns:
-        List of text chunks
+        List of text chunks (utils.chunker.iter_chunks with greedy packing)
     """
-    # Split by sentences (simple approach)
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    
-    chunks = []
-    current_chunk = []
-    current_tokens = 0
-    
-    for sentence in sentences:
-        sentence_tokens = estimate_tokens(sentence)
-        
-        if current_tokens + sentence_tokens > max_tokens and current_chunk:
-            # Save current chunk
-            chunks.append(' '.join(current_chunk))
-            
-            # Start new chunk with overlap
-            overlap_text = ' '.join(current_chunk[-2:]) if len(current_chunk) >= 2 else ''
-            current_chunk = [overlap_text, sentence] if overlap_text else [sentence]
-            current_tokens = estimate_tokens(' '.join(current_chunk))
-        else:
-            current_chunk.append(sentence)
-            current_tokens += sentence_tokens
-    
-    # Add remaining chunk
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
\ No newline at end of file
+    # Imported lazily: loading utils.chunker runs utils/__init__, which imports this module
+    from utils.chunker import iter_chunks
+    return [chunk.text for chunk in iter_chunks([text], max_tokens, overlap_tokens, boundary_divisor=None)]
@@ -0,0 +1,137 @@
+# utils/pdf_extractor.py
+"""
+PDF text extraction, one page at a time and in page order.
+
+    for page_number, text, page_count in iter_pdf_pages("report.pdf"):
+        ...   # page_number is 1-based, kept for citations
+
+PyMuPDF is the fast path. Long documents (PDF_PARALLEL_MIN_PAGES or more)
+are cut into runs of PDF_PAGES_PER_TASK pages spread over a process pool
+of PDF_EXTRACT_WORKERS. At most two runs per worker are in flight, so a
+1,000-page file keeps every core busy without holding all of its text, and
+each page is yielded as soon as the pages before it are done. If PyMuPDF
+is not installed or cannot open the file, pypdf (or PyPDF2) reads it on
+the calling thread.
+
+Workers are spawned, so each one imports this module and re-imports the
+app's __main__. This lives in utils rather than services, and main.py
+imports the GUI and services only under its __main__ guard, so a worker
+starts without the Qt, LLM and vector-store clients.
+"""
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.config import (
+    PDF_EXTRACTOR,
+    PDF_EXTRACT_WORKERS,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_PAGES_PER_TASK,
+)
+
+# Inside a pool worker: the document its runs are read from
+_worker_document = {}
+
+
+def _pymupdf_page_range(file_path, start, stop):
+    """Texts of pages [start, stop); runs in a pool worker"""
+    import pymupdf
+
+    document = _worker_document.get(file_path)
+    if document is None:
+        _worker_document.clear()
+        document = _worker_document[file_path] = pymupdf.open(file_path)
+    return [document.load_page(index).get_text() for index in range(start, stop)]
+
+
+def _iter_pymupdf(file_path, workers):
+    import pymupdf
+
+    with pymupdf.open(file_path) as document:
+        page_count = document.page_count
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            for index in range(page_count):
+                yield index + 1, document.load_page(index).get_text(), page_count
+            return
+
+    runs = iter([
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ])
+    # spawn, not fork: the app process runs Qt and other threads
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = deque(
+            (start, pool.submit(_pymupdf_page_range, file_path, start, stop))
+            for start, stop in itertools.islice(runs, workers * 2)
+        )
+        while pending:
+            start, future = pending.popleft()
+            try:
+                texts = future.result()
+            except BrokenProcessPool as e:
+                # Workers could not start or died: read the rest in-process
+                print(f"⚠️ PDF worker pool failed ({e}), continuing on one thread")
+                with pymupdf.open(file_path) as document:
+                    for index in range(start, page_count):
+                        yield index + 1, document.load_page(index).get_text(), page_count
+                return
+            run = next(runs, None)
+            if run:
+                pending.append((run[0], pool.submit(_pymupdf_page_range, file_path, *run)))
+            for offset, text in enumerate(texts):
+                yield start + offset + 1, text, page_count
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_pypdf(file_path, workers=1):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        page_count = len(reader.pages)
+        for index, page in enumerate(reader.pages):
+            yield index + 1, page.extract_text() or "", page_count
+
+
+PDF_EXTRACTORS = {
+    "pymupdf": _iter_pymupdf,
+    "pypdf": _iter_pypdf,
+}
+
+
+def iter_pdf_pages(file_path, extractor=None, workers=None):
+    """
+    Stream (page_number, text, page_count) for every page of a PDF, in order
+
+    Args:
+        extractor: Key of PDF_EXTRACTORS; defaults to PDF_EXTRACTOR
+        workers: Process pool size for long PDFs; defaults to PDF_EXTRACT_WORKERS
+    """
+    extractor = extractor or PDF_EXTRACTOR
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    if extractor not in PDF_EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor '{extractor}' (expected one of {sorted(PDF_EXTRACTORS)})")
+
+    if extractor != "pypdf":
+        pages = PDF_EXTRACTORS[extractor](file_path, workers)
+        try:
+            # Import and open errors surface here, before any page is yielded
+            first = next(pages, None)
+        except ImportError:
+            print(f"⚠️ {extractor} not installed, falling back to pypdf. Install with: pip install PyMuPDF")
+        except Exception as e:
+            print(f"⚠️ {extractor} could not read the PDF ({e}), falling back to pypdf")
+        else:
+            if first is not None:
+                yield first
+                yield from pages
+            return
+
+    yield from _iter_pypdf(file_path)